@@ -0,0 +1,184 @@
+"""End-to-end benchmark of the crawl against local mock Shopify server
+
+Crawls emulated stores (see benchmarks.mock_shopify) the same way as main.crawl does - domains are
+crawled concurrently by logic.get_domain_data sharing one session, fetcher and parsing pool - and
+reports domains/s, p50/p99 latency of domains, peak RSS and CPU time of the crawler.
+Mock server runs in separate process and needs openssl to create its certificate.
+
+Usage:
+    python -m benchmarks.bench_crawl --stores 200 --latency 0.05 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import resource
+import statistics
+import sys
+import time
+from contextlib import nullcontext
+
+from benchmarks.mock_shopify import MockShopifyServer, StoreOptions, store_domain
+from crawler.constants import (
+    DEFAULT_CONTACT_PATHS,
+    DEFAULT_PRODUCT_LIST_PATH,
+    DEFAULT_PRODUCT_COUNT,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_PARSE_WORKERS,
+)
+from crawler.logic import (
+    create_fetcher,
+    create_parse_executor,
+    create_session,
+    get_domain_data,
+)
+from crawler.metrics import crawl_metrics
+from crawler.models import Config, DomainData
+from crawler.scheduler import bounded_map
+
+
+def get_cpu_time() -> float:
+    """CPU time of the process and its finished children (parsing workers) in seconds"""
+    usages = [
+        resource.getrusage(who)
+        for who in [resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN]
+    ]
+    return sum(usage.ru_utime + usage.ru_stime for usage in usages)
+
+
+def get_peak_rss() -> float:
+    """Peak resident set size of the process in MB"""
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak_rss / (1024**2 if sys.platform == "darwin" else 1024)
+
+
+async def crawl(
+    server: MockShopifyServer, config: Config, store_count: int
+) -> tuple[list[float], int]:
+    """
+    Crawl emulated stores
+
+    :return: durations of crawls of domains (in seconds) and number of failed domains
+    """
+    durations = []
+
+    async def get_timed_domain_data(domain: str, **kwargs) -> DomainData:
+        start = time.perf_counter()
+        try:
+            return await get_domain_data(domain, **kwargs)
+        finally:
+            durations.append(time.perf_counter() - start)
+
+    failed = 0
+    with create_parse_executor(config) or nullcontext() as executor:
+        async with create_session(config, **server.connector_kwargs) as session:
+            fetcher = create_fetcher(config, session)
+            async for _, domain_data in bounded_map(
+                lambda domain: get_timed_domain_data(
+                    domain, config=config, fetcher=fetcher, executor=executor
+                ),
+                (store_domain(i) for i in range(store_count)),
+                config.concurrency,
+            ):
+                if not isinstance(domain_data, DomainData) or domain_data.error:
+                    failed += 1
+    return durations, failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--stores", type=int, default=200, help="Number of stores")
+    parser.add_argument(
+        "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Domains in flight"
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=DEFAULT_PARSE_WORKERS,
+        help="Parsing processes",
+    )
+    parser.add_argument(
+        "--throttle",
+        type=float,
+        default=0,
+        help="Delay between requests to the same store (default 0 - throughput is not limited by politeness)",
+    )
+    defaults = StoreOptions()
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=defaults.latency,
+        help="Mean latency of responses",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=defaults.error_rate,
+        help="Probability of 500 response",
+    )
+    parser.add_argument(
+        "--dead-rate",
+        type=float,
+        default=defaults.dead_rate,
+        help="Probability that store is dead",
+    )
+    parser.add_argument(
+        "--bulk-rate",
+        type=float,
+        default=defaults.bulk_rate,
+        help="Probability that store serves /products.json",
+    )
+    parser.add_argument(
+        "--page-size", type=int, default=defaults.page_size, help="Size of HTML pages"
+    )
+    parser.add_argument(
+        "--variant-count",
+        type=int,
+        default=defaults.variant_count,
+        help="Variants of each product",
+    )
+    args = parser.parse_args()
+
+    options = StoreOptions(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        dead_rate=args.dead_rate,
+        bulk_rate=args.bulk_rate,
+        page_size=args.page_size,
+        variant_count=args.variant_count,
+    )
+    config = Config(
+        input_column="url",
+        contact_paths=DEFAULT_CONTACT_PATHS,
+        product_list_path=DEFAULT_PRODUCT_LIST_PATH,
+        product_count=DEFAULT_PRODUCT_COUNT,
+        throttle_delay=args.throttle,
+        concurrency=args.concurrency,
+        parse_workers=args.parse_workers,
+    )
+    print(f"Crawling {args.stores} stores: {options}")
+    with MockShopifyServer(options) as server:
+        cpu_start = get_cpu_time()
+        start = time.perf_counter()
+        durations, failed = asyncio.run(crawl(server, config, args.stores))
+        elapsed = time.perf_counter() - start
+        cpu_time = get_cpu_time() - cpu_start
+
+    percentiles = (
+        statistics.quantiles(durations, n=100) if len(durations) > 1 else durations * 99
+    )
+    print(f"{'domains/s':>20}: {len(durations) / elapsed:10.1f}")
+    print(f"{'failed domains':>20}: {failed:10d}")
+    print(f"{'p50 domain latency':>20}: {percentiles[49]:10.3f} s")
+    print(f"{'p99 domain latency':>20}: {percentiles[98]:10.3f} s")
+    print(f"{'peak RSS':>20}: {get_peak_rss():10.1f} MB")
+    print(
+        f"{'CPU time':>20}: {cpu_time:10.1f} s ({cpu_time / elapsed:.0%} of wall time)"
+    )
+    print(crawl_metrics.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Micro-benchmark of extraction of contacts from pages
+
+Compares logic.extract_contacts with the plain regex extraction (scanning the whole page by each
+of constants.email_re_pattern, facebook_re_pattern and twitter_re_pattern).
+
+Usage:
+    python -m benchmarks.bench_extraction
+"""
+import argparse
+import timeit
+
+from benchmarks.pages import make_page
+from crawler import utils
+from crawler.constants import (
+    email_re_pattern,
+    facebook_re_pattern,
+    twitter_re_pattern,
+)
+from crawler.logic import extract_contacts, extract_by_re_pattern
+
+
+def extract_contacts_by_re_patterns(page: str) -> tuple[set[str], set[str], set[str]]:
+    """Extraction of contacts as it used to be done - one full regex scan per contact type"""
+    return (
+        set(
+            match[0].lower()
+            for match in email_re_pattern.findall(page)
+            if utils.is_valid_email_domain(match[0])
+        ),
+        extract_by_re_pattern(page, facebook_re_pattern),
+        extract_by_re_pattern(page, twitter_re_pattern),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=10, help="Number of pages")
+    parser.add_argument("--page-size", type=int, default=150_000, help="Page size")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of repetitions")
+    args = parser.parse_args()
+
+    pages = [make_page(seed, args.page_size) for seed in range(args.pages)]
+    for page in pages:
+        assert extract_contacts(page) == extract_contacts_by_re_patterns(page)
+
+    results = {}
+    for name, func in [
+        ("regex scans", extract_contacts_by_re_patterns),
+        ("extract_contacts", extract_contacts),
+    ]:
+        best = min(
+            timeit.repeat(
+                lambda: [func(page) for page in pages], number=1, repeat=args.repeat
+            )
+        )
+        results[name] = best / len(pages) * 1000
+        print(f"{name:>20}: {results[name]:8.3f} ms per page")
+    speedup = results["regex scans"] / results["extract_contacts"]
+    print(f"{'speedup':>20}: {speedup:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
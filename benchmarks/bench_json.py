@@ -0,0 +1,45 @@
+"""Micro-benchmark of decoding of product JSONs
+
+Compares full decoding by JSON backends (see json_backends.JSON_BACKENDS) with targeted decoding
+of title and images only (see json_backends.decode_product_targeted).
+
+Usage:
+    python -m benchmarks.bench_json
+"""
+
+import argparse
+import timeit
+
+from benchmarks.pages import make_product_json
+from crawler.json_backends import JSON_BACKENDS, decode_product_targeted
+from crawler.logic import extract_product_data
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=100, help="Number of products")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of repetitions")
+    args = parser.parse_args()
+
+    decoders = {**JSON_BACKENDS, "targeted": decode_product_targeted}
+    for variant_count in [1, 30, 100]:
+        documents = [
+            make_product_json(seed, variant_count) for seed in range(args.products)
+        ]
+        size = sum(map(len, documents)) // len(documents)
+        print(f"{variant_count} variants ({size // 1024} KB):")
+        for name, decode in decoders.items():
+            best = min(
+                timeit.repeat(
+                    lambda: [
+                        extract_product_data(decode(document)) for document in documents
+                    ],
+                    number=1,
+                    repeat=args.repeat,
+                )
+            )
+            print(f"{name:>20}: {best / len(documents) * 1000:8.3f} ms per product")
+
+
+if __name__ == "__main__":
+    main()
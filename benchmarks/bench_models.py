@@ -0,0 +1,148 @@
+"""Memory benchmark of models of domain data
+
+Compares memory held by data of many domains in plain dataclasses (models before they were slotted),
+slotted models.DomainData and immutable models.CompactDomainData - with and without pool of strings
+shared among domains (see models.domain_data_to_compact). Synthetic domain data repeat some strings
+like real stores do - default social links of themes and errors.
+
+Usage:
+    python -m benchmarks.bench_models --domains 100000
+"""
+
+import argparse
+import gc
+import random
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, Generator
+
+from crawler.models import DomainData, Product, domain_data_to_compact
+
+ERRORS = [
+    "Cannot connect to host",
+    "Time budget of 60 s exceeded",
+    "Too many failed requests",
+]
+
+
+@dataclass
+class PlainProduct:
+    title: str
+    image_url: str
+
+
+@dataclass
+class PlainDomainData:
+    domain: str
+    emails: set[str] = field(default_factory=set)
+    facebooks: set[str] = field(default_factory=set)
+    twitters: set[str] = field(default_factory=set)
+    products: list[PlainProduct] = field(default_factory=list)
+    error: str | None = None
+    crawled_at: float | None = None
+    changed_at: float | None = None
+
+
+def to_plain(domain_data: DomainData) -> PlainDomainData:
+    return PlainDomainData(
+        domain=domain_data.domain,
+        emails=domain_data.emails,
+        facebooks=domain_data.facebooks,
+        twitters=domain_data.twitters,
+        products=[
+            PlainProduct(product.title, product.image_url)
+            for product in domain_data.products
+        ],
+        error=domain_data.error,
+        crawled_at=domain_data.crawled_at,
+        changed_at=domain_data.changed_at,
+    )
+
+
+def social_link(rng: random.Random, site: str, domain: str) -> str:
+    """Link to domain's profile, or default link of the theme"""
+    # strings are built at runtime, so equal strings are distinct objects, like when they are parsed
+    account = "shopify" if rng.random() < 0.3 else domain.split(".")[0]
+    return f"https://www.{site}.com/{account}"
+
+
+def make_domain_data(index: int, product_count: int) -> DomainData:
+    rng = random.Random(index)
+    domain = f"store-{index}.com"
+    products = []
+    for i in range(rng.randint(0, product_count)):
+        image = "no-image" if rng.random() < 0.1 else f"{domain}/products/{i}"
+        products.append(
+            Product(
+                title=f"Product {i} of {domain}",
+                image_url=f"https://cdn.shopify.com/s/files/1/{image}.jpg",
+            )
+        )
+    return DomainData(
+        domain=domain,
+        emails={
+            f"{name}@{domain}"
+            for name in rng.sample(["info", "sales", "support"], rng.randint(0, 3))
+        },
+        facebooks=(
+            {social_link(rng, "facebook", domain)} if rng.random() < 0.7 else set()
+        ),
+        twitters={social_link(rng, "twitter", domain)} if rng.random() < 0.5 else set(),
+        products=products,
+        error=f"{rng.choice(ERRORS)}" if rng.random() < 0.2 else None,
+        crawled_at=1_700_000_000.0 + index,
+        changed_at=1_600_000_000.0 + index,
+    )
+
+
+def measure(
+    convert: Callable[[DomainData], object],
+    domain_data: Generator[DomainData, None, None],
+) -> int:
+    """Return bytes held by converted domain data, source domain data are freed once converted"""
+    gc.collect()
+    tracemalloc.start()
+    models = [convert(data) for data in domain_data]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del models
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--domains", type=int, default=100_000, help="Number of domains"
+    )
+    parser.add_argument(
+        "--products", type=int, default=5, help="Max. number of products of domain"
+    )
+    args = parser.parse_args()
+
+    strings: dict[str, str] = {}
+    variants: dict[str, Callable[[DomainData], object]] = {
+        "dataclass": to_plain,
+        "slotted": lambda domain_data: domain_data,
+        "compact": domain_data_to_compact,
+        "compact + strings": lambda domain_data: domain_data_to_compact(
+            domain_data, strings
+        ),
+    }
+    print(f"{args.domains} domains:")
+    baseline = None
+    for name, convert in variants.items():
+        size = measure(
+            convert,
+            (make_domain_data(i, args.products) for i in range(args.domains)),
+        )
+        baseline = baseline or size
+        print(
+            f"{name:>20}: {size / 1024 ** 2:8.1f} MB {size / args.domains:8.0f} B per domain "
+            f"{size / baseline:6.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
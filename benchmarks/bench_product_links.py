@@ -0,0 +1,43 @@
+"""Micro-benchmark of extraction of product links from collection pages
+
+Compares parser backends of logic.extract_product_links (see parsers.PRODUCT_LINK_PARSERS).
+
+Usage:
+    python -m benchmarks.bench_product_links
+"""
+import argparse
+import timeit
+
+from benchmarks.pages import make_page
+from crawler.constants import DEFAULT_PRODUCT_COUNT
+from crawler.parsers import PRODUCT_LINK_PARSERS, LexborHTMLParser
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=10, help="Number of pages")
+    parser.add_argument("--page-size", type=int, default=150_000, help="Page size")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of repetitions")
+    args = parser.parse_args()
+
+    pages = [make_page(seed, args.page_size) for seed in range(args.pages)]
+    parsers = {
+        name: func
+        for name, func in PRODUCT_LINK_PARSERS.items()
+        if name != "selectolax" or LexborHTMLParser is not None
+    }
+    for product_count in [DEFAULT_PRODUCT_COUNT, args.page_size]:
+        print(f"product count {product_count}:")
+        for name, func in parsers.items():
+            best = min(
+                timeit.repeat(
+                    lambda: [func(page, product_count) for page in pages],
+                    number=1,
+                    repeat=args.repeat,
+                )
+            )
+            print(f"{name:>20}: {best / len(pages) * 1000:8.3f} ms per page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+""" Module containing local HTTPS server emulating Shopify stores for offline benchmarks """
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import ssl
+import subprocess
+import tempfile
+import zlib
+from dataclasses import dataclass
+from multiprocessing.process import BaseProcess
+
+from aiohttp import web
+from aiohttp.abc import AbstractResolver
+from aiohttp.test_utils import unused_port
+
+from benchmarks.pages import make_page, make_product
+
+# number of distinct pages served, generating pages of each store would be too slow
+PAGE_POOL_SIZE = 20
+PRODUCTS_PER_STORE = 20  # stores share the same products
+
+
+@dataclass
+class StoreOptions:
+    """Options of emulated stores"""
+
+    latency: float = (
+        0.05  # mean latency of responses in seconds, the latency is random around it
+    )
+    error_rate: float = 0.0  # probability of 500 response
+    dead_rate: float = 0.0  # probability that store's connections are refused
+    bulk_rate: float = (
+        0.5  # probability that store serves products in bulk (/products.json)
+    )
+    page_size: int = 150_000  # approximate size of HTML pages in characters
+    variant_count: int = (
+        30  # number of variants of each product, they make most of product JSON
+    )
+
+
+def store_domain(index: int) -> str:
+    return f"store-{index}.test"
+
+
+def get_store_traits(host: str, options: StoreOptions) -> tuple[bool, bool]:
+    """
+    Return traits of the store, they are deterministic, so that store behaves the same in each run
+
+    :return: whether the store is dead and whether it serves products in bulk
+    """
+    rng = random.Random(zlib.crc32(host.encode()))
+    return rng.random() < options.dead_rate, rng.random() < options.bulk_rate
+
+
+class MockShopify:
+    """
+    Application emulating any number of Shopify stores, each of them is identified by Host header.
+
+    Store serves homepage and /pages/* with contacts, /collections/all listing its products, products'
+    JSONs (/products/<handle>.json) and, with probability `bulk_rate`, bulk /products.json. Responses
+    are delayed by random latency and fail with probability `error_rate`.
+    """
+
+    def __init__(self, options: StoreOptions):
+        self.options = options
+        handles = [f"product-{i}" for i in range(PRODUCTS_PER_STORE)]
+        self.pages = [
+            make_page(seed, options.page_size) for seed in range(PAGE_POOL_SIZE)
+        ]
+        self.list_pages = [
+            make_page(seed, options.page_size, product_handles=handles)
+            for seed in range(PAGE_POOL_SIZE)
+        ]
+        rng = random.Random(0)
+        self.products = [
+            make_product(rng, handle, options.variant_count)["product"]
+            for handle in handles
+        ]
+        self.product_jsons = [
+            json.dumps({"product": product}) for product in self.products
+        ]
+
+    async def handle(self, request: web.Request) -> web.Response:
+        rng = random.Random()
+        _, has_bulk = get_store_traits(request.host, self.options)
+        await asyncio.sleep(rng.uniform(0.5, 1.5) * self.options.latency)
+        if rng.random() < self.options.error_rate:
+            raise web.HTTPInternalServerError()
+
+        path = request.path
+        page_index = zlib.crc32(f"{request.host}{path}".encode()) % PAGE_POOL_SIZE
+        if path == "/" or path.startswith("/pages/"):
+            return web.Response(text=self.pages[page_index], content_type="text/html")
+        if path == "/collections/all":
+            return web.Response(
+                text=self.list_pages[page_index], content_type="text/html"
+            )
+        if path == "/products.json" and has_bulk:
+            limit = int(request.query.get("limit", PRODUCTS_PER_STORE))
+            return web.json_response({"products": self.products[:limit]})
+        if path.startswith("/products/") and path.endswith(".json"):
+            return web.Response(
+                text=self.product_jsons[page_index % PRODUCTS_PER_STORE],
+                content_type="application/json",
+            )
+        raise web.HTTPNotFound()
+
+
+class MockResolver(AbstractResolver):
+    """Resolver of emulated stores' domains to the mock server, connections to dead stores are refused"""
+
+    def __init__(self, port: int, dead_port: int, options: StoreOptions):
+        self.port = port
+        self.dead_port = dead_port
+        self.options = options
+
+    async def resolve(self, host: str, port: int = 0, family: int = 0) -> list[dict]:
+        is_dead, _ = get_store_traits(host, self.options)
+        return [
+            {
+                "hostname": host,
+                "host": "127.0.0.1",
+                "port": self.dead_port if is_dead else self.port,
+                "family": family,
+                "proto": 0,
+                "flags": 0,
+            }
+        ]
+
+    async def close(self) -> None:
+        pass
+
+
+def create_certificate(directory: str) -> tuple[str, str]:
+    """
+    Create self-signed certificate of the mock server by openssl
+
+    :return: paths to certificate and key
+    """
+    cert_file = os.path.join(directory, "cert.pem")
+    key_file = os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl",
+            "req",
+            "-x509",
+            "-newkey",
+            "rsa:2048",
+            "-nodes",
+            "-days",
+            "1",
+            "-subj",
+            "/CN=localhost",
+            "-keyout",
+            key_file,
+            "-out",
+            cert_file,
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return cert_file, key_file
+
+
+def _serve(options: StoreOptions, ports: multiprocessing.Queue) -> None:
+    async def run() -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            ssl_context.load_cert_chain(*create_certificate(directory))
+        app = web.Application()
+        app.router.add_get("/{path:.*}", MockShopify(options).handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0, ssl_context=ssl_context)
+        await site.start()
+        ports.put(runner.addresses[0][1])
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+class MockShopifyServer:
+    """
+    Mock Shopify server running in separate process, so that it does not compete with the crawler
+    for its event loop (and its CPU time and memory are not measured as crawler's).
+
+    Use `connector_kwargs` to connect client session to the server.
+    """
+
+    def __init__(self, options: StoreOptions):
+        self.options = options
+        self.port = 0
+        self.dead_port = 0
+        self._process: BaseProcess | None = None
+
+    def __enter__(self) -> "MockShopifyServer":
+        context = multiprocessing.get_context("spawn")
+        ports: multiprocessing.Queue = context.Queue()
+        process = context.Process(
+            target=_serve, args=(self.options, ports), daemon=True
+        )
+        process.start()
+        self._process = process
+        self.port = ports.get(timeout=120)
+        # nothing listens on the port, so connections are refused
+        self.dead_port = unused_port()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+
+    @property
+    def connector_kwargs(self) -> dict:
+        """Arguments of aiohttp.TCPConnector, see logic.create_session"""
+        return {
+            "resolver": MockResolver(self.port, self.dead_port, self.options),
+            "ssl": False,
+        }
@@ -0,0 +1,182 @@
+""" Module generating synthetic (but realistic) Shopify store pages and product JSONs for benchmarks """
+import json
+import random
+import string
+
+FONT_URL = "//cdn.shopify.com/s/files/1/0001/t/1/assets/theme.woff2"
+IMAGE_URL = "//cdn.shopify.com/s/files/1/0001/products"
+
+
+def random_word(rng: random.Random, min_length: int = 3, max_length: int = 12) -> str:
+    return "".join(
+        rng.choice(string.ascii_lowercase)
+        for _ in range(rng.randint(min_length, max_length))
+    )
+
+
+def product_grid_item(rng: random.Random, handle: str) -> str:
+    return (
+        '<div class="product-item grid__item small--one-half medium-up--one-quarter">'
+        f'<a href="/products/{handle}" class="grid-product__link">'
+        f'<img srcset="{IMAGE_URL}/{handle}_360x.jpg 360w, {IMAGE_URL}/{handle}@2x.jpg 720w" '
+        f'alt="{handle}"></a>'
+        f'<span class="visually-hidden" data-product-id="{rng.randint(10**9, 10**10)}">'
+        f"{handle}</span></div>\n"
+    )
+
+
+def paragraph(rng: random.Random) -> str:
+    return f"<p>{' '.join(random_word(rng, 2, 9) for _ in range(30))}</p>\n"
+
+
+def contacts(rng: random.Random) -> str:
+    name = random_word(rng)
+    return (
+        f'<a href="https://www.facebook.com/{name}">Facebook</a> '
+        f'<a href="https://twitter.com/{name}">Twitter</a> '
+        f'<a href="mailto:info@{name}.com">info@{name}.com</a>\n'
+    )
+
+
+def make_page(
+    seed: int, size: int = 150_000, product_handles: list[str] | None = None
+) -> str:
+    """
+    Generate HTML page resembling Shopify store page.
+
+    Page contains theme CSS (with @media rules), inline scripts and base64 images, product grid
+    with srcset images (@2x), text and few contacts (emails, facebook and twitter links).
+
+    :param seed: seed of random generator, the same seed gives the same page
+    :param size: approximate size of the page in characters
+    :param product_handles: handles of products listed in the product grid, random if not given
+    :return: HTML page
+    """
+    rng = random.Random(seed)
+    handles = iter(product_handles or [])
+    parts = ["<!doctype html><html><head><style>"]
+    for i in range(40):
+        parts.append(
+            f"@media (min-width: {rng.randint(300, 1200)}px) "
+            f"{{ .grid-product__title-{i} {{ font-size: {rng.randint(10, 20)}px; }} }}\n"
+        )
+    parts.append(f"@font-face {{ font-family: Theme; src: url({FONT_URL}); }}</style>")
+    parts.append(
+        '<script>var theme = {"strings": {"addToCart": "Add to cart"}, '
+        '"moneyFormat": "${{amount}}"};</script></head><body>'
+    )
+    base64_data = "".join(
+        rng.choice(string.ascii_letters + string.digits) for _ in range(3000)
+    )
+    parts.append(f'<img src="data:image/png;base64,{base64_data}">')
+    length = sum(map(len, parts))
+    while length < size:
+        kind = rng.random()
+        if kind < 0.3:
+            handle = next(handles, f"{random_word(rng)}-{rng.randint(1, 999)}")
+            part = product_grid_item(rng, handle)
+        elif kind < 0.6:
+            part = paragraph(rng)
+        elif kind < 0.63:
+            part = contacts(rng)
+        else:
+            part = (
+                f'<span class="visually-hidden {random_word(rng)}">'
+                f"{random_word(rng)}</span>\n"
+            )
+        parts.append(part)
+        length += len(part)
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def make_product(rng: random.Random, handle: str, variant_count: int) -> dict:
+    product_id = rng.randint(10**12, 10**13)
+    timestamp = "2022-05-18T10:17:36+02:00"
+    return {
+        "product": {
+            "id": product_id,
+            "title": " ".join(random_word(rng).capitalize() for _ in range(3)),
+            "body_html": "".join(paragraph(rng) for _ in range(10)),
+            "vendor": random_word(rng),
+            "product_type": random_word(rng),
+            "created_at": timestamp,
+            "handle": handle,
+            "updated_at": timestamp,
+            "published_at": timestamp,
+            "template_suffix": "",
+            "published_scope": "web",
+            "tags": ", ".join(random_word(rng) for _ in range(8)),
+            "variants": [
+                {
+                    "id": rng.randint(10**12, 10**13),
+                    "product_id": product_id,
+                    "title": f"{random_word(rng)} / {random_word(rng)}",
+                    "price": f"{rng.randint(1, 300)}.00",
+                    "sku": random_word(rng).upper(),
+                    "position": position,
+                    "compare_at_price": None,
+                    "fulfillment_service": "manual",
+                    "inventory_management": "shopify",
+                    "option1": random_word(rng),
+                    "option2": random_word(rng),
+                    "option3": None,
+                    "created_at": timestamp,
+                    "updated_at": timestamp,
+                    "taxable": True,
+                    "barcode": str(rng.randint(10**11, 10**12)),
+                    "grams": rng.randint(100, 2000),
+                    "image_id": None,
+                    "weight": rng.random() * 2,
+                    "weight_unit": "kg",
+                    "requires_shipping": True,
+                    "price_currency": "EUR",
+                    "compare_at_price_currency": "",
+                }
+                for position in range(1, variant_count + 1)
+            ],
+            "options": [
+                {
+                    "id": rng.randint(10**12, 10**13),
+                    "product_id": product_id,
+                    "name": random_word(rng),
+                    "position": position,
+                    "values": [random_word(rng) for _ in range(5)],
+                }
+                for position in range(1, 3)
+            ],
+            "images": [
+                {
+                    "id": rng.randint(10**12, 10**13),
+                    "product_id": product_id,
+                    "position": position,
+                    "created_at": timestamp,
+                    "updated_at": timestamp,
+                    "alt": None,
+                    "width": 1200,
+                    "height": 1200,
+                    "src": f"https:{IMAGE_URL}/{handle}_{position}.jpg?v=1652861856",
+                    "variant_ids": [],
+                }
+                for position in range(1, 5)
+            ],
+            "image": {
+                "id": rng.randint(10**12, 10**13),
+                "product_id": product_id,
+                "src": f"https:{IMAGE_URL}/{handle}_1.jpg?v=1652861856",
+            },
+        }
+    }
+
+
+def make_product_json(seed: int, variant_count: int = 30) -> str:
+    """
+    Generate JSON resembling Shopify product JSON (/products/<handle>.json).
+
+    :param seed: seed of random generator, the same seed gives the same JSON
+    :param variant_count: number of product variants, they make most of the JSON
+    :return: product JSON
+    """
+    rng = random.Random(seed)
+    handle = f"{random_word(rng)}-{rng.randint(1, 999)}"
+    return json.dumps(make_product(rng, handle, variant_count))
@@ -0,0 +1,172 @@
+""" Module containing persistent cache of HTTP responses """
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from types import TracebackType
+from typing import Callable, Type, TypeVar
+
+from crawler.constants import DEFAULT_CACHE_MAX_SIZE
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# number of least recently used entries deleted at once when the cache is over its size
+EVICT_BATCH_SIZE = 100
+
+
+@dataclass
+class CacheEntry:
+    """Cached response - either page (body) or redirect (location)"""
+
+    url: str
+    body: str = ""
+    location: str | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+    stored_at: float = 0
+
+    @property
+    def size(self) -> int:
+        return len(self.url) + len(self.body) + len(self.location or "")
+
+    @property
+    def validators(self) -> dict[str, str]:
+        """Headers of conditional request revalidating the entry"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    Cache of responses stored in SQLite database on local disk, so that it survives between crawls.
+
+    Entries are keyed by URL. Least recently used entries are evicted once the total size of
+    entries exceeds `max_size`. Entries are revalidated by conditional requests (see CacheEntry.validators),
+    unless `ttl` is given - entries younger than `ttl` are considered fresh and used without any request.
+
+    Database is accessed by one dedicated thread, so that disk IO does not block the event loop.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        max_size: int = DEFAULT_CACHE_MAX_SIZE,
+        ttl: float | None = None,
+    ):
+        """
+        :param file_path: path to SQLite database, it is created if it does not exist
+        :param max_size: max. total size of entries (roughly in bytes)
+        :param ttl: time (in seconds) for which entries are used without revalidation,
+            None to revalidate them always
+        """
+        logger.info("Caching responses in %s", file_path)
+        self.max_size = max_size
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="response-cache")
+        self._connection = self._executor.submit(self._connect, file_path).result()
+        self._size = self._executor.submit(self._total_size).result()
+
+    @staticmethod
+    def _connect(file_path: str) -> sqlite3.Connection:
+        connection = sqlite3.connect(file_path, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, body TEXT, location TEXT, etag TEXT, last_modified TEXT, "
+            "stored_at REAL, accessed_at REAL, size INTEGER)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+        )
+        return connection
+
+    def _total_size(self) -> int:
+        return self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """Check if entry can be used without revalidation"""
+        return self.ttl is not None and time.time() - entry.stored_at < self.ttl
+
+    async def get(self, url: str) -> CacheEntry | None:
+        """Return cached response of URL or None if it is not cached"""
+        return await self._run(self._get, url)
+
+    def _get(self, url: str) -> CacheEntry | None:
+        row = self._connection.execute(
+            "SELECT body, location, etag, last_modified, stored_at FROM responses WHERE url = ?",
+            (url,),
+        ).fetchone()
+        if row is None:
+            return None
+        self._connection.execute(
+            "UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url)
+        )
+        return CacheEntry(url, *row)
+
+    async def put(self, entry: CacheEntry) -> None:
+        """Store (or replace) response, least recently used entries are evicted if the cache is full"""
+        await self._run(self._put, entry)
+
+    def _put(self, entry: CacheEntry) -> None:
+        old_size = self._connection.execute(
+            "SELECT size FROM responses WHERE url = ?", (entry.url,)
+        ).fetchone()
+        self._connection.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                entry.url,
+                entry.body,
+                entry.location,
+                entry.etag,
+                entry.last_modified,
+                entry.stored_at,
+                time.time(),
+                entry.size,
+            ),
+        )
+        self._size += entry.size - (old_size[0] if old_size else 0)
+        while self._size > self.max_size and self._evict():
+            pass
+
+    def _evict(self) -> bool:
+        """Delete least recently used entries, return False if there is nothing to delete"""
+        rows = self._connection.execute(
+            "SELECT url, size FROM responses ORDER BY accessed_at LIMIT ?",
+            (EVICT_BATCH_SIZE,),
+        ).fetchall()
+        for url, size in rows:
+            if self._size <= self.max_size:
+                break
+            self._connection.execute("DELETE FROM responses WHERE url = ?", (url,))
+            self._size -= size
+        return bool(rows)
+
+    def close(self) -> None:
+        self._executor.submit(self._connection.close).result()
+        self._executor.shutdown()
+
+    def __enter__(self) -> "ResponseCache":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
@@ -0,0 +1,87 @@
+""" Module containing circuit breaker failing requests to dead hosts fast """
+import asyncio
+from typing import Awaitable, TypeVar
+
+import aiohttp
+
+T = TypeVar("T")
+
+
+class HostUnavailableError(aiohttp.ClientError):
+    """Request was not sent because its host is unavailable, see CircuitBreaker"""
+
+
+def is_connection_failure(error: BaseException) -> bool:
+    """Check if the request failed because the host can't be connected (DNS error, refused connection, TLS error)"""
+    return isinstance(error, (aiohttp.ClientConnectorError, aiohttp.ClientSSLError))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of requests to hosts of one domain.
+
+    Once a request to a host fails on connection level (see is_connection_failure), the host is considered
+    dead and remaining requests to it fail immediately, instead of each of them waiting for a timeout.
+    Requests waiting (e.g. for the rate limiter) when the host dies fail immediately too, see wait_while_alive.
+    """
+
+    def __init__(self) -> None:
+        # reasons of failures of dead hosts
+        self.dead_hosts: dict[str, str] = {}
+        # events set once hosts die
+        self._deaths: dict[str, asyncio.Event] = {}
+
+    def check(self, host: str) -> None:
+        """
+        Check if request to the host can be sent
+
+        :raises HostUnavailableError: if the host is dead
+        """
+        if host in self.dead_hosts:
+            raise HostUnavailableError(
+                f"Host {host} is unavailable: {self.dead_hosts[host]}"
+            )
+
+    def record_failure(self, host: str, error: BaseException) -> bool:
+        """
+        Record failed request to the host
+
+        :return: True if the host is dead (the request should not be retried)
+        """
+        if is_connection_failure(error):
+            self.dead_hosts.setdefault(host, str(error))
+            self._get_death(host).set()
+        return host in self.dead_hosts
+
+    async def wait_while_alive(self, host: str, awaitable: Awaitable[T]) -> T:
+        """
+        Wait for the awaitable unless the host dies meanwhile, then the awaitable is cancelled
+
+        :raises HostUnavailableError: if the host is dead or dies while waiting
+        """
+        # the awaitable is wrapped even if the host is already dead, so that it is cancelled (closed) below,
+        # instead of being dropped without being awaited
+        task = asyncio.ensure_future(awaitable)
+        death = asyncio.ensure_future(self._get_death(host).wait())
+        try:
+            if host not in self.dead_hosts:
+                await asyncio.wait([task, death], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            death.cancel()
+            if not task.done():
+                task.cancel()
+                # let the awaitable clean up, e.g. return the token of the rate limiter
+                await asyncio.gather(task, return_exceptions=True)
+        # the host might have died even if the awaitable is done
+        self.check(host)
+        return task.result()
+
+    def _get_death(self, host: str) -> asyncio.Event:
+        return self._deaths.setdefault(host, asyncio.Event())
+
+    @property
+    def error(self) -> str | None:
+        """Description of dead hosts, None if all hosts are alive"""
+        if not self.dead_hosts:
+            return None
+        return "; ".join(self.dead_hosts.values())
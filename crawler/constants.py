@@ -9,16 +9,72 @@ DEFAULT_CONTACT_PATHS = [
     "/pages/contact-us",
 ]
 DEFAULT_PRODUCT_LIST_PATH = "/collections/all"
+# Shopify endpoint listing products' data in one JSON, None to always scrape product list page
+DEFAULT_PRODUCT_BULK_PATH = "/products.json"
 DEFAULT_PRODUCT_COUNT = 5
-DEFAULT_THROTTLE_DELAY = 1  # seconds
+DEFAULT_THROTTLE_DELAY = 1  # seconds, average delay between requests to the same host
+DEFAULT_BURST = 1  # max. number of requests to the same host sent at once, regardless of throttling
+DEFAULT_MAX_REQUESTS_PER_HOST = 2  # max. number of requests to the same host in flight
+DEFAULT_CONCURRENCY = 100  # max. number of domains crawled at the same time
+DEFAULT_PARSE_WORKERS = 0  # processes parsing pages, 0 means parsing in the main process
+# remaining contact pages are not fetched once enough contacts are found, see logic.has_enough_contacts
+DEFAULT_STOP_WHEN_COMPLETE = True  # stop once email, facebook and twitter are found
+DEFAULT_STOP_AFTER_EMAILS = 0  # stop once this number of emails is found, 0 means not to stop
 
-HTTP_TIMEOUT = 5  # Timeout of http request for given URL in seconds
+# streaming of input and output files
+READ_BATCH_SIZE = 100  # number of input rows read at once
+FLUSH_EVERY = 100  # output is flushed after this number of rows...
+FLUSH_INTERVAL = 5  # ... or after this number of seconds, whatever comes first
+PARQUET_ROW_GROUP_SIZE = 10_000  # rows of Parquet output written at once
+DEFAULT_PROGRESS_INTERVAL = 10  # seconds between progress reports, 0 to disable them
+DEFAULT_WORKERS = 1  # crawling processes, each of them crawls its shard of domains
+DEFAULT_QUEUE_LEASE_TIME = 300  # seconds after which domain leased by (crashed) worker is leased again
+DEFAULT_QUEUE_MAX_ATTEMPTS = 3  # max. number of leases of one domain
+DEFAULT_QUEUE_POLL_INTERVAL = 5  # seconds between polls of empty work queue
+QUEUE_LEASE_BATCH_SIZE = 10  # max. number of domains leased at once
+
+# incremental crawl, see incremental.IncrementalCrawl
+DEFAULT_FRESH_FOR = 0  # seconds, domains crawled (successfully) more recently by previous runs are not crawled again
+DEFAULT_MAX_RECRAWLS = 0  # max. number of domains crawled, the most stale ones first, 0 means unlimited
+
+# persistent cache of responses, see cache.ResponseCache
+DEFAULT_CACHE_MAX_SIZE = 1024 * 1024 * 1024  # bytes
+DEFAULT_CACHE_TTL = 0  # seconds for which cached pages are used without revalidation, 0 to always revalidate
+
+# timeouts (in seconds) of http request for given URL, 0 means no timeout
+# opening of connection to host incl. TLS handshake, but not DNS resolution (limited by request timeout only)
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 5  # max. pause between received chunks of response
+DEFAULT_REQUEST_TIMEOUT = 15  # whole request, incl. waiting for connection from the pool and reading of the body
+# wall-clock budget of crawling of one domain (in seconds), partial data are returned when it runs out
+DEFAULT_DOMAIN_TIMEOUT = 60  # 0 means no limit
+# retrying of requests failed by temporary errors, see retry.RetryPolicy
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_RETRY_BACKOFF = 1  # seconds, max. delay before the first retry, it doubles with each retry
+DEFAULT_RETRY_BACKOFF_MAX = 30  # seconds, longer delays (e.g. by Retry-After header) are not waited for
+# larger bodies are truncated (the rest is not downloaded), so that huge pages do not blow up memory
+DEFAULT_MAX_BODY_SIZE = 2 * 1024 * 1024  # bytes
+READ_CHUNK_SIZE = 64 * 1024  # bodies are read and decoded by chunks of this size (bytes)
+
+# connection pool shared by all domains of the crawl
+DEFAULT_CONNECTION_LIMIT = 100  # max. number of open connections, 0 means unlimited
+DEFAULT_CONNECTION_LIMIT_PER_HOST = 4  # 0 means unlimited
+DEFAULT_KEEPALIVE_TIMEOUT = 15  # seconds
+DEFAULT_DNS_CACHE_TTL = 300  # seconds
 
 # precompiled regexps for extracting data from pages
 email_re_pattern = re.compile(r"([\w.-]+@([\w-]+\.)+[\w-]{2,})")
 facebook_re_pattern = re.compile(r"((https:\/\/)?(www\.)?facebook\.com\/[\w\.-]+)")
 twitter_re_pattern = re.compile(r"((https:\/\/)?(www\.)?twitter\.com\/[\w\.-]+)")
 
+# Patterns above start with character class or optional group, so regex engine has to try to match
+# them at every position of the page. Patterns bellow start with literal (marker) which is searched
+# for fast, the rest of the match is completed around the marker (see logic.extract_contacts).
+email_domain_re_pattern = re.compile(r"@([\w-]+\.)+[\w-]{2,}")
+facebook_link_re_pattern = re.compile(r"facebook\.com\/[\w\.-]+")
+twitter_link_re_pattern = re.compile(r"twitter\.com\/[\w\.-]+")
+SOCIAL_LINK_PREFIXES = ["www.", "https://"]  # optional prefixes in order from the marker
+
 # selectors for extracting the product links
 PRODUCT_SELECTORS = [
     "a.grid-product__link",
@@ -26,4 +82,13 @@ PRODUCT_SELECTORS = [
     ".product-item > a"
     # TODO add more selectors to cover all known cases
 ]
-OUTPUT_HEADER = ["url", "email", "facebook", "twitter"]
+# parser extracting product links, see parsers.get_product_link_parser
+DEFAULT_HTML_PARSER = "auto"
+HTML_PARSERS = ["auto", "streaming", "selectolax", "bs4"]
+# backend decoding JSONs, see json_backends.get_json_backend
+DEFAULT_JSON_BACKEND = "auto"
+JSON_BACKENDS = ["auto", "json", "orjson", "ujson"]
+# decode only needed fields of product JSONs, see json_backends.decode_product_targeted
+DEFAULT_TARGETED_JSON = True
+
+OUTPUT_HEADER = ["url", "email", "facebook", "twitter", "error"]
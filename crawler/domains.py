@@ -0,0 +1,135 @@
+""" Module containing canonicalization and deduplication of input domains """
+import os
+import sqlite3
+import tempfile
+from abc import ABC, abstractmethod
+from types import TracebackType
+from typing import Type
+from urllib.parse import urlsplit
+
+
+def canonicalize_domain(value: str) -> str:
+    """
+    Return canonical form of domain given by input value - lowercase IDNA (punycode) host name
+    without scheme, credentials, port, path and trailing dot, e.g. https://www.Sufio.com/contact -> www.sufio.com
+
+    :param value: domain or URL
+    :raises ValueError: if the value does not contain valid host name
+    """
+    value = value.strip()
+    if "://" not in value and not value.startswith("//"):
+        # without scheme (or network location prefix) the host name would be parsed as path
+        value = f"//{value}"
+    host = (urlsplit(value).hostname or "").rstrip(".")
+    if not host:
+        raise ValueError("Missing host name")
+    # UnicodeError (raised for empty or too long labels) is ValueError
+    return host.encode("idna").decode("ascii")
+
+
+def get_domain_key(domain: str) -> str:
+    """
+    Return key of canonical domain for deduplication - domain without "www." prefix, so that variants
+    of the same store are crawled once. The domain itself is crawled, some stores are not served without "www.".
+    """
+    if domain.startswith("www.") and domain.count(".") > 1:
+        return domain[len("www.") :]
+    return domain
+
+
+class DomainSet(ABC):
+    """Set of domains seen by streamed deduplication, domains with the same key are duplicates"""
+
+    @abstractmethod
+    def add(self, domain: str, key: str | None = None) -> bool:
+        """
+        Add domain to the set
+
+        :param key: key of the domain, the domain itself if not given
+        :return: True if no domain with the key was in the set yet
+        """
+
+    @abstractmethod
+    def get(self, key: str) -> str | None:
+        """Return the first domain added with the key, None if there is none"""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Release resources"""
+
+    def __enter__(self) -> "DomainSet":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+class MemoryDomainSet(DomainSet):
+    """Set of domains held in memory"""
+
+    def __init__(self) -> None:
+        # key -> the first domain added with the key
+        self._domains: dict[str, str] = {}
+
+    def add(self, domain: str, key: str | None = None) -> bool:
+        key = domain if key is None else key
+        if key in self._domains:
+            return False
+        self._domains[key] = domain
+        return True
+
+    def get(self, key: str) -> str | None:
+        return self._domains.get(key)
+
+    def close(self) -> None:
+        self._domains.clear()
+
+
+class SqliteDomainSet(DomainSet):
+    """
+    Set of domains stored in temporary SQLite database, for inputs whose domains do not fit in memory.
+
+    Unlike probabilistic structures (e.g. bloom filter) the set is exact, so no domain is skipped by mistake.
+    Database is scratch data deleted on close, therefore it is neither journaled nor committed.
+    """
+
+    def __init__(self, directory: str | None = None):
+        """
+        :param directory: directory of the temporary database, system's temporary directory if not given
+        """
+        self._directory = tempfile.TemporaryDirectory(prefix="domains-", dir=directory)
+        self._connection = sqlite3.connect(
+            os.path.join(self._directory.name, "domains.sqlite")
+        )
+        self._connection.execute("PRAGMA journal_mode=OFF")
+        self._connection.execute("PRAGMA synchronous=OFF")
+        self._connection.execute(
+            "CREATE TABLE domains (key TEXT PRIMARY KEY, domain TEXT NOT NULL) WITHOUT ROWID"
+        )
+
+    def add(self, domain: str, key: str | None = None) -> bool:
+        cursor = self._connection.execute(
+            "INSERT OR IGNORE INTO domains VALUES (?, ?)",
+            (domain if key is None else key, domain),
+        )
+        return cursor.rowcount == 1
+
+    def get(self, key: str) -> str | None:
+        row = self._connection.execute(
+            "SELECT domain FROM domains WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def close(self) -> None:
+        self._connection.close()
+        self._directory.cleanup()
+
+
+def create_domain_set(on_disk: bool = False) -> DomainSet:
+    """Create set of domains, stored on disk (see SqliteDomainSet) or in memory"""
+    return SqliteDomainSet() if on_disk else MemoryDomainSet()
@@ -0,0 +1,294 @@
+""" Module containing fetching of pages """
+import asyncio
+import copy
+import json
+import logging
+import time
+from contextlib import AsyncExitStack
+from http import HTTPStatus
+from typing import Any, AsyncGenerator, Callable
+from urllib.parse import urlparse, urljoin
+
+import aiohttp
+
+from crawler import utils, retry
+from crawler.cache import CacheEntry, ResponseCache
+from crawler.circuit import CircuitBreaker
+from crawler.constants import DEFAULT_MAX_BODY_SIZE
+from crawler.metrics import crawl_metrics
+from crawler.ratelimit import HostRateLimiter
+from crawler.retry import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+MAX_REDIRECTS = 10
+
+
+class Fetcher:
+    """
+    Fetches pages using shared client session, while respecting per-host rate limits.
+
+    Requests to the same host are throttled by the rate limiter instead of fixed sleeps between
+    requests, so independent requests (e.g. contact pages and products) can overlap.
+    If response cache is given, cached pages are revalidated or used without request, see cache.ResponseCache.
+    Bodies of responses are read incrementally and their size is capped, see utils.read_text.
+    Requests failed by temporary errors are retried, see retry.RetryPolicy. Requests to hosts which can't
+    be connected fail fast, see circuit.CircuitBreaker.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        rate_limiter: HostRateLimiter,
+        cache: ResponseCache | None = None,
+        max_body_size: int = DEFAULT_MAX_BODY_SIZE,
+        json_loads: Callable[[str], Any] = json.loads,
+        retry_policy: RetryPolicy | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+    ):
+        self.session = session
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.max_body_size = max_body_size
+        self.json_loads = json_loads
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=0)
+        self.circuit_breaker = circuit_breaker
+
+    def with_circuit_breaker(self, circuit_breaker: CircuitBreaker) -> "Fetcher":
+        """Return fetcher sharing everything with this one, except of given circuit breaker"""
+        fetcher = copy.copy(self)
+        fetcher.circuit_breaker = circuit_breaker
+        return fetcher
+
+    async def get_page(
+        self,
+        url: str,
+        as_json=False,
+        seen_urls: set[str] | None = None,
+        should_stop: Callable[[], bool] | None = None,
+        feed: Callable[[str], bool] | None = None,
+    ) -> dict | str | None:
+        """
+        Return content of page
+
+        Redirects are followed one by one, so that each request is subject to rate limiting.
+        Body larger than max_body_size is truncated, see utils.read_text.
+
+        :param url: URL from which page should be fetched
+        :param as_json: if True result is returned as JSON dict. Page content as string is returned otherwise.
+        :param seen_urls: URLs (incl. redirect targets) already requested by the caller. If the URL
+            or a redirect leads to one of them, it is not requested again and None is returned.
+            Requested URLs are added to the set.
+        :param should_stop: called before each request, None is returned instead of the request if it returns True
+        :param feed: consumer of the page's text as it is downloaded, see utils.read_text. Download is stopped
+            once it returns True, the returned page is incomplete then.
+        :raises aiohttp.ClientError, asyncio.TimeoutError: if the page can't be fetched
+        :raises ValueError: if the page is not valid JSON
+        """
+        redirect_chain: set[str] = set()
+        for _ in range(MAX_REDIRECTS + 1):
+            if url in redirect_chain:
+                raise aiohttp.ClientError(f"Redirect loop at {url}")
+            if seen_urls is not None:
+                if url in seen_urls:
+                    logger.debug("Skipping already requested page %s", url)
+                    return None
+                seen_urls.add(url)
+            redirect_chain.add(url)
+            entry = await self._get_response(url, should_stop, feed)
+            if entry is None:
+                return None
+            if entry.location is None:
+                return self.json_loads(entry.body) if as_json else entry.body
+            url = entry.location
+        raise aiohttp.ClientError(f"Too many redirects of {url}")
+
+    async def _get_response(
+        self,
+        url: str,
+        should_stop: Callable[[], bool] | None,
+        feed: Callable[[str], bool] | None,
+    ) -> CacheEntry | None:
+        """Get response of one request (without following redirects) or from the cache, see get_page"""
+        cached = await self.cache.get(url) if self.cache is not None else None
+        if (
+            cached is not None
+            and self.cache is not None
+            and self.cache.is_fresh(cached)
+        ):
+            logger.debug("Using cached page %s", url)
+            if feed is not None:
+                feed(cached.body)
+            return cached
+        response = await self._request_with_retries(url, cached, should_stop, feed)
+        if response is None:
+            return None
+        entry, complete = response
+        # incomplete bodies are not cached, they would be used instead of the whole page later
+        if self.cache is not None and complete:
+            await self.cache.put(entry)
+        return entry
+
+    async def _request_with_retries(
+        self,
+        url: str,
+        cached: CacheEntry | None,
+        should_stop: Callable[[], bool] | None,
+        feed: Callable[[str], bool] | None,
+    ) -> tuple[CacheEntry, bool] | None:
+        """
+        Request page within limits of the rate limiter, failed request is retried according to the retry policy
+
+        Outcome of each request is reported to the rate limiter, so that it adapts rate of requests to the host,
+        and to the circuit breaker (if any), so that requests to dead host fail fast.
+        Request is not retried if part of its body was already fed to `feed`.
+        """
+        host = urlparse(url).netloc
+        fed = False
+        circuit_breaker = self.circuit_breaker or CircuitBreaker()
+
+        def feed_once(chunk: str) -> bool:
+            nonlocal fed
+            fed = True
+            return feed(chunk) if feed is not None else False
+
+        attempt = 0
+        while True:
+            try:
+                async with AsyncExitStack() as stack:
+                    # waiting for the rate limiter ends as soon as the host dies
+                    await circuit_breaker.wait_while_alive(
+                        host, stack.enter_async_context(self.rate_limiter.acquire(host))
+                    )
+                    if should_stop is not None and should_stop():
+                        return None
+                    response = await self._request(
+                        url, cached, feed_once if feed is not None else None
+                    )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if retry.is_throttling(e):
+                    # pause of the host is capped like delays of retries, requests waiting for the host
+                    # would not fit in the domain's time budget otherwise
+                    retry_after = retry.get_retry_after(e)
+                    self.rate_limiter.slow_down(
+                        host,
+                        (
+                            min(retry_after, self.retry_policy.backoff_max)
+                            if retry_after is not None
+                            else None
+                        ),
+                    )
+                delay = self.retry_policy.get_delay(e, attempt) if not fed else None
+                if circuit_breaker.record_failure(host, e) or delay is None:
+                    raise
+                logger.debug(
+                    "Getting page %s failed: %s, retrying in %.1f s", url, e, delay
+                )
+                await circuit_breaker.wait_while_alive(host, asyncio.sleep(delay))
+                attempt += 1
+                continue
+            self.rate_limiter.speed_up(host)
+            return response
+
+    async def _request(
+        self,
+        url: str,
+        cached: CacheEntry | None,
+        feed: Callable[[str], bool] | None,
+    ) -> tuple[CacheEntry, bool]:
+        """
+        Request page, conditionally if it is cached
+
+        Duration of the request, its status and size of its body are recorded to crawl metrics.
+
+        :return: response (the cached one if it is not modified) and whether its body is complete
+        """
+        headers = cached.validators if cached is not None else {}
+        with crawl_metrics.timer("fetch"):
+            async with self.session.get(
+                url, allow_redirects=False, headers=headers
+            ) as response:
+                crawl_metrics.count_response(response.status)
+                try:
+                    return await self._handle_response(url, response, cached, feed)
+                finally:
+                    crawl_metrics.add_downloaded_bytes(response.content.total_bytes)
+
+    async def _handle_response(
+        self,
+        url: str,
+        response: aiohttp.ClientResponse,
+        cached: CacheEntry | None,
+        feed: Callable[[str], bool] | None,
+    ) -> tuple[CacheEntry, bool]:
+        """Read response of the request, see _request"""
+        logger.debug("Getting page %s, response - %d", url, response.status)
+        if response.status == HTTPStatus.NOT_MODIFIED and cached is not None:
+            cached.stored_at = time.time()
+            if feed is not None:
+                feed(cached.body)
+            return cached, True
+        if (
+            response.status in utils.REDIRECT_STATUSES
+            and "Location" in response.headers
+        ):
+            location = urljoin(url, response.headers["Location"])
+            return CacheEntry(url, location=location, stored_at=time.time()), True
+        response.raise_for_status()
+        body = await utils.read_text(response, self.max_body_size, feed)
+        entry = CacheEntry(
+            url,
+            body=body.text,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            stored_at=time.time(),
+        )
+        return entry, body.complete
+
+    async def get_page_or_none(
+        self, url: str, as_json=False, **kwargs
+    ) -> dict | str | None:
+        """Return content of page or None if it can't be fetched, see get_page"""
+        try:
+            return await self.get_page(url, as_json, **kwargs)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.debug("Getting page %s failed: %s", url, e)
+            return None
+
+    async def get_pages(
+        self,
+        urls: list[str],
+        as_json=False,
+        should_stop: Callable[[], bool] | None = None,
+    ) -> AsyncGenerator[str | dict, None]:
+        """
+        Generator of contents of successfully fetched pages.
+
+        Pages are fetched concurrently (as far as rate limiter allows) and yielded in order of completion.
+        Pages redirecting to already requested URL are fetched only once.
+
+        :param urls: URLs of pages
+        :param as_json: if True pages are returned as JSON dicts
+        :param should_stop: predicate checked before each request and after each yielded page,
+            e.g. whether the consumer has got enough data. Remaining pages are not fetched once it returns True.
+        """
+        seen_urls: set[str] = set()
+        tasks = [
+            asyncio.create_task(
+                self.get_page_or_none(
+                    url, as_json, seen_urls=seen_urls, should_stop=should_stop
+                )
+            )
+            for url in urls
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                page = await next_done
+                if page is not None:
+                    yield page
+                if should_stop is not None and should_stop():
+                    return
+        finally:
+            # consumer might stop iterating before all pages are fetched
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,232 @@
+""" Module containing incremental crawl - re-crawl of domains diffed against the previous run """
+import copy
+import logging
+import time
+from dataclasses import dataclass
+from typing import Iterable
+
+from crawler.constants import DEFAULT_FRESH_FOR, DEFAULT_MAX_RECRAWLS
+from crawler.models import (
+    CompactDomainData,
+    DomainData,
+    domain_data_from_compact,
+    domain_data_to_compact,
+)
+from crawler.sharding import Shard, is_in_shard
+from crawler.sinks import Sink, read_json_lines
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChangeSummary:
+    """Numbers of domains of incremental crawl by their change since the previous run"""
+
+    new: int = 0  # crawled domains which were not crawled by the previous run
+    changed: int = 0
+    unchanged: int = 0
+    # crawled domains with error, they are counted as new, changed or unchanged too (unless their crawl raised)
+    failed: int = 0
+    fresh: int = 0  # domains not crawled, because they were crawled recently
+    deferred: int = 0  # domains not crawled, because of the limit of crawled domains
+
+    def __str__(self) -> str:
+        crawled = self.new + self.changed + self.unchanged
+        return (
+            f"crawled {crawled} domains (new {self.new}, changed {self.changed}, unchanged {self.unchanged}, "
+            f"failed {self.failed}), skipped {self.fresh} fresh and {self.deferred} deferred domains"
+        )
+
+
+def get_recrawl_priority(
+    previous: DomainData | CompactDomainData | None,
+) -> tuple[int, float]:
+    """
+    Return priority of domain's re-crawl, domains with lower priority are crawled first.
+
+    New domains go first, then domains whose previous crawl failed, domains whose data were changed
+    by their last crawl and finally the rest. The most stale domains go first within each group.
+
+    :param previous: domain's data crawled by the previous run, None for new domain
+    """
+    if previous is None:
+        return 0, 0
+    if previous.error:
+        group = 1
+    elif previous.changed_at is not None and previous.changed_at == previous.crawled_at:
+        group = 2
+    else:
+        group = 3
+    return group, previous.crawled_at or 0
+
+
+class IncrementalCrawl:
+    """
+    Incremental crawl - domains are re-crawled by priority (see get_recrawl_priority) and their data are
+    compared with data of the previous run, so that only changed data can be written to output (see ChangesSink).
+
+    Domains successfully crawled within `fresh_for` seconds are not crawled again, at most `max_recrawls`
+    domains are crawled (0 means unlimited). Previous data of domains which are not crawled are carried over
+    to the journal of this run, so that the next run is diffed against complete data.
+    """
+
+    def __init__(
+        self,
+        previous: Iterable[DomainData],
+        fresh_for: float = DEFAULT_FRESH_FOR,
+        max_recrawls: int = DEFAULT_MAX_RECRAWLS,
+    ):
+        """
+        :param previous: data crawled by the previous run, later data of the same domain override earlier ones
+        :param fresh_for: seconds for which crawled data are not crawled again
+        :param max_recrawls: max. number of crawled domains, 0 means unlimited
+        """
+        # data of all previously crawled domains are held in memory, therefore in compact form
+        strings: dict[str, str] = {}
+        self.previous = {
+            domain_data.domain: domain_data_to_compact(domain_data, strings)
+            for domain_data in previous
+        }
+        self.fresh_for = fresh_for
+        self.max_recrawls = max_recrawls
+        self.summary = ChangeSummary()
+
+    @classmethod
+    def from_journals(cls, journal_files: list[str], **kwargs) -> "IncrementalCrawl":
+        """
+        Create incremental crawl diffed against the previous run recorded in its journal(s)
+
+        :param journal_files: journals of the previous run (one per shard of sharded crawl), later records
+            of the same domain override earlier ones
+        :param kwargs: see IncrementalCrawl
+        """
+        incremental = cls(
+            (
+                domain_data
+                for journal_file in journal_files
+                for domain_data in read_json_lines(journal_file)
+            ),
+            **kwargs,
+        )
+        logger.info(
+            "Loaded data of %d previously crawled domains", len(incremental.previous)
+        )
+        return incremental
+
+    def for_shard(self, shard: Shard) -> "IncrementalCrawl":
+        """Return incremental crawl of the shard's domains, with previous data of those domains only"""
+        incremental = copy.copy(self)
+        incremental.previous = {
+            domain: previous
+            for domain, previous in self.previous.items()
+            if is_in_shard(domain, shard)
+        }
+        incremental.summary = ChangeSummary()
+        return incremental
+
+    def is_fresh(self, previous: CompactDomainData, now: float) -> bool:
+        """Check if previous data are recent enough not to be crawled again"""
+        return (
+            not previous.error
+            and previous.crawled_at is not None
+            and now - previous.crawled_at < self.fresh_for
+        )
+
+    def plan(
+        self, domains: Iterable[str], now: float | None = None
+    ) -> tuple[list[str], list[DomainData]]:
+        """
+        Plan which domains are crawled
+
+        :param domains: all domains of this run
+        :param now: current unix time
+        :return: domains to be crawled ordered by priority and previous data of domains which are not crawled
+        """
+        now = time.time() if now is None else now
+        to_crawl = []
+        carried_over = []
+        for domain in domains:
+            previous = self.previous.get(domain)
+            if previous is not None and self.is_fresh(previous, now):
+                carried_over.append(domain_data_from_compact(previous))
+                self.summary.fresh += 1
+            else:
+                to_crawl.append(domain)
+
+        to_crawl.sort(
+            key=lambda domain: get_recrawl_priority(self.previous.get(domain))
+        )
+        if self.max_recrawls and len(to_crawl) > self.max_recrawls:
+            deferred = to_crawl[self.max_recrawls :]
+            to_crawl = to_crawl[: self.max_recrawls]
+            carried_over.extend(
+                domain_data_from_compact(self.previous[domain])
+                for domain in deferred
+                if domain in self.previous
+            )
+            self.summary.deferred += len(deferred)
+        return to_crawl, carried_over
+
+    def record(self, domain_data: DomainData) -> bool:
+        """
+        Compare crawled domain data with the previous ones, set their changed_at and count them in summary
+
+        :return: True if domain's data changed or domain is new
+        """
+        previous = self.previous.get(domain_data.domain)
+        if (
+            previous is not None
+            and previous.crawled_at is not None
+            and domain_data.crawled_at == previous.crawled_at
+        ):
+            # previous data carried over to the journal (e.g. of failed domain), when the journal is replayed
+            return False
+        if domain_data.error:
+            self.summary.failed += 1
+        if previous is None:
+            self.summary.new += 1
+        elif previous == domain_data_to_compact(domain_data):
+            self.summary.unchanged += 1
+            domain_data.changed_at = previous.changed_at
+            return False
+        else:
+            self.summary.changed += 1
+        domain_data.changed_at = domain_data.crawled_at
+        return True
+
+    def record_error(self, domain: str, error: Exception) -> DomainData | None:
+        """
+        Count domain whose crawl raised in summary
+
+        :return: domain's previous data with the error, so that they are carried over to the journal and
+            the domain keeps priority of previously failed domain, None for new domain
+        """
+        self.summary.failed += 1
+        previous = self.previous.get(domain)
+        if previous is None:
+            return None
+        domain_data = domain_data_from_compact(previous)
+        domain_data.error = str(error) or type(error).__name__
+        return domain_data
+
+
+class ChangesSink(Sink):
+    """
+    Sink writing only domain data changed since the previous run to the wrapped sink, see IncrementalCrawl.record.
+
+    It sets changed_at of written domain data, therefore it must precede sinks recording them (e.g. journal).
+    """
+
+    def __init__(self, sink: Sink, incremental: IncrementalCrawl):
+        self.sink = sink
+        self.incremental = incremental
+
+    def write(self, domain_data: DomainData) -> None:
+        if self.incremental.record(domain_data):
+            self.sink.write(domain_data)
+
+    def flush(self) -> None:
+        self.sink.flush()
+
+    def close(self) -> None:
+        self.sink.close()
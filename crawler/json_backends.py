@@ -0,0 +1,102 @@
+""" Module containing JSON decoding backends and targeted decoding of product JSONs """
+import json
+import re
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None  # type: ignore
+
+try:
+    import ujson
+except ImportError:  # optional dependency
+    ujson = None  # type: ignore
+
+# start of Shopify product JSON - {"product": {
+product_root_re_pattern = re.compile(r'\s*\{\s*"product"\s*:\s*\{\s*')
+# JSON string or bracket, tokens needed to track nesting depth
+json_token_re_pattern = re.compile(r'"(?:[^"\\]|\\.)*"|[{}\[\]]')
+# JSON string can't contain unescaped quote, so these match keys only (values can't be followed by colon)
+title_key_re_pattern = re.compile(r'"title"\s*:\s*')
+images_key_re_pattern = re.compile(r'"images"\s*:\s*')
+
+_decoder = json.JSONDecoder()
+
+JSON_BACKENDS: dict[str, Callable[[str], Any]] = {"json": json.loads}
+if orjson is not None:
+    JSON_BACKENDS["orjson"] = orjson.loads
+if ujson is not None:
+    JSON_BACKENDS["ujson"] = ujson.loads
+
+
+def get_json_backend(name: str) -> Callable[[str], Any]:
+    """
+    Get function decoding JSON by name of the backend.
+
+    :param name: "json" (standard library), "orjson", "ujson" or "auto" - the fastest installed one
+    :return: function taking JSON document and returning decoded object
+    :raises ValueError: if the backend is not installed
+    """
+    if name == "auto":
+        name = next(
+            name for name in ["orjson", "ujson", "json"] if name in JSON_BACKENDS
+        )
+    if name not in JSON_BACKENDS:
+        raise ValueError(f"JSON backend {name} is not installed")
+    return JSON_BACKENDS[name]
+
+
+def _nesting_depth(document: str, start: int, end: int) -> tuple[int, int]:
+    """
+    Return nesting depth at `end` relative to `start` and minimal depth between them.
+
+    Both positions have to be outside of JSON strings.
+    """
+    depth = min_depth = 0
+    for token in json_token_re_pattern.finditer(document, start, end):
+        char = token.group()[0]
+        if char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            min_depth = min(min_depth, depth)
+    return depth, min_depth
+
+
+def decode_product_targeted(document: str) -> dict | None:
+    """
+    Decode only title and images of Shopify product JSON.
+
+    The rest of the product (variants, body_html, ...) is not decoded (nor validated). Keys are found
+    by regex and it is checked that they are keys of the product object: title (which is at the beginning
+    of Shopify product) by nesting depth of the part before it, images (at the end) by nesting depth of
+    the part after them.
+
+    :param document: product JSON, e.g. {"product": {"id": 1, "title": "...", ..., "images": [...]}}
+    :return: {"product": {"title": ..., "images": [...]}} or None if the document has unexpected structure
+    """
+    root_match = product_root_re_pattern.match(document)
+    if not root_match:
+        return None
+    title_match = title_key_re_pattern.search(document, root_match.end())
+    images_start = document.rfind('"images"')
+    images_match = images_key_re_pattern.match(document, max(images_start, 0))
+    if not title_match or images_start < 0 or not images_match:
+        return None
+    # quote preceded by backslash would be an escaped quote inside of a key
+    if "\\" in (document[title_match.start() - 1], document[images_start - 1]):
+        return None
+    if _nesting_depth(document, root_match.end(), title_match.start()) != (0, 0):
+        return None
+    try:
+        title, _ = _decoder.raw_decode(document, title_match.end())
+        images, images_end = _decoder.raw_decode(document, images_match.end())
+    except ValueError:
+        return None
+    # the rest closes the product and the root object
+    if _nesting_depth(document, images_end, len(document)) != (-2, -2):
+        return None
+    if not isinstance(title, str) or not isinstance(images, list):
+        return None
+    return {"product": {"title": title, "images": images}}
@@ -2,60 +2,127 @@
 import asyncio
 import csv
 import logging
+import multiprocessing
 import re
-from itertools import chain
-from typing import cast, Iterable
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from itertools import chain, islice
+from typing import cast, Iterable, Generator, AsyncGenerator
 
 import aiohttp
-from bs4 import BeautifulSoup
 
-from crawler import utils
+from crawler import utils, parsers, json_backends
+from crawler.cache import ResponseCache
+from crawler.circuit import CircuitBreaker
+from crawler.domains import canonicalize_domain
+from crawler.fetcher import Fetcher
+from crawler.metrics import crawl_metrics, create_trace_config
+from crawler.ratelimit import HostRateLimiter
+from crawler.retry import RetryPolicy
 from crawler.constants import (
-    email_re_pattern,
     OUTPUT_HEADER,
-    HTTP_TIMEOUT,
-    facebook_re_pattern,
-    twitter_re_pattern,
+    email_domain_re_pattern,
+    facebook_link_re_pattern,
+    twitter_link_re_pattern,
+    SOCIAL_LINK_PREFIXES,
+    READ_BATCH_SIZE,
+    DEFAULT_HTML_PARSER,
+    DEFAULT_JSON_BACKEND,
+    DEFAULT_TARGETED_JSON,
     PRODUCT_SELECTORS,
 )
-from crawler.models import Product, DomainData, is_product_empty, Config
+from crawler.models import (
+    Product,
+    DomainData,
+    CompactDomainData,
+    is_product_empty,
+    Config,
+)
 
 logger = logging.getLogger(__name__)
 
 
-def read_domains(file_path: str, input_column: str) -> list[str]:
+def iter_input_values(file_path: str, input_column: str) -> Generator[str, None, None]:
     """
-    Read domains from CSV file
+    Read raw values of input column from CSV file row by row
     :param file_path: path to file
     :param input_column: header (column name) of column containing domains
 
-    :return: list of domains
+    :return: generator of values
     """
     logger.info("Reading domain data from %s", file_path)
     with open(file_path, mode="r") as in_file:
         reader = csv.DictReader(in_file)
-        return [row[input_column] for row in reader]
+        for row in reader:
+            yield row[input_column]
+
+
+def iter_domains(file_path: str, input_column: str) -> Generator[str, None, None]:
+    """
+    Read domains from CSV file row by row, they are canonicalized (see domains.canonicalize_domain)
+    and values which are not valid domains are skipped
+    :param file_path: path to file
+    :param input_column: header (column name) of column containing domains
+
+    :return: generator of domains
+    """
+    for value in iter_input_values(file_path, input_column):
+        try:
+            yield canonicalize_domain(value)
+        except ValueError as e:
+            logger.warning("Skipping invalid domain %r: %s", value, e)
+
+
+def read_domains(file_path: str, input_column: str) -> list[str]:
+    """
+    Read domains from CSV file
+    :param file_path: path to file
+    :param input_column: header (column name) of column containing domains
+
+    :return: list of domains
+    """
+    return list(iter_domains(file_path, input_column))
+
+
+async def stream_domains(
+    file_path: str, input_column: str, batch_size: int = READ_BATCH_SIZE
+) -> AsyncGenerator[str, None]:
+    """
+    Read domains from CSV file lazily, without loading the whole file to memory.
 
+    File is read synchronously, therefore rows are read in batches in executor.
 
-def extract_product_links(page: str, product_count: int) -> list[str]:
+    :param file_path: path to file
+    :param input_column: header (column name) of column containing domains
+    :param batch_size: number of rows read at once
+    :return: async generator of domains
+    """
+    loop = asyncio.get_running_loop()
+    domains = iter_domains(file_path, input_column)
+    try:
+        while batch := await loop.run_in_executor(
+            None, list, islice(domains, batch_size)
+        ):
+            for domain in batch:
+                yield domain
+    finally:
+        domains.close()
+
+
+def extract_product_links(
+    page: str, product_count: int, parser: str = DEFAULT_HTML_PARSER
+) -> list[str]:
     """
     Extract links to products from HTML page
 
     :param page: HTML page
     :param product_count: Number of product links to be extracted
+    :param parser: name of parser backend, see parsers.get_product_link_parser
 
     :return: list of product links
     """
-    soup = BeautifulSoup(page, "html.parser")
-
-    product_link_elements = []
-    for selector in PRODUCT_SELECTORS:
-        product_link_elements = soup.select(selector)[:product_count]
-        # do not try further selectors if some products found
-        if product_link_elements:
-            break
-
-    return [product_link["href"] for product_link in product_link_elements]
+    return parsers.get_product_link_parser(parser)(page, product_count)
 
 
 def extract_product_data(product_dict: dict) -> Product:
@@ -76,19 +143,49 @@ def extract_product_data(product_dict: dict) -> Product:
     )
 
 
-def get_product_json_urls(page: str, domain: str, product_count: int) -> list[str]:
+def decode_product_json(
+    document: str,
+    json_backend: str = DEFAULT_JSON_BACKEND,
+    targeted: bool = DEFAULT_TARGETED_JSON,
+) -> dict:
+    """
+    Decode product JSON, see extract_product_data
+
+    :param document: product JSON
+    :param json_backend: name of JSON backend, see json_backends.get_json_backend
+    :param targeted: if True only fields needed by extract_product_data are decoded (if possible),
+        see json_backends.decode_product_targeted
+    :raises ValueError: if the document is not valid JSON
+    """
+    product_dict = json_backends.decode_product_targeted(document) if targeted else None
+    if product_dict is None:
+        product_dict = json_backends.get_json_backend(json_backend)(document)
+    return product_dict
+
+
+def get_product_json_urls(
+    page: str, domain: str, product_count: int, parser: str = DEFAULT_HTML_PARSER
+) -> list[str]:
     """
     Get urls from given page to products' data in json
 
     :param page: HTML page
     :param domain: domain of the page
     :param product_count: Number of product links to be extracted
+    :param parser: name of parser backend, see parsers.get_product_link_parser
 
     :return: list of URLs to products' JSONs
     """
+    return product_links_to_json_urls(
+        extract_product_links(cast(str, page), product_count, parser), domain
+    )
+
+
+def product_links_to_json_urls(links: list[str], domain: str) -> list[str]:
+    """Convert (possibly relative) links to products to URLs of products' JSONs"""
     return [
         utils.url_to_json_url(utils.convert_to_absolute_url(link, domain))
-        for link in extract_product_links(cast(str, page), product_count)
+        for link in links
     ]
 
 
@@ -97,42 +194,169 @@ def normalize(string: str) -> str:
     return string.lower()
 
 
+def is_email_local_part_char(char: str) -> bool:
+    """Check if character matches [\\w.-] regex"""
+    return char.isalnum() or char in "_.-"
+
+
 def extract_emails(string: str) -> set[str]:
-    """Extract emails from string. Note that duplicates are removed."""
-    return set(
-        normalize(match[0])
-        for match in email_re_pattern.findall(cast(str, string))
-        if utils.is_valid_email_domain(match[0])
+    """
+    Extract emails from string. Note that duplicates are removed.
+
+    Result is the same as of matching constants.email_re_pattern. However, only domain parts
+    (starting with '@') are searched for by regex and local parts are completed by walking back
+    from the '@', which avoids trying to match the pattern at every position of the string.
+    """
+    emails = set()
+    last_end = 0
+    for match in email_domain_re_pattern.finditer(string):
+        start = match.start()
+        while start > last_end and is_email_local_part_char(string[start - 1]):
+            start -= 1
+        if start == match.start():  # empty local part
+            continue
+        email = string[start : match.end()]
+        if utils.is_valid_email_domain(email):
+            emails.add(normalize(email))
+        last_end = match.end()
+    return emails
+
+
+def is_product_dict(product: object) -> bool:
+    """Check if product from JSON listing multiple products has expected format, see extract_product_data"""
+    if not isinstance(product, dict):
+        return False
+    images = product.get("images", [])
+    return isinstance(images, list) and all(isinstance(image, dict) for image in images)
+
+
+def extract_bulk_product_data(
+    products_dict: dict, product_count: int
+) -> list[Product] | None:
+    """
+    Get needed attributes of products from JSON listing multiple products (see Shopify's /products.json)
+
+    :param products_dict: JSON with products
+    :param product_count: number of products to be extracted
+    :return: list of non-empty products, or None if the JSON is not in expected format
+    """
+    products = (
+        products_dict.get("products") if isinstance(products_dict, dict) else None
+    )
+    # endpoint of the same path may be served by sites which are not Shopify stores
+    if not isinstance(products, list) or not all(map(is_product_dict, products)):
+        return None
+    return list(
+        filter(
+            utils.negate(is_product_empty),
+            (extract_product_data({"product": product}) for product in products),
+        )
+    )[:product_count]
+
+
+async def get_bulk_product_data(
+    domain: str, config: Config, fetcher: Fetcher
+) -> list[Product] | None:
+    """
+    Get products attributes from given domain by one request to bulk endpoint
+
+    :return: list of products, or None if bulk endpoint is not available
+    """
+    if config.product_bulk_path is None:
+        return None
+    url = utils.get_url(
+        domain, config.product_bulk_path, query=f"limit={config.product_count}"
     )
+    try:
+        products_json = await fetcher.get_page(url, as_json=True)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        logger.debug("Getting products JSON %s failed: %s", url, e)
+        return None
+    with crawl_metrics.timer("product_json"):
+        products = extract_bulk_product_data(
+            cast(dict, products_json), config.product_count
+        )
+    if products is None:
+        logger.debug("Unexpected format of products JSON %s", url)
+    return products
 
 
-async def get_product_data(
-    domain: str, config: Config, session: aiohttp.ClientSession
-) -> list[Product]:
-    """Get products attributes from given domain"""
+async def get_product_json_urls_from_list_page(
+    domain: str,
+    config: Config,
+    fetcher: Fetcher,
+    executor: Executor | None = None,
+) -> list[str]:
+    """
+    Get URLs of products' JSONs from product list page of given domain
+
+    With streaming parser and no executor the page is scanned as it is downloaded and the download is stopped
+    once enough product links are found. Otherwise the whole page is downloaded and parsed by the parser
+    in the executor, because chunks are fed to the scanner on the event loop.
+    """
     product_list_url = utils.get_url(domain, config.product_list_path)
+    scanner = None
+    if (
+        executor is None
+        and parsers.resolve_parser_name(config.html_parser) == "streaming"
+    ):
+        scanner = parsers.ProductLinkScanner(PRODUCT_SELECTORS, config.product_count)
     try:
-        product_page = await utils.get_page(product_list_url, session)
+        product_page = await fetcher.get_page(
+            product_list_url, feed=scanner.scan if scanner is not None else None
+        )
     except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-        logger.info("Getting products page %s failed: %s", product_list_url, e)
+        logger.debug("Getting products page %s failed: %s", product_list_url, e)
         return []
-    await asyncio.sleep(config.throttle_delay)
-
-    product_urls = get_product_json_urls(
-        cast(str, product_page), domain, config.product_count
-    )
 
-    return list(
-        filter(
-            utils.negate(is_product_empty),
-            [
-                extract_product_data(cast(dict, product_json))
-                async for product_json in utils.get_pages(
-                    product_urls, session, config.throttle_delay, as_json=True
-                )
-            ],
+    with crawl_metrics.timer("parse"):
+        if scanner is not None:
+            scanner.close()
+            return product_links_to_json_urls(scanner.result, domain)
+        return await utils.run_cpu_bound(
+            executor,
+            get_product_json_urls,
+            cast(str, product_page),
+            domain,
+            config.product_count,
+            config.html_parser,
         )
+
+
+async def get_product_data(
+    domain_data: DomainData,
+    config: Config,
+    fetcher: Fetcher,
+    executor: Executor | None = None,
+) -> None:
+    """
+    Get products attributes from domain and add them to domain data
+
+    Products are taken from bulk endpoint (one request), if it fails, product list page is scraped
+    and product JSONs are fetched one by one. Products are added as soon as they are fetched,
+    so that they are not lost if the crawling of the domain is interrupted.
+    """
+    domain = domain_data.domain
+    products = await get_bulk_product_data(domain, config, fetcher)
+    if products is not None:
+        domain_data.products.extend(products)
+        return
+
+    product_urls = await get_product_json_urls_from_list_page(
+        domain, config, fetcher, executor
     )
+    async for product_json in fetcher.get_pages(product_urls):
+        with crawl_metrics.timer("product_json"):
+            try:
+                product_dict = decode_product_json(
+                    cast(str, product_json), config.json_backend, config.targeted_json
+                )
+            except ValueError as e:
+                logger.debug("Invalid product JSON: %s", e)
+                continue
+            product = extract_product_data(product_dict)
+        if not is_product_empty(product):
+            domain_data.products.append(product)
 
 
 def extract_by_re_pattern(string: str, re_pattern: re.Pattern) -> set[str]:
@@ -140,30 +364,206 @@ def extract_by_re_pattern(string: str, re_pattern: re.Pattern) -> set[str]:
     return set(normalize(match[0]) for match in re_pattern.findall(string))
 
 
-async def get_domain_data(domain: str, config: Config) -> DomainData:
+def extract_social_links(string: str, link_re_pattern: re.Pattern) -> set[str]:
+    """
+    Extract and deduplicate links to social network, e.g. facebook.com/sufio
+
+    Pattern should start with the domain of the social network. Optional prefixes (see
+    constants.SOCIAL_LINK_PREFIXES) are prepended to the matched link if they precede it.
+    """
+    links = set()
+    last_end = 0
+    for match in link_re_pattern.finditer(string):
+        start = match.start()
+        for prefix in SOCIAL_LINK_PREFIXES:
+            if start - len(prefix) >= last_end and string.startswith(
+                prefix, start - len(prefix), start
+            ):
+                start -= len(prefix)
+        links.add(normalize(string[start : match.end()]))
+        last_end = match.end()
+    return links
+
+
+def extract_contacts(page: str) -> tuple[set[str], set[str], set[str]]:
+    """
+    Extract contacts from page
+
+    Pattern of each contact is searched for only if its marker is present in the page.
+    See benchmarks/bench_extraction.py for comparison with plain regex extraction.
+
+    :param page: HTML page
+    :return: tuple of sets of emails, facebook links and twitter links
+    """
+    return (
+        extract_emails(page) if "@" in page else set(),
+        extract_social_links(page, facebook_link_re_pattern)
+        if "facebook.com/" in page
+        else set(),
+        extract_social_links(page, twitter_link_re_pattern)
+        if "twitter.com/" in page
+        else set(),
+    )
+
+
+def create_session(config: Config, **connector_kwargs) -> aiohttp.ClientSession:
+    """
+    Create HTTP client session shared by all domains of the crawl.
+
+    Connections are pooled (and kept alive) across domains and resolved hosts are cached,
+    so handshakes and DNS lookups are not repeated for every request. Connecting, reading and whole
+    requests have separate timeouts, so that neither hanging nor slowly dripping hosts hold requests long.
+    Durations of DNS resolutions and connecting are recorded to crawl metrics.
+
+    :param config: configuration object, see model.Config
+    :param connector_kwargs: additional arguments of aiohttp.TCPConnector, e.g. resolver
+    :return: client session, caller is responsible for closing it
+    """
+    connector = aiohttp.TCPConnector(
+        limit=config.connection_limit,
+        limit_per_host=config.connection_limit_per_host,
+        keepalive_timeout=config.keepalive_timeout,
+        use_dns_cache=True,
+        ttl_dns_cache=config.dns_cache_ttl,
+        **connector_kwargs,
+    )
+    # sock_connect does not cover DNS resolution, but unlike connect it does not cover waiting for
+    # a connection from the pool either, which is long when the connection limit is reached
+    timeout = aiohttp.ClientTimeout(
+        total=config.request_timeout or None,
+        sock_connect=config.connect_timeout or None,
+        sock_read=config.read_timeout or None,
+    )
+    return aiohttp.ClientSession(
+        connector=connector, timeout=timeout, trace_configs=[create_trace_config()]
+    )
+
+
+def create_parse_executor(config: Config) -> ProcessPoolExecutor | None:
+    """
+    Create pool of processes parsing pages and extracting data from them.
+
+    :param config: configuration object, see model.Config
+    :return: process pool, or None if parsing should be done in the main process
+    """
+    if config.parse_workers <= 0:
+        return None
+    # worker processes are spawned, forking process with running event loop and threads is not safe
+    return ProcessPoolExecutor(
+        config.parse_workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def create_cache(config: Config) -> ResponseCache | None:
+    """Create persistent cache of responses, None if it is not configured"""
+    if config.cache_path is None:
+        return None
+    return ResponseCache(
+        config.cache_path,
+        max_size=config.cache_max_size,
+        ttl=config.cache_ttl if config.cache_ttl > 0 else None,
+    )
+
+
+def create_fetcher(
+    config: Config, session: aiohttp.ClientSession, cache: ResponseCache | None = None
+) -> Fetcher:
+    """
+    Create fetcher of pages limiting rate of requests to each host and retrying failed requests.
+
+    :param config: configuration object, see model.Config
+    :param session: aiohttp client session shared by the crawl, see create_session
+    :param cache: persistent cache of responses, see create_cache
+    """
+    return Fetcher(
+        session,
+        HostRateLimiter(
+            rate=1 / config.throttle_delay if config.throttle_delay > 0 else None,
+            burst=config.burst,
+            max_concurrent=config.max_requests_per_host,
+        ),
+        cache,
+        config.max_body_size,
+        json_backends.get_json_backend(config.json_backend),
+        RetryPolicy(max_retries=config.max_retries, backoff=config.retry_backoff),
+    )
+
+
+def has_enough_contacts(domain_data: DomainData, config: Config) -> bool:
+    """Check if enough contacts are found, so that remaining contact pages need not be fetched"""
+    if config.stop_after_emails and len(domain_data.emails) >= config.stop_after_emails:
+        return True
+    return config.stop_when_complete and bool(
+        domain_data.emails and domain_data.facebooks and domain_data.twitters
+    )
+
+
+async def get_contact_data(
+    domain_data: DomainData,
+    config: Config,
+    fetcher: Fetcher,
+    executor: Executor | None = None,
+) -> None:
+    """
+    Get contacts from contact pages of domain and add them to domain data
+
+    Contact pages are fetched in order of config.contact_paths (as far as rate limiter allows), remaining
+    pages are not fetched once enough contacts are found, see has_enough_contacts.
+    """
+    contact_urls = utils.get_urls(domain_data.domain, config.contact_paths)
+    pages = fetcher.get_pages(
+        contact_urls, should_stop=partial(has_enough_contacts, domain_data, config)
+    )
+    async for page in pages:
+        with crawl_metrics.timer("extraction"):
+            emails, facebooks, twitters = await utils.run_cpu_bound(
+                executor, extract_contacts, cast(str, page)
+            )
+        domain_data.emails |= emails
+        domain_data.facebooks |= facebooks
+        domain_data.twitters |= twitters
+
+
+async def get_domain_data(
+    domain: str,
+    config: Config,
+    fetcher: Fetcher,
+    executor: Executor | None = None,
+) -> DomainData:
     """
     Get relevant data for given domain.
 
+    Contact pages and products are fetched concurrently, within the limits of fetcher's rate limiter.
+    Once domain's host can't be connected, its remaining pages are skipped and the reason is recorded
+    in domain data's error. Crawling of the domain is stopped once its time budget (config.domain_timeout)
+    runs out, data crawled so far are returned then.
+
     :param domain: web domain, e.g. sufio.com
     :param config: configuration object, see model.Config
+    :param fetcher: fetcher of pages shared by the crawl, see create_fetcher
+    :param executor: executor running CPU bound parsing and extraction of pages,
+        they are run directly in the event loop if not given
     :return: relevant data from given domain, see model.Domain
     """
     try:
-        logger.info("Getting domain data for %s", domain)
-        domain_data = DomainData(domain)
-        contact_urls = utils.get_urls(domain, config.contact_paths)
-        async with aiohttp.ClientSession(read_timeout=HTTP_TIMEOUT) as session:
-            async for page in utils.get_pages(
-                contact_urls, session, config.throttle_delay
-            ):
-                page = cast(str, page)
-                domain_data.emails |= extract_emails(page)
-                domain_data.facebooks |= extract_by_re_pattern(
-                    page, facebook_re_pattern
-                )
-                domain_data.twitters |= extract_by_re_pattern(page, twitter_re_pattern)
-
-            domain_data.products = await get_product_data(domain, config, session)
+        logger.debug("Getting domain data for %s", domain)
+        domain_data = DomainData(domain, crawled_at=time.time())
+        circuit_breaker = CircuitBreaker()
+        fetcher = fetcher.with_circuit_breaker(circuit_breaker)
+        with crawl_metrics.domain_in_flight():
+            finished = await utils.run_with_timeout(
+                # failure of one stage cancels the other one, so that it does not request failed domain
+                utils.gather_or_cancel(
+                    get_contact_data(domain_data, config, fetcher, executor),
+                    get_product_data(domain_data, config, fetcher, executor),
+                ),
+                config.domain_timeout or None,
+            )
+        errors = [circuit_breaker.error]
+        if not finished:
+            logger.info("Time budget of %s exceeded, its data are partial", domain)
+            errors.insert(0, f"Time budget of {config.domain_timeout} s exceeded")
+        domain_data.error = "; ".join(filter(None, errors)) or None
 
         logger.debug("Got domain data for %s: %s", domain, domain_data)
         return domain_data
@@ -184,13 +584,14 @@ def iterable_to_cell(iterable: Iterable) -> str:
     return ", ".join(iterable)
 
 
-def domain_data_to_row(domain_data: DomainData) -> chain:
+def domain_data_to_row(domain_data: DomainData | CompactDomainData) -> chain:
     return chain(
         [
             domain_data.domain,
             iterable_to_cell(domain_data.emails),
             iterable_to_cell(domain_data.facebooks),
             iterable_to_cell(domain_data.twitters),
+            domain_data.error or "",
         ],
         *([product.title, product.image_url] for product in domain_data.products),
     )
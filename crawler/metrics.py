@@ -0,0 +1,223 @@
+""" Module containing metrics of the crawl - counters and latency histograms of its stages """
+import asyncio
+import bisect
+import time
+from collections import Counter
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Generator
+
+import aiohttp
+from aiohttp import web
+
+# upper bounds (in seconds) of buckets of latency histograms
+LATENCY_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+class Histogram:
+    """Histogram of observed values with fixed buckets, see LATENCY_BUCKETS"""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # number of values in each bucket (not cumulative), the last bucket is +Inf
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate q-quantile (0 <= q <= 1) by upper bound of its bucket, max. value in the +Inf bucket"""
+        rank = q * self.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, self.bucket_counts):
+            cumulative += bucket_count
+            if cumulative >= rank and cumulative > 0:
+                return min(bound, self.max)
+        return self.max
+
+
+class Metrics:
+    """
+    Metrics of the crawl.
+
+    Stages are timed by latency histograms (see timer): dns and connect (recorded by trace config of client
+    session, see create_trace_config), fetch (whole request incl. reading of the body), parse (of product list
+    page), extraction (of contacts by regexes), product_json (extraction of products from JSONs), write
+    (of domain data to sinks) and domain (whole crawl of one domain).
+    """
+
+    def __init__(self) -> None:
+        self.stages: dict[str, Histogram] = {}
+        # number of responses by status code, "error" for requests failed without response
+        self.responses: Counter[str] = Counter()
+        self.downloaded_bytes = 0
+        self.domains_in_flight = 0
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record duration of one run of the stage"""
+        if stage not in self.stages:
+            self.stages[stage] = Histogram()
+        self.stages[stage].observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str) -> Generator[None, None, None]:
+        """Context manager recording duration of its block as one run of the stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    @contextmanager
+    def domain_in_flight(self) -> Generator[None, None, None]:
+        """Context manager counting domain as in flight and timing it as domain stage"""
+        self.domains_in_flight += 1
+        try:
+            with self.timer("domain"):
+                yield
+        finally:
+            self.domains_in_flight -= 1
+
+    def count_response(self, status: int | str) -> None:
+        self.responses[str(status)] += 1
+
+    def add_downloaded_bytes(self, size: int) -> None:
+        self.downloaded_bytes += size
+
+    def to_prometheus(self) -> str:
+        """Render metrics in Prometheus text exposition format"""
+        lines = [
+            "# HELP crawler_stage_duration_seconds Duration of crawl stages",
+            "# TYPE crawler_stage_duration_seconds histogram",
+        ]
+        for stage, histogram in sorted(self.stages.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(
+                [*map(str, histogram.buckets), "+Inf"], histogram.bucket_counts
+            ):
+                cumulative += bucket_count
+                lines.append(
+                    f'crawler_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f'crawler_stage_duration_seconds_sum{{stage="{stage}"}} {histogram.sum}'
+            )
+            lines.append(
+                f'crawler_stage_duration_seconds_count{{stage="{stage}"}} {histogram.count}'
+            )
+        lines += [
+            "# HELP crawler_responses_total Responses by status code",
+            "# TYPE crawler_responses_total counter",
+        ]
+        for status, count in sorted(self.responses.items()):
+            lines.append(f'crawler_responses_total{{status="{status}"}} {count}')
+        lines += [
+            "# HELP crawler_downloaded_bytes_total Downloaded bytes of response bodies",
+            "# TYPE crawler_downloaded_bytes_total counter",
+            f"crawler_downloaded_bytes_total {self.downloaded_bytes}",
+            "# HELP crawler_domains_in_flight Domains being crawled",
+            "# TYPE crawler_domains_in_flight gauge",
+            f"crawler_domains_in_flight {self.domains_in_flight}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """Render human readable table of stages, responses and downloaded bytes"""
+        lines = [
+            f"{'stage':<14}{'count':>8}{'total s':>10}{'mean ms':>10}{'p95 ms':>10}{'max ms':>10}"
+        ]
+        for stage, histogram in sorted(self.stages.items()):
+            lines.append(
+                f"{stage:<14}{histogram.count:>8}{histogram.sum:>10.1f}"
+                f"{histogram.sum / histogram.count * 1000:>10.1f}"
+                f"{histogram.quantile(0.95) * 1000:>10.1f}{histogram.max * 1000:>10.1f}"
+            )
+        responses = ", ".join(
+            f"{status}: {count}" for status, count in sorted(self.responses.items())
+        )
+        lines.append(f"responses: {responses or '-'}")
+        lines.append(f"downloaded: {self.downloaded_bytes / 1024 ** 2:.1f} MB")
+        return "\n".join(lines)
+
+
+# metrics of the crawl, recorded by all its components
+crawl_metrics = Metrics()
+
+
+def create_trace_config(metrics: Metrics = crawl_metrics) -> aiohttp.TraceConfig:
+    """Create trace config of client session recording DNS resolution, connecting and failed requests"""
+
+    def timed(stage: str):
+        # connecting includes DNS resolution, so each stage has its own start in the request's context
+        async def on_start(
+            session: aiohttp.ClientSession, context: SimpleNamespace, params: object
+        ) -> None:
+            setattr(context, f"{stage}_start", time.perf_counter())
+
+        async def on_end(
+            session: aiohttp.ClientSession, context: SimpleNamespace, params: object
+        ) -> None:
+            start = getattr(context, f"{stage}_start")
+            metrics.observe(stage, time.perf_counter() - start)
+
+        return on_start, on_end
+
+    async def on_request_exception(
+        session: aiohttp.ClientSession,
+        context: SimpleNamespace,
+        params: aiohttp.TraceRequestExceptionParams,
+    ) -> None:
+        # requests are cancelled once they are not needed, e.g. when enough contacts are found
+        if not isinstance(params.exception, asyncio.CancelledError):
+            metrics.count_response("error")
+
+    trace_config = aiohttp.TraceConfig()
+    on_dns_start, on_dns_end = timed("dns")
+    trace_config.on_dns_resolvehost_start.append(on_dns_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_end)
+    on_connect_start, on_connect_end = timed("connect")
+    trace_config.on_connection_create_start.append(on_connect_start)
+    trace_config.on_connection_create_end.append(on_connect_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+
+async def start_metrics_server(
+    port: int, metrics: Metrics = crawl_metrics, host: str = "127.0.0.1"
+) -> web.AppRunner:
+    """
+    Start HTTP server exposing metrics at /metrics in Prometheus format
+
+    :return: runner of the server, caller is responsible for its cleanup
+    """
+
+    async def get_metrics(request: web.Request) -> web.Response:
+        return web.Response(text=metrics.to_prometheus())
+
+    app = web.Application()
+    app.router.add_get("/metrics", get_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -1,8 +1,34 @@
 """ Module containing models and model related functions. """
 from dataclasses import dataclass, field
 
+from crawler.constants import (
+    DEFAULT_BURST,
+    DEFAULT_MAX_REQUESTS_PER_HOST,
+    DEFAULT_PRODUCT_BULK_PATH,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_PARSE_WORKERS,
+    DEFAULT_STOP_WHEN_COMPLETE,
+    DEFAULT_STOP_AFTER_EMAILS,
+    DEFAULT_HTML_PARSER,
+    DEFAULT_JSON_BACKEND,
+    DEFAULT_TARGETED_JSON,
+    DEFAULT_CONNECTION_LIMIT,
+    DEFAULT_CONNECTION_LIMIT_PER_HOST,
+    DEFAULT_KEEPALIVE_TIMEOUT,
+    DEFAULT_DNS_CACHE_TTL,
+    DEFAULT_CACHE_MAX_SIZE,
+    DEFAULT_CACHE_TTL,
+    DEFAULT_MAX_BODY_SIZE,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_RETRY_BACKOFF,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_DOMAIN_TIMEOUT,
+)
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class Product:
     """ Model containing relevant Product attributes """
 
@@ -14,7 +40,7 @@ def is_product_empty(product: Product) -> bool:
     return not product.title and not product.image_url
 
 
-@dataclass
+@dataclass(slots=True)
 class DomainData:
     """ Model containing relevant Domain data """
 
@@ -23,6 +49,110 @@ class DomainData:
     facebooks: set[str] = field(default_factory=set)
     twitters: set[str] = field(default_factory=set)
     products: list[Product] = field(default_factory=list)
+    error: str | None = None  # why (some of) domain's data could not be crawled
+    # unix times of the crawl and of the last crawl which changed the data (see incremental.IncrementalCrawl),
+    # they are not compared, equal domain data crawled at different times are equal
+    crawled_at: float | None = field(default=None, compare=False)
+    changed_at: float | None = field(default=None, compare=False)
+
+
+@dataclass(slots=True, frozen=True)
+class CompactDomainData:
+    """
+    Immutable model of Domain data with the same fields as DomainData, for holding many of them in memory.
+
+    Contacts are sorted tuples and products a tuple - empty tuple is a shared singleton and tuples are much
+    smaller than sets and lists, which reserve space for their growth.
+    """
+
+    domain: str
+    emails: tuple[str, ...] = ()
+    facebooks: tuple[str, ...] = ()
+    twitters: tuple[str, ...] = ()
+    products: tuple[Product, ...] = ()
+    error: str | None = None
+    crawled_at: float | None = field(default=None, compare=False)
+    changed_at: float | None = field(default=None, compare=False)
+
+
+def domain_data_to_compact(
+    domain_data: DomainData, strings: dict[str, str] | None = None
+) -> CompactDomainData:
+    """
+    Convert domain data to compact domain data
+
+    :param domain_data: domain data
+    :param strings: pool of strings shared by compact domain data - social links and errors repeat among
+        domains (default links of themes...), equal strings are stored once. Other strings are mostly unique,
+        pooling them would cost more memory than it saves
+    """
+    intern = strings.setdefault if strings is not None else _identity
+    return CompactDomainData(
+        domain=domain_data.domain,
+        emails=tuple(sorted(domain_data.emails)),
+        facebooks=tuple(intern(link, link) for link in sorted(domain_data.facebooks)),
+        twitters=tuple(intern(link, link) for link in sorted(domain_data.twitters)),
+        products=tuple(domain_data.products),
+        error=(
+            None
+            if domain_data.error is None
+            else intern(domain_data.error, domain_data.error)
+        ),
+        crawled_at=domain_data.crawled_at,
+        changed_at=domain_data.changed_at,
+    )
+
+
+def domain_data_from_compact(compact: CompactDomainData) -> DomainData:
+    """Inverse function of domain_data_to_compact"""
+    return DomainData(
+        domain=compact.domain,
+        emails=set(compact.emails),
+        facebooks=set(compact.facebooks),
+        twitters=set(compact.twitters),
+        products=list(compact.products),
+        error=compact.error,
+        crawled_at=compact.crawled_at,
+        changed_at=compact.changed_at,
+    )
+
+
+def _identity(value: str, default: str) -> str:
+    return value
+
+
+def domain_data_to_dict(domain_data: DomainData) -> dict:
+    """Convert domain data to JSON serializable dict"""
+    return {
+        "domain": domain_data.domain,
+        "emails": sorted(domain_data.emails),
+        "facebooks": sorted(domain_data.facebooks),
+        "twitters": sorted(domain_data.twitters),
+        "products": [
+            {"title": product.title, "image_url": product.image_url}
+            for product in domain_data.products
+        ],
+        "error": domain_data.error,
+        "crawled_at": domain_data.crawled_at,
+        "changed_at": domain_data.changed_at,
+    }
+
+
+def domain_data_from_dict(domain_data_dict: dict) -> DomainData:
+    """Inverse function of domain_data_to_dict"""
+    return DomainData(
+        domain=domain_data_dict["domain"],
+        emails=set(domain_data_dict.get("emails", [])),
+        facebooks=set(domain_data_dict.get("facebooks", [])),
+        twitters=set(domain_data_dict.get("twitters", [])),
+        products=[
+            Product(title=product["title"], image_url=product["image_url"])
+            for product in domain_data_dict.get("products", [])
+        ],
+        error=domain_data_dict.get("error"),
+        crawled_at=domain_data_dict.get("crawled_at"),
+        changed_at=domain_data_dict.get("changed_at"),
+    )
 
 
 @dataclass
@@ -34,3 +164,27 @@ class Config:
     product_list_path: str
     product_count: int
     throttle_delay: float
+    burst: float = DEFAULT_BURST
+    max_requests_per_host: int = DEFAULT_MAX_REQUESTS_PER_HOST
+    product_bulk_path: str | None = DEFAULT_PRODUCT_BULK_PATH
+    concurrency: int = DEFAULT_CONCURRENCY
+    parse_workers: int = DEFAULT_PARSE_WORKERS
+    stop_when_complete: bool = DEFAULT_STOP_WHEN_COMPLETE
+    stop_after_emails: int = DEFAULT_STOP_AFTER_EMAILS
+    html_parser: str = DEFAULT_HTML_PARSER
+    json_backend: str = DEFAULT_JSON_BACKEND
+    targeted_json: bool = DEFAULT_TARGETED_JSON
+    connection_limit: int = DEFAULT_CONNECTION_LIMIT
+    connection_limit_per_host: int = DEFAULT_CONNECTION_LIMIT_PER_HOST
+    keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT
+    dns_cache_ttl: int = DEFAULT_DNS_CACHE_TTL
+    max_body_size: int = DEFAULT_MAX_BODY_SIZE
+    max_retries: int = DEFAULT_MAX_RETRIES
+    retry_backoff: float = DEFAULT_RETRY_BACKOFF
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT
+    read_timeout: float = DEFAULT_READ_TIMEOUT
+    request_timeout: float = DEFAULT_REQUEST_TIMEOUT
+    domain_timeout: float = DEFAULT_DOMAIN_TIMEOUT
+    cache_path: str | None = None  # response cache is not used if not given
+    cache_max_size: int = DEFAULT_CACHE_MAX_SIZE
+    cache_ttl: float = DEFAULT_CACHE_TTL
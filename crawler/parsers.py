@@ -0,0 +1,259 @@
+""" Module containing parsers extracting product links from HTML pages """
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Callable, NamedTuple
+
+from bs4 import BeautifulSoup
+
+from crawler.constants import PRODUCT_SELECTORS
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # optional dependency
+    LexborHTMLParser = None  # type: ignore
+
+# elements without end tag, they can't contain other elements
+VOID_ELEMENTS = frozenset(
+    [
+        "area",
+        "base",
+        "br",
+        "col",
+        "embed",
+        "hr",
+        "img",
+        "input",
+        "keygen",
+        "link",
+        "meta",
+        "param",
+        "source",
+        "track",
+        "wbr",
+    ]
+)
+
+compound_selector_re_pattern = re.compile(
+    r"(?P<tag>[\w-]+|\*)?(?P<rest>(?:[.#][\w-]+)*)"
+)
+
+
+class Element(NamedTuple):
+    """Element of HTML page as seen by the selector matching"""
+
+    tag: str
+    classes: frozenset[str]
+    id: str | None
+
+
+@dataclass(frozen=True)
+class CompoundSelector:
+    """Selector of single element, e.g. a.grid-product__link"""
+
+    tag: str | None
+    classes: frozenset[str]
+    id: str | None
+
+    @classmethod
+    def parse(cls, selector: str) -> "CompoundSelector":
+        match = compound_selector_re_pattern.fullmatch(selector)
+        if not match or not selector:
+            raise ValueError(f"Unsupported selector {selector}")
+        parts = re.findall(r"[.#][\w-]+", match["rest"])
+        ids = [part[1:] for part in parts if part[0] == "#"]
+        return cls(
+            tag=None if match["tag"] in (None, "*") else match["tag"].lower(),
+            classes=frozenset(part[1:] for part in parts if part[0] == "."),
+            id=ids[0] if ids else None,
+        )
+
+    def matches(self, element: Element) -> bool:
+        return (
+            (self.tag is None or self.tag == element.tag)
+            and self.classes <= element.classes
+            and (self.id is None or self.id == element.id)
+        )
+
+
+class Selector:
+    """
+    Simple CSS selector supporting type, class and id selectors combined by descendant
+    and child combinators, e.g. ".product-grid-item > a" or "div.grid a.grid-product__link"
+    """
+
+    def __init__(self, selector: str):
+        self.selector = selector
+        tokens = selector.replace(">", " > ").split()
+        self.compounds: list[CompoundSelector] = []
+        # combinators[i] joins compounds[i - 1] and compounds[i], combinators[0] is unused
+        self.combinators: list[str] = []
+        combinator = " "
+        for token in tokens:
+            if token == ">":
+                combinator = ">"
+                continue
+            self.compounds.append(CompoundSelector.parse(token))
+            self.combinators.append(combinator)
+            combinator = " "
+        if not self.compounds or combinator == ">":
+            raise ValueError(f"Unsupported selector {selector}")
+
+    def matches(self, stack: list[Element]) -> bool:
+        """Check if the last element of the stack (of open elements) matches the selector"""
+        return self._matches(stack, len(self.compounds) - 1, len(stack) - 1)
+
+    def _matches(self, stack: list[Element], index: int, position: int) -> bool:
+        if not self.compounds[index].matches(stack[position]):
+            return False
+        if index == 0:
+            return True
+        if self.combinators[index] == ">":
+            return position > 0 and self._matches(stack, index - 1, position - 1)
+        return any(
+            self._matches(stack, index - 1, ancestor_position)
+            for ancestor_position in range(position - 1, -1, -1)
+        )
+
+
+class _ScanFinished(Exception):
+    """Raised to stop the parsing once enough links are found"""
+
+
+class ProductLinkScanner(HTMLParser):
+    """
+    Streaming scanner of product links.
+
+    Page (or its chunks, see feed) is scanned without building the element tree, only the stack of
+    open elements is kept. All selectors are matched in one pass. Links of the first selector (in
+    order of priority) with any match are the result, as with the soup.select approach.
+    Scanning stops once the top priority selector matches `product_count` links.
+    """
+
+    def __init__(self, selectors: list[str], product_count: int):
+        super().__init__(convert_charrefs=True)
+        self.selectors = [Selector(selector) for selector in selectors]
+        self.product_count = product_count
+        self.links: list[list[str]] = [[] for _ in self.selectors]
+        self.finished = product_count <= 0
+        self._stack: list[Element] = []
+
+    def feed(self, data: str) -> None:
+        if not self.finished:
+            try:
+                super().feed(data)
+            except _ScanFinished:
+                self.finished = True
+
+    def scan(self, chunk: str) -> bool:
+        """Feed chunk of the page, return True if the scanning is finished (no more chunks are needed)"""
+        self.feed(chunk)
+        return self.finished
+
+    def close(self) -> None:
+        if not self.finished:
+            try:
+                super().close()
+            except _ScanFinished:
+                pass
+        self.finished = True
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        attributes = dict(attrs)
+        element = Element(
+            tag=tag,
+            classes=frozenset((attributes.get("class") or "").split()),
+            id=attributes.get("id"),
+        )
+        self._stack.append(element)
+        href = attributes.get("href")
+        if href is not None:
+            for selector, links in zip(self.selectors, self.links):
+                if len(links) < self.product_count and selector.matches(self._stack):
+                    links.append(href)
+            if len(self.links[0]) >= self.product_count:
+                raise _ScanFinished
+        if tag in VOID_ELEMENTS:
+            self._stack.pop()
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self._stack.pop()
+
+    def handle_endtag(self, tag: str) -> None:
+        # close the most recently opened element of the tag, together with unclosed elements inside
+        for position in range(len(self._stack) - 1, -1, -1):
+            if self._stack[position].tag == tag:
+                del self._stack[position:]
+                break
+
+    @property
+    def result(self) -> list[str]:
+        return next((links for links in self.links if links), [])
+
+
+def extract_product_links_streaming(page: str, product_count: int) -> list[str]:
+    scanner = ProductLinkScanner(PRODUCT_SELECTORS, product_count)
+    scanner.feed(page)
+    scanner.close()
+    return scanner.result
+
+
+def extract_product_links_selectolax(page: str, product_count: int) -> list[str]:
+    tree = LexborHTMLParser(page)
+    for selector in PRODUCT_SELECTORS:
+        links = [
+            href
+            for node in tree.css(selector)
+            if (href := node.attributes.get("href")) is not None
+        ][:product_count]
+        # do not try further selectors if some products found
+        if links:
+            return links
+    return []
+
+
+def extract_product_links_bs4(page: str, product_count: int) -> list[str]:
+    soup = BeautifulSoup(page, "html.parser")
+
+    product_link_elements = []
+    for selector in PRODUCT_SELECTORS:
+        product_link_elements = soup.select(selector)[:product_count]
+        # do not try further selectors if some products found
+        if product_link_elements:
+            break
+
+    return [product_link["href"] for product_link in product_link_elements]
+
+
+PRODUCT_LINK_PARSERS: dict[str, Callable[[str, int], list[str]]] = {
+    "streaming": extract_product_links_streaming,
+    "selectolax": extract_product_links_selectolax,
+    "bs4": extract_product_links_bs4,
+}
+
+
+def resolve_parser_name(name: str) -> str:
+    """
+    Resolve name of the parser backend.
+
+    :param name: one of PRODUCT_LINK_PARSERS or "auto" - selectolax if it is installed,
+        streaming scanner otherwise
+    :return: one of PRODUCT_LINK_PARSERS
+    """
+    if name == "auto":
+        name = "selectolax" if LexborHTMLParser is not None else "streaming"
+    if name == "selectolax" and LexborHTMLParser is None:
+        raise ValueError("selectolax parser is not installed")
+    return name
+
+
+def get_product_link_parser(name: str) -> Callable[[str, int], list[str]]:
+    """
+    Get function extracting product links by name of the parser backend.
+
+    :param name: name of the parser backend, see resolve_parser_name
+    :return: function taking page and product count and returning product links
+    """
+    return PRODUCT_LINK_PARSERS[resolve_parser_name(name)]
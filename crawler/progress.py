@@ -0,0 +1,124 @@
+""" Module containing live reporting of progress of the crawl """
+import asyncio
+import logging
+import os
+import sys
+import time
+from types import TracebackType
+from typing import IO, Type
+
+from crawler.constants import DEFAULT_PROGRESS_INTERVAL
+from crawler.metrics import Metrics, crawl_metrics
+from crawler.models import DomainData
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressReporter:
+    """
+    Periodically reports progress of the crawl - completed, failed and in-flight domains, throughput and ETA.
+
+    Completed domains are recorded by the crawl (see record), requests, downloaded bytes and in-flight domains
+    are taken from crawl metrics. Throughput is measured since the previous report, ETA is estimated
+    from the average rate of completed domains.
+    Report is written as one line to `out` (stderr by default) or, if `status_file` is given, it replaces
+    the content of the file, so that it can be watched without flooding the log.
+    """
+
+    def __init__(
+        self,
+        total: int | None = None,
+        interval: float = DEFAULT_PROGRESS_INTERVAL,
+        status_file: str | None = None,
+        out: IO[str] | None = None,
+        metrics: Metrics = crawl_metrics,
+    ):
+        """
+        :param total: number of domains to be crawled, ETA is not reported if it is not known
+        :param interval: seconds between reports
+        :param status_file: file rewritten with each report
+        :param out: stream the reports are written to if status file is not given
+        :param metrics: metrics of the crawl, see metrics.Metrics
+        """
+        self.total = total
+        self.interval = interval
+        self.status_file = status_file
+        self.out = out or sys.stderr
+        self.metrics = metrics
+        self.completed = 0
+        self.failed = 0
+        self._start = self._last_time = time.monotonic()
+        self._last_completed = self._last_requests = self._last_bytes = 0
+        self._task: asyncio.Task | None = None
+
+    def record(self, domain_data: DomainData | Exception) -> None:
+        """Record crawled domain, it is failed if its crawl raised or its data are not complete"""
+        self.completed += 1
+        if isinstance(domain_data, Exception) or domain_data.error:
+            self.failed += 1
+
+    @property
+    def requests(self) -> int:
+        fetch = self.metrics.stages.get("fetch")
+        return fetch.count if fetch is not None else 0
+
+    def get_report(self) -> str:
+        """Return progress since the start and throughput since the previous report"""
+        now = time.monotonic()
+        elapsed = max(now - self._last_time, 1e-9)
+        domains_rate = (self.completed - self._last_completed) / elapsed
+        pages_rate = (self.requests - self._last_requests) / elapsed
+        mb_rate = (self.metrics.downloaded_bytes - self._last_bytes) / elapsed / 1024**2
+        self._last_time = now
+        self._last_completed = self.completed
+        self._last_requests = self.requests
+        self._last_bytes = self.metrics.downloaded_bytes
+
+        done = (
+            f"{self.completed}/{self.total}"
+            if self.total is not None
+            else str(self.completed)
+        )
+        report = (
+            f"Domains done {done} (failed {self.failed}), in flight {self.metrics.domains_in_flight} | "
+            f"{domains_rate:.1f} domains/s, {pages_rate:.1f} pages/s, {mb_rate:.2f} MB/s"
+        )
+        average_rate = self.completed / max(now - self._start, 1e-9)
+        if self.total is not None and average_rate > 0:
+            eta = max(self.total - self.completed, 0) / average_rate
+            report += f" | ETA {time.strftime('%H:%M:%S', time.gmtime(eta))}"
+        return report
+
+    def report(self) -> None:
+        """Write report, see get_report"""
+        report = self.get_report()
+        if self.status_file is None:
+            print(report, file=self.out, flush=True)
+            return
+        # file is replaced atomically, so that readers never see it half written
+        tmp_file = f"{self.status_file}.tmp"
+        with open(tmp_file, "w") as status_file:
+            status_file.write(report + "\n")
+        os.replace(tmp_file, self.status_file)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.report()
+
+    async def __aenter__(self) -> "ProgressReporter":
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            # final report, so that the last state of the crawl is not lost
+            self.report()
@@ -0,0 +1,232 @@
+""" Module containing work queues - sources of domains shared by crawling workers """
+import asyncio
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from types import TracebackType
+from typing import AsyncGenerator, Callable, Iterable, Type, TypeVar
+
+from crawler.constants import (
+    DEFAULT_QUEUE_LEASE_TIME,
+    DEFAULT_QUEUE_MAX_ATTEMPTS,
+    DEFAULT_QUEUE_POLL_INTERVAL,
+    QUEUE_LEASE_BATCH_SIZE,
+)
+
+T = TypeVar("T")
+
+
+class WorkQueue(ABC):
+    """
+    Queue of domains to be crawled, shared by any number of workers.
+
+    Worker leases domains, crawls them and acknowledges them (ack) once their data are written,
+    or returns them to the queue (nack) if their crawl failed. Lease expires after some time, so that
+    domains leased by crashed worker are crawled by other workers - each domain is crawled at least once.
+    """
+
+    @abstractmethod
+    async def put(self, domains: Iterable[str]) -> int:
+        """
+        Add domains to the queue, domains already in the queue are skipped
+
+        :return: number of added domains
+        """
+
+    @abstractmethod
+    async def lease(self, count: int) -> list[str]:
+        """Lease at most `count` domains, empty list if no domain is available now"""
+
+    @abstractmethod
+    async def ack(self, domain: str) -> None:
+        """Mark leased domain as done"""
+
+    @abstractmethod
+    async def nack(self, domain: str) -> None:
+        """Return leased domain to the queue, it is marked as failed once it runs out of attempts"""
+
+    @abstractmethod
+    async def is_finished(self) -> bool:
+        """Check if all domains are done or failed, i.e. no domain is waiting or leased"""
+
+    @abstractmethod
+    async def get_counts(self) -> dict[str, int]:
+        """Return number of domains by status (pending, leased, done, failed)"""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Release resources"""
+
+    def __enter__(self) -> "WorkQueue":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+class SqliteWorkQueue(WorkQueue):
+    """
+    Work queue stored in SQLite database on local disk, for single-host crawls and testing.
+
+    Database can be shared by worker processes of the host, leases are taken in exclusive transactions.
+    Domain's lease expires after `lease_time` seconds, domain is failed after `max_attempts` leases.
+    Database is accessed by one dedicated thread, so that disk IO does not block the event loop.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        lease_time: float = DEFAULT_QUEUE_LEASE_TIME,
+        max_attempts: int = DEFAULT_QUEUE_MAX_ATTEMPTS,
+    ):
+        """
+        :param file_path: path to SQLite database, it is created if it does not exist
+        :param lease_time: seconds after which leased domain is available to other workers again,
+            it should be longer than the time budget of one domain
+        :param max_attempts: max. number of leases of one domain
+        """
+        self.lease_time = lease_time
+        self.max_attempts = max_attempts
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="work-queue")
+        self._connection = self._executor.submit(self._connect, file_path).result()
+
+    @staticmethod
+    def _connect(file_path: str) -> sqlite3.Connection:
+        connection = sqlite3.connect(file_path, isolation_level=None, timeout=60)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # status is one of: pending, leased, done, failed
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS domains ("
+            "domain TEXT PRIMARY KEY, status TEXT, attempts INTEGER, lease_expires_at REAL)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS domains_status ON domains (status, lease_expires_at)"
+        )
+        return connection
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    async def put(self, domains: Iterable[str]) -> int:
+        return await self._run(self._put, domains)
+
+    def _put(self, domains: Iterable[str]) -> int:
+        # one transaction, committing each domain separately would be slow
+        self._connection.execute("BEGIN")
+        try:
+            cursor = self._connection.executemany(
+                "INSERT OR IGNORE INTO domains VALUES (?, 'pending', 0, NULL)",
+                ((domain,) for domain in domains),
+            )
+            self._connection.execute("COMMIT")
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+        return cursor.rowcount
+
+    async def lease(self, count: int) -> list[str]:
+        return await self._run(self._lease, count)
+
+    def _lease(self, count: int) -> list[str]:
+        now = time.time()
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            # expired leases of domains which ran out of attempts are not leased again
+            self._connection.execute(
+                "UPDATE domains SET status = 'failed' "
+                "WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= ?",
+                (now, self.max_attempts),
+            )
+            domains = [
+                row[0]
+                for row in self._connection.execute(
+                    "SELECT domain FROM domains "
+                    "WHERE status = 'pending' OR (status = 'leased' AND lease_expires_at < ?) LIMIT ?",
+                    (now, count),
+                )
+            ]
+            self._connection.executemany(
+                "UPDATE domains SET status = 'leased', attempts = attempts + 1, lease_expires_at = ? "
+                "WHERE domain = ?",
+                ((now + self.lease_time, domain) for domain in domains),
+            )
+            self._connection.execute("COMMIT")
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+        return domains
+
+    async def ack(self, domain: str) -> None:
+        await self._run(
+            self._connection.execute,
+            "UPDATE domains SET status = 'done' WHERE domain = ?",
+            (domain,),
+        )
+
+    async def nack(self, domain: str) -> None:
+        await self._run(
+            self._connection.execute,
+            "UPDATE domains SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END "
+            "WHERE domain = ? AND status = 'leased'",
+            (self.max_attempts, domain),
+        )
+
+    async def is_finished(self) -> bool:
+        return await self._run(self._is_finished)
+
+    def _is_finished(self) -> bool:
+        row = self._connection.execute(
+            "SELECT 1 FROM domains WHERE status IN ('pending', 'leased') LIMIT 1"
+        ).fetchone()
+        return row is None
+
+    async def get_counts(self) -> dict[str, int]:
+        return await self._run(self._get_counts)
+
+    def _get_counts(self) -> dict[str, int]:
+        return dict(
+            self._connection.execute(
+                "SELECT status, COUNT(*) FROM domains GROUP BY status"
+            ).fetchall()
+        )
+
+    def close(self) -> None:
+        self._executor.submit(self._connection.close).result()
+        self._executor.shutdown()
+
+
+async def lease_domains(
+    queue: WorkQueue,
+    batch_size: int = QUEUE_LEASE_BATCH_SIZE,
+    poll_interval: float = DEFAULT_QUEUE_POLL_INTERVAL,
+    keep_polling: bool = False,
+) -> AsyncGenerator[str, None]:
+    """
+    Generator of domains leased from the queue
+
+    Domains are leased in small batches, only when the consumer asks for more of them, so that other
+    workers get their share. When no domain is available, the queue is polled until it is finished
+    (domains leased by other workers might be returned to it) or forever with `keep_polling`.
+
+    :param queue: work queue
+    :param batch_size: max. number of domains leased at once
+    :param poll_interval: seconds between polls of empty queue
+    :param keep_polling: if True, the queue is polled even when it is finished, for domains added later
+    """
+    while True:
+        domains = await queue.lease(batch_size)
+        for domain in domains:
+            yield domain
+        if domains:
+            continue
+        if not keep_polling and await queue.is_finished():
+            return
+        await asyncio.sleep(poll_interval)
@@ -0,0 +1,168 @@
+""" Module containing rate limiting of requests to hosts """
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+# state of idle hosts is forgotten after this number of acquisitions
+SWEEP_EVERY = 1000
+# adaptive throttling - rate of throttling host is halved, down to this fraction of the configured rate...
+MIN_RATE_FACTOR = 1 / 16
+# ... and it is increased by this fraction of the configured rate with each successful request
+RATE_INCREASE_FACTOR = 1 / 16
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` acquisitions per second on average, with bursts of up to
+    `capacity` acquisitions.
+
+    Tokens are reserved in advance (number of tokens goes negative), so concurrent callers are
+    served in order of their calls.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def set_rate(self, rate: float) -> None:
+        self._refill()
+        self.rate = rate
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Reserve one token and return how long (in seconds) to wait for it"""
+        self._refill()
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                # return the token, e.g. the request is not needed any more
+                self.tokens += 1
+                raise
+
+    @property
+    def is_full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class HostLimit:
+    """
+    Limits of one host - rate of requests and number of requests in flight
+
+    Rate is adapted to responses of the host (AIMD) - it is halved when the host throttles requests
+    and it is increased back to the configured rate additively with successful requests.
+    """
+
+    def __init__(self, rate: float | None, burst: float, max_concurrent: int):
+        self.rate = rate
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.paused_until = 0.0
+
+    @property
+    def is_idle(self) -> bool:
+        return (
+            not self.active
+            and (self.bucket is None or self.bucket.is_full)
+            and self.paused_until <= time.monotonic()
+        )
+
+    async def acquire(self) -> None:
+        pause = self.paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+        if self.bucket is not None:
+            await self.bucket.acquire()
+
+    def slow_down(self, pause: float | None = None) -> None:
+        if self.bucket is not None and self.rate is not None:
+            self.bucket.set_rate(max(self.bucket.rate / 2, self.rate * MIN_RATE_FACTOR))
+        if pause:
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+
+    def speed_up(self) -> None:
+        if (
+            self.bucket is not None
+            and self.rate is not None
+            and self.bucket.rate < self.rate
+        ):
+            self.bucket.set_rate(
+                min(self.bucket.rate + self.rate * RATE_INCREASE_FACTOR, self.rate)
+            )
+
+
+class HostRateLimiter:
+    """
+    Per-host rate limiter.
+
+    Each host has its own token bucket (rate of requests per second and burst size) and limit
+    of concurrent requests. Requests to different hosts do not limit each other.
+    Rate of requests to host adapts to its responses, see slow_down and speed_up.
+    """
+
+    def __init__(self, rate: float | None, burst: float = 1, max_concurrent: int = 1):
+        """
+        :param rate: max. average number of requests per second to one host, None for unlimited rate
+        :param burst: max. number of requests to one host sent at once (if the host was idle)
+        :param max_concurrent: max. number of requests in flight to one host
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self._hosts: dict[str, HostLimit] = {}
+        self._acquisitions = 0
+
+    @asynccontextmanager
+    async def acquire(self, host: str) -> AsyncIterator[None]:
+        """Wait until request to the host is allowed, the request should be done in the context"""
+        self._acquisitions += 1
+        if self._acquisitions % SWEEP_EVERY == 0:
+            self._sweep()
+        limit = self._hosts.get(host)
+        if limit is None:
+            limit = self._hosts[host] = HostLimit(
+                self.rate, self.burst, self.max_concurrent
+            )
+        limit.active += 1
+        try:
+            async with limit.semaphore:
+                await limit.acquire()
+                yield
+        finally:
+            limit.active -= 1
+
+    def slow_down(self, host: str, pause: float | None = None) -> None:
+        """
+        Slow down requests to the host, e.g. because it throttles them
+
+        :param host: host
+        :param pause: time (in seconds) for which no requests are sent to the host, e.g. by Retry-After header
+        """
+        limit = self._hosts.get(host)
+        if limit is not None:
+            limit.slow_down(pause)
+
+    def speed_up(self, host: str) -> None:
+        """Speed up slowed down requests to the host (back to the configured rate), e.g. after successful request"""
+        limit = self._hosts.get(host)
+        if limit is not None:
+            limit.speed_up()
+
+    def _sweep(self) -> None:
+        """Forget state of idle hosts, so that memory does not grow with number of crawled hosts"""
+        for host in [host for host, limit in self._hosts.items() if limit.is_idle]:
+            del self._hosts[host]
@@ -0,0 +1,108 @@
+""" Module containing retry policy of failed requests """
+import asyncio
+import random
+import socket
+import time
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+from crawler.constants import (
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_RETRY_BACKOFF,
+    DEFAULT_RETRY_BACKOFF_MAX,
+)
+
+# statuses of responses worth retrying - throttling and temporary server errors
+RETRYABLE_STATUSES = frozenset([408, 429, 500, 502, 503, 504])
+# statuses by which host signals that it is overloaded by requests
+THROTTLING_STATUSES = frozenset([429, 503])
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parse Retry-After header - number of seconds or HTTP date
+
+    :return: number of seconds to wait, None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def get_retry_after(error: BaseException) -> float | None:
+    """Return delay requested by Retry-After header of the error response, if any"""
+    if isinstance(error, aiohttp.ClientResponseError) and error.headers:
+        return parse_retry_after(error.headers.get("Retry-After"))
+    return None
+
+
+def is_throttling(error: BaseException) -> bool:
+    """Check if the error is a response of host overloaded by requests"""
+    return (
+        isinstance(error, aiohttp.ClientResponseError)
+        and error.status in THROTTLING_STATUSES
+    )
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Check if the request failed by a temporary error, so that it is worth retrying
+
+    Timeouts, dropped connections and throttling or server errors (see RETRYABLE_STATUSES) are temporary.
+    Client errors (4xx), unresolvable hosts and SSL errors are fatal.
+    """
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in RETRYABLE_STATUSES
+    if isinstance(error, aiohttp.ClientSSLError):
+        return False
+    if isinstance(error, aiohttp.ClientConnectorError):
+        return not isinstance(error.os_error, socket.gaierror)
+    return isinstance(
+        error,
+        (
+            aiohttp.ClientConnectionError,
+            aiohttp.ClientPayloadError,
+            asyncio.TimeoutError,
+        ),
+    )
+
+
+class RetryPolicy:
+    """
+    Retry policy with exponential backoff and full jitter.
+
+    Delay before n-th retry is random, up to `backoff * 2 ** n` seconds (capped by `backoff_max`),
+    so that retries of concurrent requests are spread in time. Delay requested by Retry-After header
+    is honored, requests are not retried if it is longer than `backoff_max`.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff: float = DEFAULT_RETRY_BACKOFF,
+        backoff_max: float = DEFAULT_RETRY_BACKOFF_MAX,
+    ):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+
+    def get_delay(self, error: BaseException, attempt: int) -> float | None:
+        """
+        Return delay before retry of failed request
+
+        :param error: error of the request
+        :param attempt: number of already made retries
+        :return: delay in seconds, None if the request should not be retried
+        """
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        retry_after = get_retry_after(error)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.backoff_max else None
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2**attempt))
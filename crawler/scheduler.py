@@ -0,0 +1,101 @@
+""" Module containing scheduling of concurrent tasks """
+import asyncio
+from typing import AsyncGenerator, AsyncIterable, Awaitable, Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# marks the end of the stream in scheduler's queues
+_DONE = object()
+
+
+async def to_async_iterable(
+    items: Iterable[T] | AsyncIterable[T],
+) -> AsyncGenerator[T, None]:
+    """Iterate both sync and async iterables asynchronously"""
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def _stop_workers(in_queue: asyncio.Queue, worker_count: int) -> None:
+    for _ in range(worker_count):
+        await in_queue.put(_DONE)
+
+
+async def _produce(
+    items: Iterable | AsyncIterable, in_queue: asyncio.Queue, worker_count: int
+) -> None:
+    """Put items to the queue followed by stop mark for each worker"""
+    try:
+        async for item in to_async_iterable(items):
+            await in_queue.put(item)
+    except Exception:
+        # stop workers even if reading of items fails
+        await _stop_workers(in_queue, worker_count)
+        raise
+    await _stop_workers(in_queue, worker_count)
+
+
+async def _work(
+    func: Callable[[T], Awaitable[R]],
+    in_queue: asyncio.Queue,
+    out_queue: asyncio.Queue,
+) -> None:
+    """Process items from input queue until stop mark is received"""
+    while (item := await in_queue.get()) is not _DONE:
+        result: R | Exception
+        try:
+            result = await func(item)
+        except Exception as e:
+            result = e
+        await out_queue.put((item, result))
+    await out_queue.put(_DONE)
+
+
+async def bounded_map(
+    func: Callable[[T], Awaitable[R]],
+    items: Iterable[T] | AsyncIterable[T],
+    concurrency: int,
+) -> AsyncGenerator[tuple[T, R | Exception], None]:
+    """
+    Run coroutine function for each item with at most `concurrency` calls in flight.
+
+    Pool of `concurrency` workers is started. Items are pulled from `items` lazily, only when
+    there is a free slot in the bounded input queue, and results are yielded in order of completion.
+    Slow consumer of the results blocks the workers (and therefore the reading of items) as well,
+    so memory usage does not depend on the number of items.
+
+    :param func: coroutine function called for every item
+    :param items: (async) iterable of items
+    :param concurrency: max. number of concurrently running calls of func
+    :return: async generator of tuples (item, result), result is the exception raised by func if it fails
+    """
+    if concurrency < 1:
+        raise ValueError(f"Concurrency must be positive, got {concurrency}")
+
+    in_queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    out_queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+
+    producer = asyncio.create_task(_produce(items, in_queue, concurrency))
+    workers = [
+        asyncio.create_task(_work(func, in_queue, out_queue))
+        for _ in range(concurrency)
+    ]
+    try:
+        running_workers = concurrency
+        while running_workers:
+            entry = await out_queue.get()
+            if entry is _DONE:
+                running_workers -= 1
+            else:
+                yield entry
+        # propagate possible error of reading the items
+        await producer
+    finally:
+        for task in [producer, *workers]:
+            task.cancel()
+        await asyncio.gather(producer, *workers, return_exceptions=True)
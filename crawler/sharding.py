@@ -0,0 +1,79 @@
+""" Module containing sharding of domains among crawling processes """
+import argparse
+import os
+import shutil
+import zlib
+from typing import NamedTuple
+
+from crawler.domains import get_domain_key
+
+
+class Shard(NamedTuple):
+    """Shard `number` (0-based) of `total` shards"""
+
+    number: int
+    total: int
+
+    def __str__(self) -> str:
+        return f"{self.number}/{self.total}"
+
+
+def parse_shard(value: str) -> Shard:
+    """
+    Parse shard from string in format number/total, e.g. 0/4
+
+    :raises argparse.ArgumentTypeError: if the value is not valid shard
+    """
+    try:
+        number, total = map(int, value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"Shard must be in format number/total, got {value}"
+        )
+    if not 0 <= number < total:
+        raise argparse.ArgumentTypeError(
+            f"Shard number must be between 0 and {total - 1}, got {number}"
+        )
+    return Shard(number, total)
+
+
+def get_shard_number(domain: str, shard_total: int) -> int:
+    """
+    Return number of shard the domain belongs to
+
+    CRC32 of the domain's key is used, unlike built-in hash it is the same in all processes and runs,
+    so each domain (and therefore each host, which is rate limited by one process only) belongs to one shard.
+    Variants of the domain with the same key (see domains.get_domain_key) belong to the same shard,
+    so that they are deduplicated by one process.
+    """
+    return zlib.crc32(get_domain_key(domain).encode()) % shard_total
+
+
+def is_in_shard(domain: str, shard: Shard | None) -> bool:
+    """Check if domain belongs to the shard, all domains belong to no shard (None)"""
+    return shard is None or get_shard_number(domain, shard.total) == shard.number
+
+
+def get_shard_file_path(file_path: str, shard: Shard) -> str:
+    """
+    Return path of shard's part of the file, e.g. output.csv -> output.shard-0-of-4.csv
+    """
+    root, extension = os.path.splitext(file_path)
+    return f"{root}.shard-{shard.number}-of-{shard.total}{extension}"
+
+
+def merge_csv_files(part_file_paths: list[str], file_path: str) -> None:
+    """
+    Concatenate CSV files with the same header to one file
+
+    :param part_file_paths: CSV files, header is taken from the first one
+    :param file_path: path to merged file
+    """
+    # binary mode, so that line endings written by csv module are kept
+    with open(file_path, "wb") as out_file:
+        for i, part_file_path in enumerate(part_file_paths):
+            with open(part_file_path, "rb") as part_file:
+                header = part_file.readline()
+                if i == 0:
+                    out_file.write(header)
+                shutil.copyfileobj(part_file, out_file)
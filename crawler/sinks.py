@@ -0,0 +1,409 @@
+""" Module containing sinks - destinations the crawled domain data are written to """
+import csv
+import json
+import logging
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from types import TracebackType
+from typing import Type, Generator, IO
+
+from crawler.constants import FLUSH_EVERY, FLUSH_INTERVAL, PARQUET_ROW_GROUP_SIZE
+from crawler.logic import get_header_row, domain_data_to_row
+from crawler.models import DomainData, domain_data_to_dict, domain_data_from_dict
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional dependency
+    pyarrow = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+SQLITE_EXTENSIONS = [".sqlite", ".sqlite3", ".db"]
+JSON_LINES_EXTENSIONS = [".jsonl", ".ndjson"]
+
+
+class Sink(ABC):
+    """
+    Destination of domain data.
+
+    Data are written one by one as soon as they are crawled. Sink is responsible for making
+    them durable in reasonable time (see flush).
+    """
+
+    @abstractmethod
+    def write(self, domain_data: DomainData) -> None:
+        """Write data of one domain"""
+
+    @abstractmethod
+    def flush(self) -> None:
+        """Make written data durable"""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Flush remaining data and release resources"""
+
+    def __enter__(self) -> "Sink":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+class FileSink(Sink):
+    """
+    Base class of sinks appending domain data to text file.
+
+    File is flushed periodically - after `flush_every` records or `flush_interval` seconds,
+    whatever comes first - so that already crawled data survive crash of the script.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        append: bool = False,
+        flush_every: int = FLUSH_EVERY,
+        flush_interval: float = FLUSH_INTERVAL,
+    ):
+        logger.info("Writing domain data to %s", file_path)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._file: IO[str] = open(file_path, "a" if append else "w")
+        self._unflushed_records = 0
+        self._last_flush = time.monotonic()
+
+    @abstractmethod
+    def write_record(self, domain_data: DomainData) -> None:
+        """Write domain data to the file (without flushing)"""
+
+    def write(self, domain_data: DomainData) -> None:
+        # writing of one record to buffered file is cheap, so it is done synchronously
+        self.write_record(domain_data)
+        self._unflushed_records += 1
+        if (
+            self._unflushed_records >= self.flush_every
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        self._file.flush()
+        self._unflushed_records = 0
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class CsvSink(FileSink):
+    """
+    Sink writing rows to CSV file, see logic.domain_data_to_row for row format.
+
+    Header is written when the file is opened, unless data are appended to non-empty file.
+    """
+
+    def __init__(self, file_path: str, product_count: int, **kwargs):
+        super().__init__(file_path, **kwargs)
+        self._writer = csv.writer(self._file)
+        if self._file.tell() == 0:
+            self._writer.writerow(get_header_row(product_count))
+
+    def write_record(self, domain_data: DomainData) -> None:
+        self._writer.writerow(domain_data_to_row(domain_data))
+
+
+class JsonLinesSink(FileSink):
+    """
+    Sink writing one JSON object per line, see models.domain_data_to_dict for object format.
+
+    Opened in append mode it serves as a journal of finished domains, see read_json_lines.
+    """
+
+    def __init__(self, file_path: str, **kwargs):
+        super().__init__(file_path, **kwargs)
+        # terminate incomplete last line (left by crash) so that it does not corrupt the next record
+        if self._file.tell() and not _ends_with_newline(file_path):
+            self._file.write("\n")
+
+    def write_record(self, domain_data: DomainData) -> None:
+        self._file.write(json.dumps(domain_data_to_dict(domain_data)) + "\n")
+
+
+class BatchSink(Sink):
+    """
+    Base class of sinks writing domain data in batches.
+
+    Domain data are buffered and the batch is written once it has `flush_every` records
+    or `flush_interval` seconds passed since the last write, whatever comes first.
+    Writing a batch at once (one transaction, one row group...) is much faster than writing records one by one.
+    """
+
+    def __init__(
+        self, flush_every: int = FLUSH_EVERY, flush_interval: float = FLUSH_INTERVAL
+    ):
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._batch: list[DomainData] = []
+        self._last_flush = time.monotonic()
+
+    @abstractmethod
+    def write_batch(self, batch: list[DomainData]) -> None:
+        """Write batch of domain data durably"""
+
+    def write(self, domain_data: DomainData) -> None:
+        self._batch.append(domain_data)
+        if (
+            len(self._batch) >= self.flush_every
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        if self._batch:
+            self.write_batch(self._batch)
+            self._batch = []
+        self._last_flush = time.monotonic()
+
+
+class SqliteSink(BatchSink):
+    """
+    Sink writing domain data to normalized tables of SQLite database:
+
+    * domains (domain, error, crawled_at, changed_at)
+    * contacts (domain, type, value) - type is email, facebook or twitter
+    * products (domain, position, title, image_url) - position is 1-based order of the product
+
+    Each batch is written in one transaction. Domain written again replaces its previous data.
+    """
+
+    def __init__(self, file_path: str, append: bool = False, **kwargs):
+        """
+        :param file_path: path to SQLite database, it is created if it does not exist
+        :param append: if False, tables of previous crawl are dropped
+        """
+        super().__init__(**kwargs)
+        logger.info("Writing domain data to %s", file_path)
+        self._connection = sqlite3.connect(file_path, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        if not append:
+            for table in ["domains", "contacts", "products"]:
+                self._connection.execute(f"DROP TABLE IF EXISTS {table}")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS domains "
+            "(domain TEXT PRIMARY KEY, error TEXT, crawled_at REAL, changed_at REAL)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS contacts (domain TEXT, type TEXT, value TEXT)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS products "
+            "(domain TEXT, position INTEGER, title TEXT, image_url TEXT)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS contacts_domain ON contacts (domain)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS products_domain ON products (domain)"
+        )
+
+    def write_batch(self, batch: list[DomainData]) -> None:
+        domains = [(domain_data.domain,) for domain_data in batch]
+        self._connection.execute("BEGIN")
+        try:
+            self._connection.executemany(
+                "DELETE FROM contacts WHERE domain = ?", domains
+            )
+            self._connection.executemany(
+                "DELETE FROM products WHERE domain = ?", domains
+            )
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO domains VALUES (?, ?, ?, ?)",
+                (
+                    (
+                        domain_data.domain,
+                        domain_data.error,
+                        domain_data.crawled_at,
+                        domain_data.changed_at,
+                    )
+                    for domain_data in batch
+                ),
+            )
+            self._connection.executemany(
+                "INSERT INTO contacts VALUES (?, ?, ?)",
+                (
+                    (domain_data.domain, contact_type, value)
+                    for domain_data in batch
+                    for contact_type, values in [
+                        ("email", domain_data.emails),
+                        ("facebook", domain_data.facebooks),
+                        ("twitter", domain_data.twitters),
+                    ]
+                    for value in sorted(values)
+                ),
+            )
+            self._connection.executemany(
+                "INSERT INTO products VALUES (?, ?, ?, ?)",
+                (
+                    (domain_data.domain, position, product.title, product.image_url)
+                    for domain_data in batch
+                    for position, product in enumerate(domain_data.products, start=1)
+                ),
+            )
+            self._connection.execute("COMMIT")
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+
+    def close(self) -> None:
+        self.flush()
+        self._connection.close()
+
+
+class ParquetSink(BatchSink):
+    """
+    Sink writing domain data to Parquet file, one row per domain with the same columns as
+    models.domain_data_to_dict - contacts are lists of strings and products list of structs (title, image_url).
+
+    Each batch is written as one row group, so batches are large and the file is readable
+    only once the sink is closed. Requires optional pyarrow package.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        append: bool = False,
+        flush_every: int = PARQUET_ROW_GROUP_SIZE,
+        flush_interval: float = float("inf"),
+    ):
+        """
+        :param file_path: path to Parquet file
+        :param append: must be False, Parquet files can't be appended to
+        :param flush_every: number of rows of one row group
+        :param flush_interval: max. seconds between writes of row groups
+        :raises ValueError: if pyarrow is not installed or append is requested
+        """
+        if pyarrow is None:
+            raise ValueError("pyarrow must be installed to write Parquet files")
+        if append:
+            raise ValueError("Parquet files can't be appended to")
+        super().__init__(flush_every, flush_interval)
+        logger.info("Writing domain data to %s", file_path)
+        string_list = pyarrow.list_(pyarrow.string())
+        self._schema = pyarrow.schema(
+            [
+                ("domain", pyarrow.string()),
+                ("emails", string_list),
+                ("facebooks", string_list),
+                ("twitters", string_list),
+                (
+                    "products",
+                    pyarrow.list_(
+                        pyarrow.struct(
+                            [
+                                ("title", pyarrow.string()),
+                                ("image_url", pyarrow.string()),
+                            ]
+                        )
+                    ),
+                ),
+                ("error", pyarrow.string()),
+                ("crawled_at", pyarrow.float64()),
+                ("changed_at", pyarrow.float64()),
+            ]
+        )
+        self._writer = pyarrow.parquet.ParquetWriter(file_path, self._schema)
+
+    def write_batch(self, batch: list[DomainData]) -> None:
+        self._writer.write_table(
+            pyarrow.Table.from_pylist(
+                [domain_data_to_dict(domain_data) for domain_data in batch],
+                schema=self._schema,
+            )
+        )
+
+    def close(self) -> None:
+        self.flush()
+        self._writer.close()
+
+
+class MultiSink(Sink):
+    """Sink writing domain data to all given sinks (in given order)"""
+
+    def __init__(self, sinks: list[Sink]):
+        self.sinks = sinks
+
+    def write(self, domain_data: DomainData) -> None:
+        for sink in self.sinks:
+            sink.write(domain_data)
+
+    def flush(self) -> None:
+        for sink in self.sinks:
+            sink.flush()
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+def create_sink(file_path: str, product_count: int, append: bool = False) -> Sink:
+    """
+    Create sink of output file according to its extension:
+
+    * .sqlite, .sqlite3, .db - SqliteSink
+    * .parquet - ParquetSink
+    * .jsonl, .ndjson - JsonLinesSink
+    * anything else - CsvSink
+
+    :param file_path: path to output file
+    :param product_count: number of products listed in CSV header
+    :param append: if True, data are appended to existing output
+    :raises ValueError: if the sink can't be created, see ParquetSink
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in SQLITE_EXTENSIONS:
+        return SqliteSink(file_path, append=append)
+    if extension == ".parquet":
+        return ParquetSink(file_path, append=append)
+    if extension in JSON_LINES_EXTENSIONS:
+        return JsonLinesSink(file_path, append=append)
+    return CsvSink(file_path, product_count, append=append)
+
+
+def is_csv_file(file_path: str) -> bool:
+    """Check if create_sink writes CSV to the file"""
+    extension = os.path.splitext(file_path)[1].lower()
+    return extension not in SQLITE_EXTENSIONS + JSON_LINES_EXTENSIONS + [".parquet"]
+
+
+def _ends_with_newline(file_path: str) -> bool:
+    with open(file_path, "rb") as in_file:
+        in_file.seek(-1, os.SEEK_END)
+        return in_file.read(1) == b"\n"
+
+
+def read_json_lines(file_path: str) -> Generator[DomainData, None, None]:
+    """
+    Read domain data written by JsonLinesSink.
+
+    Last line might be incomplete if the script crashed while writing it, such lines are skipped.
+
+    :param file_path: path to file
+    :return: generator of domain data
+    """
+    with open(file_path) as in_file:
+        for line_number, line in enumerate(in_file, start=1):
+            try:
+                yield domain_data_from_dict(json.loads(line))
+            except (ValueError, KeyError) as e:
+                logger.warning(
+                    "Skipping invalid line %d of %s: %s", line_number, file_path, e
+                )
@@ -1,45 +1,156 @@
 """Module containing utility function - functions that business domain agnostic"""
 import asyncio
+import codecs
 import logging
 import operator
-from typing import AsyncGenerator, Callable
+from concurrent.futures import Executor
+from typing import Awaitable, Callable, NamedTuple, TypeVar
 from urllib.parse import urlunparse, ParseResult, urlparse
 
 import aiohttp
 import funcy
 
+from crawler.constants import READ_CHUNK_SIZE
+
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+REDIRECT_STATUSES = frozenset([301, 302, 303, 307, 308])
+
+
+class Body(NamedTuple):
+    """Text of response body, see read_text"""
+
+    text: str
+    complete: bool  # False if reading was stopped before the end of the body
+
 
 def negate(func: Callable) -> Callable:
     """return function complementar to the given function (a.k.a always negates its result)"""
     return funcy.compose(operator.not_, func)
 
 
-async def get_page(
-    url: str, session: aiohttp.ClientSession, as_json=False
-) -> dict | str:
+async def run_cpu_bound(executor: Executor | None, func: Callable[..., T], *args) -> T:
+    """
+    Run CPU bound function in executor so that it does not block the event loop.
+
+    :param executor: executor, e.g. process pool. Function is called directly if it is None
+    :param func: function to be run, it has to be picklable for process pool executors
+    :param args: arguments of the function
+    :return: result of the function
     """
-    Return content of page
+    if executor is None:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
 
-    :param url: URL from which page should be fetched
-    :param session: aiohttp client session
-    :param as_json: if True result is returned as JSON dict. Page content as string is returned otherwise.
 
-    :return: Page content as string or JSON dict
+async def run_with_timeout(awaitable: Awaitable, timeout: float | None) -> bool:
     """
-    async with session.get(url) as response:
-        logger.info("Getting page %s, response - %d", url, response.status)
-        response.raise_for_status()
-        return await response.json() if as_json else await response.text()
+    Run awaitable, it is cancelled if it does not finish in time
 
+    Unlike asyncio.wait_for, timeout can't be confused with asyncio.TimeoutError raised by the awaitable.
 
-def get_url(domain: str, path: str, scheme="https") -> str:
-    """Construct URL from domain, path and scheme
+    :param awaitable: awaitable, e.g. coroutine or future
+    :param timeout: timeout in seconds, None for no timeout
+    :return: True if the awaitable finished in time, False if it was cancelled
+    :raises Exception: exception raised by the awaitable
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        done, _ = await asyncio.wait([task], timeout=timeout)
+    finally:
+        if not task.done():
+            task.cancel()
+    if done:
+        task.result()
+        return True
+    # wait for cancellation, so that nothing of the awaitable runs after return
+    await asyncio.wait([task])
+    return False
+
+
+async def gather_or_cancel(*awaitables: Awaitable) -> list:
+    """
+    Run awaitables concurrently like asyncio.gather, but once one of them fails the others are cancelled
+
+    :param awaitables: awaitables, e.g. coroutines or futures
+    :return: results of the awaitables
+    :raises Exception: exception raised by the first failed awaitable
+    """
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        # wait for cancellation, so that nothing of the awaitables runs after return
+        await asyncio.wait(tasks)
+    errors = [task.exception() for task in tasks if not task.cancelled()]
+    for error in errors:
+        if error is not None:
+            raise error
+    return [task.result() for task in tasks]
+
+
+async def read_text(
+    response: aiohttp.ClientResponse,
+    max_size: int,
+    feed: Callable[[str], bool] | None = None,
+) -> Body:
+    """
+    Read and decode response body incrementally, chunk by chunk.
+
+    Reading is stopped (and the rest of the body is not downloaded) once `max_size` bytes are read,
+    or once `feed` returns True.
+
+    :param response: response with not yet read body
+    :param max_size: max. number of bytes read, the text is truncated if the body is larger
+    :param feed: called with each decoded chunk of the text as it arrives, returns True if it does not
+        need more of the text
+    :return: (possibly incomplete) text of the body
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(response.charset or "utf-8")(
+            errors="replace"
+        )
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    chunks = []
+    size = 0
+    async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+        size += len(chunk)
+        truncated = size > max_size
+        if truncated:
+            chunk = chunk[: len(chunk) - (size - max_size)]
+        text = decoder.decode(chunk)
+        chunks.append(text)
+        # truncated chunk is fed too, so that the feed sees the whole returned text
+        if feed is not None and feed(text):
+            return Body("".join(chunks), complete=False)
+        if truncated:
+            logger.debug(
+                "Body of %s exceeds %d bytes, it is truncated", response.url, max_size
+            )
+            return Body("".join(chunks), complete=False)
+
+    text = decoder.decode(b"", final=True)
+    chunks.append(text)
+    if feed is not None and text:
+        feed(text)
+    return Body("".join(chunks), complete=True)
+
+
+def get_url(domain: str, path: str, scheme="https", query="") -> str:
+    """Construct URL from domain, path, scheme and query
 
     E.g.:
     >>> get_url("sufio.com", "/contact")
     "https://sufio.com/contact"
+    >>> get_url("sufio.com", "/products.json", query="limit=5")
+    "https://sufio.com/products.json?limit=5"
     """
     return urlunparse(
         ParseResult(
@@ -47,7 +158,7 @@ def get_url(domain: str, path: str, scheme="https") -> str:
             netloc=domain,
             path=path,
             params="",
-            query="",
+            query=query,
             fragment="",
         )
     )
@@ -75,22 +186,6 @@ def get_urls(domain: str, paths: list[str], scheme="https") -> list[str]:
     return [get_url(domain, path, scheme) for path in paths]
 
 
-async def get_pages(
-    urls: list[str],
-    session: aiohttp.ClientSession,
-    throttle_delay: float,
-    as_json=False,
-) -> AsyncGenerator[str | dict, None]:
-    """Generator of contents of successfully fetched pages."""
-    for url in urls:
-        try:
-            yield await get_page(url, session, as_json)
-        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-            logger.info("Getting page %s failed: %s", url, e)
-        # throttle even if the request fails
-        await asyncio.sleep(throttle_delay)
-
-
 def url_to_json_url(url: str) -> str:
     """
     >>> url_to_json_url("example.com/some_product/")
@@ -1,21 +1,81 @@
 #!/usr/bin/env python
 import argparse
 import asyncio
+import csv
 import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager, nullcontext
+from functools import partial
+from typing import AsyncGenerator, AsyncIterable, Iterable
 
 from crawler.constants import (
     DEFAULT_CONTACT_PATHS,
     DEFAULT_PRODUCT_LIST_PATH,
     DEFAULT_PRODUCT_COUNT,
     DEFAULT_THROTTLE_DELAY,
+    DEFAULT_BURST,
+    DEFAULT_MAX_REQUESTS_PER_HOST,
     DEFAULT_INPUT_COLUMN,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_PARSE_WORKERS,
+    DEFAULT_STOP_WHEN_COMPLETE,
+    DEFAULT_STOP_AFTER_EMAILS,
+    DEFAULT_HTML_PARSER,
+    HTML_PARSERS,
+    DEFAULT_JSON_BACKEND,
+    JSON_BACKENDS,
+    DEFAULT_TARGETED_JSON,
+    DEFAULT_CONNECTION_LIMIT,
+    DEFAULT_CONNECTION_LIMIT_PER_HOST,
+    DEFAULT_KEEPALIVE_TIMEOUT,
+    DEFAULT_DNS_CACHE_TTL,
+    DEFAULT_CACHE_MAX_SIZE,
+    DEFAULT_CACHE_TTL,
+    DEFAULT_MAX_BODY_SIZE,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_RETRY_BACKOFF,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_DOMAIN_TIMEOUT,
+    DEFAULT_PROGRESS_INTERVAL,
+    DEFAULT_WORKERS,
+    DEFAULT_FRESH_FOR,
+    DEFAULT_MAX_RECRAWLS,
 )
+from crawler.domains import canonicalize_domain, create_domain_set, get_domain_key
+from crawler.incremental import ChangesSink, IncrementalCrawl
 from crawler.logic import (
-    read_domains,
+    iter_input_values,
+    iter_domains,
+    stream_domains,
     get_domain_data,
-    write_domain_data,
+    create_session,
+    create_fetcher,
+    create_cache,
+    create_parse_executor,
 )
+from crawler.metrics import crawl_metrics, start_metrics_server
 from crawler.models import Config, DomainData
+from crawler.progress import ProgressReporter
+from crawler.scheduler import bounded_map
+from crawler.sharding import (
+    Shard,
+    parse_shard,
+    is_in_shard,
+    get_shard_file_path,
+    merge_csv_files,
+)
+from crawler.sinks import (
+    JsonLinesSink,
+    MultiSink,
+    Sink,
+    create_sink,
+    is_csv_file,
+    read_json_lines,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -24,13 +84,91 @@ def setup_argument_parser() -> argparse.ArgumentParser:
     """Setup parsing of script's console arguments"""
     parser = argparse.ArgumentParser(
         description="Extracts relevant data (emails, facebook, product info...) from domains read from input file "
-        "and serializes them to CSV output file.\n"
+        "and serializes them to output file - CSV, or SQLite database, Parquet or JSON lines according "
+        "to its extension (.sqlite/.db, .parquet, .jsonl).\n"
         "Example usage:\n\n"
         "\t./main.py example_data/stores_small.csv output.csv",
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
     parser.add_argument("in_file", type=str, help="Input file")
-    parser.add_argument("out_file", type=str, help="Output file")
+    parser.add_argument(
+        "out_file",
+        type=str,
+        help="Output file, its format is given by extension: .sqlite/.sqlite3/.db (SQLite tables domains, "
+        "contacts and products), .parquet (needs pyarrow), .jsonl/.ndjson, CSV otherwise",
+    )
+    add_config_arguments(parser)
+    parser.add_argument(
+        "--dedupe-on-disk",
+        action="store_true",
+        help="Deduplicate input domains by set stored in temporary database on disk instead of memory, "
+        "for inputs whose domains do not fit in memory",
+    )
+    parser.add_argument(
+        "--domain-map",
+        type=str,
+        nargs="?",
+        help="Write CSV file with one row per input row - the original value of the input column and the crawled "
+        "domain (empty if the value is not valid domain). The output has one row per crawled (canonical, "
+        "deduplicated) domain only, it can be joined back to all input rows by this file",
+    )
+    parser.add_argument(
+        "--journal",
+        type=str,
+        nargs="?",
+        help="Journal file recording data of each crawled domain, used by --resume (default <out_file>.journal.jsonl)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume interrupted crawl - domains recorded in the journal are not crawled again, "
+        "their data are copied from the journal to the output file",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="?",
+        default=DEFAULT_WORKERS,
+        help="Number of crawling processes, domains are sharded among them by hash and their outputs are merged "
+        f"to the output file (default {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        nargs="?",
+        help="Crawl only given shard of domains, e.g. 0/4 for the first of 4 shards - for crawling by multiple "
+        "machines, each of them writes output of its shard",
+    )
+    parser.add_argument(
+        "--previous",
+        type=str,
+        nargs="+",
+        help="Journal(s) of the previous run for incremental crawl - domains are re-crawled by priority (new, "
+        "previously failed, recently changed, the most stale) and only data changed since the previous run "
+        "are written to the output file, the journal of this run records data of all domains",
+    )
+    parser.add_argument(
+        "--fresh-for",
+        type=float,
+        nargs="?",
+        default=DEFAULT_FRESH_FOR,
+        help="Incremental crawl does not crawl domains crawled successfully within given number of seconds "
+        f"(default {DEFAULT_FRESH_FOR})",
+    )
+    parser.add_argument(
+        "--max-recrawls",
+        type=int,
+        nargs="?",
+        default=DEFAULT_MAX_RECRAWLS,
+        help="Max. number of domains crawled by incremental crawl (per shard), the remaining ones are crawled "
+        f"by the next runs, 0 means unlimited (default {DEFAULT_MAX_RECRAWLS})",
+    )
+    add_reporting_arguments(parser)
+    return parser
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add arguments of crawler's configuration, see create_config"""
     parser.add_argument(
         "--input-column",
         type=str,
@@ -50,7 +188,208 @@ def setup_argument_parser() -> argparse.ArgumentParser:
         type=float,
         nargs="?",
         default=DEFAULT_THROTTLE_DELAY,
-        help=f"Delay between requests to the same domain (in seconds, default {DEFAULT_THROTTLE_DELAY})",
+        help=f"Average delay between requests to the same domain (in seconds, default {DEFAULT_THROTTLE_DELAY})",
+    )
+    parser.add_argument(
+        "--burst",
+        type=float,
+        nargs="?",
+        default=DEFAULT_BURST,
+        help=f"Max. number of requests to the same domain sent at once, regardless of throttling "
+        f"(default {DEFAULT_BURST})",
+    )
+    parser.add_argument(
+        "--max-requests-per-host",
+        type=int,
+        nargs="?",
+        default=DEFAULT_MAX_REQUESTS_PER_HOST,
+        help=f"Max. number of concurrent requests to the same domain (default {DEFAULT_MAX_REQUESTS_PER_HOST})",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="?",
+        default=DEFAULT_CONCURRENCY,
+        help=f"Max. number of domains crawled at the same time (default {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        nargs="?",
+        default=DEFAULT_PARSE_WORKERS,
+        help="Number of processes parsing pages and extracting data from them, "
+        f"0 to parse in the main process (default {DEFAULT_PARSE_WORKERS})",
+    )
+    parser.add_argument(
+        "--stop-when-complete",
+        action=argparse.BooleanOptionalAction,
+        default=DEFAULT_STOP_WHEN_COMPLETE,
+        help="Do not fetch remaining contact pages of domain once email, facebook and twitter are found "
+        f"(default {DEFAULT_STOP_WHEN_COMPLETE})",
+    )
+    parser.add_argument(
+        "--stop-after-emails",
+        type=int,
+        nargs="?",
+        default=DEFAULT_STOP_AFTER_EMAILS,
+        help="Do not fetch remaining contact pages of domain once this number of emails is found, "
+        f"0 to fetch them regardless of emails (default {DEFAULT_STOP_AFTER_EMAILS})",
+    )
+    parser.add_argument(
+        "--html-parser",
+        type=str,
+        nargs="?",
+        default=DEFAULT_HTML_PARSER,
+        choices=HTML_PARSERS,
+        help="Parser extracting product links - fast selectolax parser (if installed), streaming scanner "
+        "or BeautifulSoup. 'auto' picks the fastest available one (default auto)",
+    )
+    parser.add_argument(
+        "--json-backend",
+        type=str,
+        nargs="?",
+        default=DEFAULT_JSON_BACKEND,
+        choices=JSON_BACKENDS,
+        help="Backend decoding JSONs - orjson or ujson (if installed) or standard library json. "
+        "'auto' picks the fastest available one (default auto)",
+    )
+    parser.add_argument(
+        "--targeted-json",
+        action=argparse.BooleanOptionalAction,
+        default=DEFAULT_TARGETED_JSON,
+        help="Decode only title and images of product JSONs instead of the whole documents "
+        f"(default {DEFAULT_TARGETED_JSON})",
+    )
+    parser.add_argument(
+        "--connection-limit",
+        type=int,
+        nargs="?",
+        default=DEFAULT_CONNECTION_LIMIT,
+        help=f"Max. number of open connections across all domains, 0 for unlimited (default {DEFAULT_CONNECTION_LIMIT})",
+    )
+    parser.add_argument(
+        "--connection-limit-per-host",
+        type=int,
+        nargs="?",
+        default=DEFAULT_CONNECTION_LIMIT_PER_HOST,
+        help=f"Max. number of open connections to the same host, 0 for unlimited "
+        f"(default {DEFAULT_CONNECTION_LIMIT_PER_HOST})",
+    )
+    parser.add_argument(
+        "--keepalive-timeout",
+        type=float,
+        nargs="?",
+        default=DEFAULT_KEEPALIVE_TIMEOUT,
+        help=f"How long idle connections are kept open for reuse (in seconds, default {DEFAULT_KEEPALIVE_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--dns-cache-ttl",
+        type=int,
+        nargs="?",
+        default=DEFAULT_DNS_CACHE_TTL,
+        help=f"How long resolved hosts are cached (in seconds, default {DEFAULT_DNS_CACHE_TTL})",
+    )
+    parser.add_argument(
+        "--connect-timeout",
+        type=float,
+        nargs="?",
+        default=DEFAULT_CONNECT_TIMEOUT,
+        help="Timeout of opening connection to host incl. TLS handshake, DNS resolution is limited by request "
+        f"timeout only (in seconds, 0 for none, default {DEFAULT_CONNECT_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--read-timeout",
+        type=float,
+        nargs="?",
+        default=DEFAULT_READ_TIMEOUT,
+        help=f"Max. pause between received chunks of response (in seconds, 0 for none, default {DEFAULT_READ_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--request-timeout",
+        type=float,
+        nargs="?",
+        default=DEFAULT_REQUEST_TIMEOUT,
+        help=f"Timeout of whole request (in seconds, 0 for none, default {DEFAULT_REQUEST_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--domain-timeout",
+        type=float,
+        nargs="?",
+        default=DEFAULT_DOMAIN_TIMEOUT,
+        help="Time budget of crawling of one domain, data crawled so far are written once it runs out "
+        f"(in seconds, 0 for unlimited, default {DEFAULT_DOMAIN_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        nargs="?",
+        default=DEFAULT_MAX_RETRIES,
+        help="Max. number of retries of request failed by temporary error (timeout, throttling, server error) "
+        f"(default {DEFAULT_MAX_RETRIES})",
+    )
+    parser.add_argument(
+        "--retry-backoff",
+        type=float,
+        nargs="?",
+        default=DEFAULT_RETRY_BACKOFF,
+        help="Max. delay before the first retry, it doubles with each retry. Delay requested by "
+        f"Retry-After header is used if given (in seconds, default {DEFAULT_RETRY_BACKOFF})",
+    )
+    parser.add_argument(
+        "--max-body-size",
+        type=int,
+        nargs="?",
+        default=DEFAULT_MAX_BODY_SIZE // 1024,
+        help="Max. size of downloaded page (in KB), larger pages are truncated "
+        f"(default {DEFAULT_MAX_BODY_SIZE // 1024})",
+    )
+    parser.add_argument(
+        "--cache",
+        type=str,
+        nargs="?",
+        help="SQLite file caching responses between crawls, pages are revalidated by conditional requests "
+        "(default no cache)",
+    )
+    parser.add_argument(
+        "--cache-max-size",
+        type=int,
+        nargs="?",
+        default=DEFAULT_CACHE_MAX_SIZE // 1024**2,
+        help="Max. size of the cache (in MB), least recently used pages are evicted "
+        f"(default {DEFAULT_CACHE_MAX_SIZE // 1024**2})",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        nargs="?",
+        default=DEFAULT_CACHE_TTL,
+        help="Cached pages younger than this are used without any request (in seconds), "
+        f"0 to always revalidate them (default {DEFAULT_CACHE_TTL})",
+    )
+
+
+def add_reporting_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add arguments of progress reporting, metrics and logging"""
+    parser.add_argument(
+        "--progress-interval",
+        type=float,
+        nargs="?",
+        default=DEFAULT_PROGRESS_INTERVAL,
+        help="Seconds between reports of progress of the crawl (domains done, throughput, ETA) to stderr, "
+        f"0 to disable them (default {DEFAULT_PROGRESS_INTERVAL})",
+    )
+    parser.add_argument(
+        "--status-file",
+        type=str,
+        nargs="?",
+        help="File rewritten with each progress report, instead of writing the reports to stderr",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        nargs="?",
+        help="Port of local HTTP server exposing metrics of the crawl at /metrics in Prometheus format "
+        "(default none, metrics are only summarized at the end of the crawl)",
     )
     parser.add_argument(
         "--log",
@@ -60,7 +399,6 @@ def setup_argument_parser() -> argparse.ArgumentParser:
         choices=("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"),
         help="Log level (default INFO)",
     )
-    return parser
 
 
 def setup_logging(log_level: int) -> None:
@@ -71,44 +409,388 @@ def setup_logging(log_level: int) -> None:
     )
 
 
-async def main() -> None:
-    parser = setup_argument_parser()
-    args = parser.parse_args()
-    setup_logging(logging.getLevelName(args.log))
+def replay_journal(journal_file: str, sink: Sink) -> set[str]:
+    """
+    Write domain data recorded in journal to sink
+
+    :param journal_file: journal written by previous (interrupted) crawl
+    :param sink: sink to write to
+    :return: set of domains recorded in the journal
+    """
+    crawled_domains = set()
+    for domain_data in read_json_lines(journal_file):
+        sink.write(domain_data)
+        crawled_domains.add(domain_data.domain)
+    logger.info("Resuming crawl, %d domains already crawled", len(crawled_domains))
+    return crawled_domains
+
+
+def plan_incremental_crawl(
+    incremental: IncrementalCrawl,
+    in_file: str,
+    input_column: str,
+    shard: Shard | None,
+    crawled_domains: set[str],
+) -> tuple[list[str], list[DomainData]]:
+    """Plan incremental crawl of distinct domains (of the shard) from input file which are not crawled yet"""
+    # planned domains are held in memory anyway, dict deduplicates them by key keeping their order
+    planned: dict[str, str] = {}
+    for domain in iter_domains(in_file, input_column):
+        if is_in_shard(domain, shard):
+            planned.setdefault(get_domain_key(domain), domain)
+    return incremental.plan(
+        domain for domain in planned.values() if domain not in crawled_domains
+    )
+
+
+def count_domains(in_file: str, input_column: str, shard: Shard | None = None) -> int:
+    """
+    Count domains (of the shard) in input file, duplicates are counted too (the count is an upper bound
+    of crawled domains), so that no set of domains is built just for the estimate
+    """
+    return sum(
+        1
+        for domain in iter_domains(in_file, input_column)
+        if is_in_shard(domain, shard)
+    )
+
 
-    config = Config(
+def write_domain_map(
+    in_file: str, input_column: str, map_file: str, dedupe_on_disk: bool = False
+) -> None:
+    """
+    Write CSV file mapping value of each input row to the crawled domain - the first canonical domain
+    with the same key, see domains.canonicalize_domain and domains.get_domain_key
+
+    :param in_file: input CSV file
+    :param input_column: column of input file containing domains
+    :param map_file: path to written file, its columns are the input column and "domain" (empty for invalid values)
+    :param dedupe_on_disk: if True, crawled domains are looked up on disk instead of memory,
+        see domains.create_domain_set
+    """
+    logger.info("Writing domain map to %s", map_file)
+    with open(map_file, "w") as out_file, create_domain_set(dedupe_on_disk) as seen:
+        writer = csv.writer(out_file)
+        writer.writerow([input_column, "domain"])
+        for value in iter_input_values(in_file, input_column):
+            try:
+                domain = canonicalize_domain(value)
+            except ValueError:
+                writer.writerow([value, ""])
+                continue
+            key = get_domain_key(domain)
+            seen.add(domain, key)
+            writer.writerow([value, seen.get(key)])
+
+
+async def crawl(
+    config: Config,
+    in_file: str,
+    out_file: str,
+    journal_file: str,
+    resume: bool,
+    progress_interval: float = DEFAULT_PROGRESS_INTERVAL,
+    status_file: str | None = None,
+    shard: Shard | None = None,
+    incremental: IncrementalCrawl | None = None,
+    dedupe_on_disk: bool = False,
+) -> None:
+    """
+    Crawl domains from input file and write their data to output file.
+
+    Domains are canonicalized and the first domain of each key is crawled once, see logic.iter_domains
+    and domains.get_domain_key.
+
+    :param config: configuration object, see model.Config
+    :param in_file: input CSV file
+    :param out_file: output file, its format is given by extension, see sinks.create_sink
+    :param journal_file: journal recording data of each crawled domain
+    :param resume: if True, domains already recorded in the journal are not crawled again
+    :param progress_interval: seconds between progress reports, 0 to disable them, see progress.ProgressReporter
+    :param status_file: file rewritten with each progress report, reports are written to stderr if not given
+    :param shard: only domains of the shard are crawled, see sharding.Shard
+    :param incremental: if given, domains are crawled incrementally and only data changed since the previous
+        run are written to output file, see incremental.IncrementalCrawl
+    :param dedupe_on_disk: if True, domains are deduplicated on disk instead of memory, see domains.create_domain_set
+    """
+    with (
+        create_sink(out_file, config.product_count) as out_sink,
+        create_domain_set(dedupe_on_disk) as seen,
+    ):
+        if incremental is not None:
+            out_sink = ChangesSink(out_sink, incremental)
+        crawled_domains: set[str] = set()
+        if resume and os.path.exists(journal_file):
+            # journal is read synchronously, therefore run it in executor
+            loop = asyncio.get_running_loop()
+            crawled_domains = await loop.run_in_executor(
+                None, replay_journal, journal_file, out_sink
+            )
+
+        # domains are read from input file lazily and each domain's data are written to output
+        # file as soon as they are crawled, so memory usage does not grow with the size of the input
+        domains: AsyncIterable[str] | Iterable[str] = (
+            domain
+            async for domain in stream_domains(in_file, config.input_column)
+            # domains are added to the set before skipping crawled ones, so that their variants are skipped too
+            if is_in_shard(domain, shard)
+            and seen.add(domain, get_domain_key(domain))
+            and domain not in crawled_domains
+        )
+        carried_over: list[DomainData] = []
+        total = None
+        if incremental is not None:
+            # incremental crawl orders domains by priority, therefore all of them are read at once
+            planned, carried_over = await asyncio.get_running_loop().run_in_executor(
+                None,
+                plan_incremental_crawl,
+                incremental,
+                in_file,
+                config.input_column,
+                shard,
+                crawled_domains,
+            )
+            domains, total = planned, len(planned)
+        elif progress_interval > 0:
+            total = await asyncio.get_running_loop().run_in_executor(
+                None, count_domains, in_file, config.input_column, shard
+            )
+            total = max(total - len(crawled_domains), 0)
+
+        with JsonLinesSink(journal_file, append=resume) as journal_sink:
+            # domains which are not crawled keep their previous data in the journal
+            for previous_data in carried_over:
+                journal_sink.write(previous_data)
+            # changes sink sets changed_at of domain data, therefore it precedes the journal
+            sink = MultiSink([out_sink, journal_sink])
+            # concurrently get data for domains, only limited number of domains is in flight
+            # at the same time, all domains share one connection pool, one parsing pool and one cache
+            with (
+                create_parse_executor(config) or nullcontext() as executor,
+                create_cache(config) or nullcontext() as cache,
+            ):
+                async with (
+                    create_session(config) as session,
+                    ProgressReporter(total, progress_interval, status_file) as progress,
+                ):
+                    async for domain, domain_data in bounded_map(
+                        partial(
+                            get_domain_data,
+                            config=config,
+                            fetcher=create_fetcher(config, session, cache),
+                            executor=executor,
+                        ),
+                        domains,
+                        config.concurrency,
+                    ):
+                        progress.record(domain_data)
+                        if isinstance(domain_data, DomainData):
+                            with crawl_metrics.timer("write"):
+                                sink.write(domain_data)
+                        elif incremental is not None:
+                            # previous data of failed domain are kept in the journal, marked as failed
+                            failed_data = incremental.record_error(domain, domain_data)
+                            if failed_data is not None:
+                                journal_sink.write(failed_data)
+    if incremental is not None:
+        logger.info("Changes since the previous run: %s", incremental.summary)
+
+
+def create_config(args: argparse.Namespace) -> Config:
+    """Create configuration object from script's console arguments"""
+    return Config(
         input_column=args.input_column,
         contact_paths=DEFAULT_CONTACT_PATHS,
         product_list_path=DEFAULT_PRODUCT_LIST_PATH,
         product_count=args.product_count,
         throttle_delay=args.throttle,
+        burst=args.burst,
+        max_requests_per_host=args.max_requests_per_host,
+        concurrency=args.concurrency,
+        parse_workers=args.parse_workers,
+        stop_when_complete=args.stop_when_complete,
+        stop_after_emails=args.stop_after_emails,
+        html_parser=args.html_parser,
+        json_backend=args.json_backend,
+        targeted_json=args.targeted_json,
+        connection_limit=args.connection_limit,
+        connection_limit_per_host=args.connection_limit_per_host,
+        keepalive_timeout=args.keepalive_timeout,
+        dns_cache_ttl=args.dns_cache_ttl,
+        max_body_size=args.max_body_size * 1024,
+        max_retries=args.max_retries,
+        retry_backoff=args.retry_backoff,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        request_timeout=args.request_timeout,
+        domain_timeout=args.domain_timeout,
+        cache_path=args.cache,
+        cache_max_size=args.cache_max_size * 1024**2,
+        cache_ttl=args.cache_ttl,
     )
-    logger.info("Starting script with %s", config)
 
-    # read domains from input file
-    # file is read synchronously, therefore run it in executor
-    loop = asyncio.get_running_loop()
-    domains = await loop.run_in_executor(
-        None, read_domains, args.in_file, config.input_column
-    )
 
-    # concurrently get data for each domain
-    tasks = []
-    for domain in domains:
-        tasks.append(asyncio.create_task(get_domain_data(domain, config)))
+@asynccontextmanager
+async def serve_metrics(port: int | None) -> AsyncGenerator[None, None]:
+    """
+    Context manager serving crawl metrics at given port (if any), their summary is logged at its exit
 
-    domain_data_list = [
-        domain_data
-        for domain_data in await asyncio.gather(*tasks, return_exceptions=True)
-        if isinstance(domain_data, DomainData)
-    ]
+    :param port: port of metrics server, see metrics.start_metrics_server
+    """
+    metrics_server = None
+    if port is not None:
+        metrics_server = await start_metrics_server(port)
+        logger.info("Exposing metrics at http://127.0.0.1:%d/metrics", port)
+    try:
+        yield
+    finally:
+        if metrics_server is not None:
+            await metrics_server.cleanup()
+        logger.info("Crawl summary:\n%s", crawl_metrics.summary())
 
-    # output data to file
-    # writing is done synchronously, therefore run it in executor
-    await loop.run_in_executor(
-        None, write_domain_data, domain_data_list, args.out_file, config.product_count
+
+async def run(
+    config: Config,
+    args: argparse.Namespace,
+    shard: Shard | None = None,
+    incremental: IncrementalCrawl | None = None,
+) -> None:
+    """
+    Run crawl with (optional) metrics server, its summary is logged at the end
+
+    :param config: configuration object, see model.Config
+    :param args: script's console arguments
+    :param shard: shard of worker process, its output, journal and status file are parts of the files
+        given by the arguments and its metrics server listens on the port given by the arguments + shard's number
+    :param incremental: incremental crawl, see create_incremental_crawl
+    """
+    out_file = args.out_file
+    journal_file = args.journal or f"{args.out_file}.journal.jsonl"
+    status_file = args.status_file
+    metrics_port = args.metrics_port
+    if shard is not None:
+        out_file = get_shard_file_path(out_file, shard)
+        journal_file = get_shard_file_path(journal_file, shard)
+        if status_file is not None:
+            status_file = get_shard_file_path(status_file, shard)
+        if metrics_port is not None:
+            metrics_port += shard.number
+
+    async with serve_metrics(metrics_port):
+        await crawl(
+            config,
+            args.in_file,
+            out_file,
+            journal_file,
+            args.resume,
+            args.progress_interval,
+            status_file,
+            shard or args.shard,
+            incremental,
+            args.dedupe_on_disk,
+        )
+
+
+def create_incremental_crawl(args: argparse.Namespace) -> IncrementalCrawl | None:
+    """Create incremental crawl from script's console arguments, None if it is not requested"""
+    if not args.previous:
+        return None
+    return IncrementalCrawl.from_journals(
+        args.previous, fresh_for=args.fresh_for, max_recrawls=args.max_recrawls
     )
 
 
+def run_worker(
+    config: Config,
+    args: argparse.Namespace,
+    shard: Shard,
+    incremental: IncrementalCrawl | None = None,
+) -> None:
+    """Run crawl of the shard in worker process"""
+    setup_logging(logging.getLevelName(args.log))
+    asyncio.run(run(config, args, shard, incremental))
+
+
+async def run_workers(
+    config: Config,
+    args: argparse.Namespace,
+    incremental: IncrementalCrawl | None = None,
+) -> None:
+    """
+    Run crawl in `args.workers` processes, each of them crawls its shard of domains with its own event loop
+
+    Outputs of the workers are merged to the output file once all of them finish. Workers' journals are kept,
+    so that the crawl can be resumed (with the same number of workers).
+
+    :param incremental: incremental crawl loaded before workers start, so that the previous run's journals
+        are read before workers overwrite them (they are commonly the same files), each worker gets data
+        of its shard only
+    """
+    shards = [Shard(i, args.workers) for i in range(args.workers)]
+    loop = asyncio.get_running_loop()
+    # worker processes are spawned, forking process with running event loop is not safe
+    with ProcessPoolExecutor(
+        args.workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    executor,
+                    run_worker,
+                    config,
+                    args,
+                    shard,
+                    incremental.for_shard(shard) if incremental is not None else None,
+                )
+                for shard in shards
+            )
+        )
+
+    part_files = [get_shard_file_path(args.out_file, shard) for shard in shards]
+    logger.info("Merging outputs of %d workers to %s", args.workers, args.out_file)
+    if is_csv_file(args.out_file):
+        merge_csv_files(part_files, args.out_file)
+    else:
+        # other formats can't be concatenated, data are copied from workers' journals instead
+        journal_file = args.journal or f"{args.out_file}.journal.jsonl"
+        with create_sink(args.out_file, config.product_count) as sink:
+            if incremental is not None:
+                # journals record data of all domains, only those changed since the previous run are written
+                sink = ChangesSink(sink, incremental)
+            for shard in shards:
+                for domain_data in read_json_lines(
+                    get_shard_file_path(journal_file, shard)
+                ):
+                    sink.write(domain_data)
+    for part_file in part_files:
+        os.remove(part_file)
+
+
+async def main() -> None:
+    parser = setup_argument_parser()
+    args = parser.parse_args()
+    if args.workers > 1 and args.shard is not None:
+        parser.error("--workers and --shard can't be combined")
+    setup_logging(logging.getLevelName(args.log))
+
+    config = create_config(args)
+    logger.info("Starting script with %s", config)
+    if args.domain_map is not None:
+        await asyncio.get_running_loop().run_in_executor(
+            None,
+            write_domain_map,
+            args.in_file,
+            args.input_column,
+            args.domain_map,
+            args.dedupe_on_disk,
+        )
+
+    incremental = create_incremental_crawl(args)
+    if args.workers > 1:
+        await run_workers(config, args, incremental)
+    else:
+        await run(config, args, incremental=incremental)
+
+
 if __name__ == "__main__":
     asyncio.run(main())
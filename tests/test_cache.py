@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+from crawler.cache import CacheEntry, ResponseCache
+
+
+@pytest.mark.asyncio
+async def test_response_cache_persists_entries(tmp_path):
+    cache_path = str(tmp_path / "cache.sqlite")
+    entry = CacheEntry("https://sufio.com/", body="page", etag='"v1"', stored_at=1)
+    with ResponseCache(cache_path) as cache:
+        assert await cache.get("https://sufio.com/") is None
+        await cache.put(entry)
+
+    with ResponseCache(cache_path) as cache:
+        assert await cache.get("https://sufio.com/") == entry
+
+
+@pytest.mark.asyncio
+async def test_response_cache_evicts_least_recently_used(tmp_path):
+    with ResponseCache(str(tmp_path / "cache.sqlite"), max_size=250) as cache:
+        for path in ["a", "b", "c"]:
+            await cache.put(CacheEntry(f"https://sufio.com/{path}", body="x" * 100))
+            await cache.get("https://sufio.com/a")
+
+        assert await cache.get("https://sufio.com/a") is not None
+        assert await cache.get("https://sufio.com/b") is None
+        assert await cache.get("https://sufio.com/c") is not None
+
+
+def test_response_cache_is_fresh(tmp_path):
+    entry = CacheEntry("https://sufio.com/", stored_at=time.time() - 10)
+    with ResponseCache(str(tmp_path / "cache.sqlite")) as cache:
+        assert not cache.is_fresh(entry)
+    with ResponseCache(str(tmp_path / "cache.sqlite"), ttl=60) as cache:
+        assert cache.is_fresh(entry)
+    with ResponseCache(str(tmp_path / "cache.sqlite"), ttl=5) as cache:
+        assert not cache.is_fresh(entry)
+
+
+def test_cache_entry_validators():
+    assert CacheEntry("https://sufio.com/").validators == {}
+    assert CacheEntry(
+        "https://sufio.com/", etag='"v1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT"
+    ).validators == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
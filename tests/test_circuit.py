@@ -0,0 +1,63 @@
+import asyncio
+import inspect
+
+import aiohttp
+import pytest
+from asynctest import mock
+
+from crawler.circuit import CircuitBreaker, HostUnavailableError
+
+
+def test_circuit_breaker():
+    circuit_breaker = CircuitBreaker()
+    circuit_breaker.check("sufio.com")
+
+    assert not circuit_breaker.record_failure(
+        "sufio.com", aiohttp.ServerDisconnectedError()
+    )
+    assert circuit_breaker.error is None
+
+    assert circuit_breaker.record_failure(
+        "sufio.com",
+        aiohttp.ClientConnectorError(mock.MagicMock(), ConnectionRefusedError()),
+    )
+    with pytest.raises(HostUnavailableError):
+        circuit_breaker.check("sufio.com")
+    circuit_breaker.check("www.sufio.com")
+    assert circuit_breaker.error.startswith("Cannot connect to host")
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_interrupts_waiting():
+    circuit_breaker = CircuitBreaker()
+    assert (
+        await circuit_breaker.wait_while_alive("sufio.com", asyncio.sleep(0, "done"))
+        == "done"
+    )
+
+    waiting = asyncio.ensure_future(
+        circuit_breaker.wait_while_alive("sufio.com", asyncio.sleep(10))
+    )
+    await asyncio.sleep(0)
+    circuit_breaker.record_failure(
+        "sufio.com",
+        aiohttp.ClientConnectorError(mock.MagicMock(), ConnectionRefusedError()),
+    )
+    with pytest.raises(HostUnavailableError):
+        await asyncio.wait_for(waiting, 1)
+
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings("error::RuntimeWarning")
+async def test_circuit_breaker_closes_awaitable_of_dead_host():
+    circuit_breaker = CircuitBreaker()
+    circuit_breaker.record_failure(
+        "sufio.com",
+        aiohttp.ClientConnectorError(mock.MagicMock(), ConnectionRefusedError()),
+    )
+    sleep = asyncio.sleep(10)
+
+    with pytest.raises(HostUnavailableError):
+        await circuit_breaker.wait_while_alive("sufio.com", sleep)
+    # closed coroutine does not warn that it was never awaited
+    assert inspect.getcoroutinestate(sleep) == inspect.CORO_CLOSED
@@ -0,0 +1,66 @@
+import pytest
+
+from crawler.domains import (
+    MemoryDomainSet,
+    SqliteDomainSet,
+    canonicalize_domain,
+    get_domain_key,
+)
+
+
+@pytest.mark.parametrize(
+    "value, expected_domain",
+    [
+        ["sufio.com", "sufio.com"],
+        [" Sufio.COM ", "sufio.com"],
+        ["https://www.sufio.com/", "www.sufio.com"],
+        ["http://sufio.com/pages/contact?x=1", "sufio.com"],
+        ["sufio.com./", "sufio.com"],
+        ["//user:password@shop.sufio.com:8080", "shop.sufio.com"],
+        ["bücher.de", "xn--bcher-kva.de"],
+        ["www.com", "www.com"],
+    ],
+)
+def test_canonicalize_domain(value, expected_domain):
+    assert canonicalize_domain(value) == expected_domain
+
+
+@pytest.mark.parametrize(
+    "domain, expected_key",
+    [
+        ["sufio.com", "sufio.com"],
+        ["www.sufio.com", "sufio.com"],
+        ["shop.sufio.com", "shop.sufio.com"],
+        ["www.com", "www.com"],
+    ],
+)
+def test_get_domain_key(domain, expected_key):
+    assert get_domain_key(domain) == expected_key
+
+
+@pytest.mark.parametrize("value", ["", "  ", "https://", "sufio..com"])
+def test_canonicalize_invalid_domain(value):
+    with pytest.raises(ValueError):
+        canonicalize_domain(value)
+
+
+@pytest.mark.parametrize("domain_set_class", [MemoryDomainSet, SqliteDomainSet])
+def test_domain_set(domain_set_class):
+    with domain_set_class() as domain_set:
+        assert [
+            domain_set.add(domain)
+            for domain in ["sufio.com", "guestcloud.net", "sufio.com"]
+        ] == [True, True, False]
+        assert not domain_set.add("www.sufio.com", "sufio.com")
+        assert domain_set.add("www.shopify.com", "shopify.com")
+        assert domain_set.get("shopify.com") == "www.shopify.com"
+        assert domain_set.get("sufio.com") == "sufio.com"
+        assert domain_set.get("www.sufio.com") is None
+
+
+def test_sqlite_domain_set_deletes_database(tmp_path):
+    domain_set = SqliteDomainSet(str(tmp_path))
+    domain_set.add("sufio.com")
+    domain_set.close()
+
+    assert list(tmp_path.iterdir()) == []
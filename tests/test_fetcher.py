@@ -0,0 +1,216 @@
+import time
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from asynctest import mock
+
+from crawler.cache import ResponseCache
+from crawler.circuit import CircuitBreaker
+from crawler.fetcher import Fetcher
+from crawler.metrics import Metrics
+from crawler.ratelimit import HostRateLimiter
+from crawler.retry import RetryPolicy
+
+big_page = "<p>" + "x" * 100_000 + "</p>"
+
+
+@pytest.fixture
+async def server():
+    requests = []
+    redirects = {"/old": "/", "/pages/about": "/pages/about-us", "/loop": "/loop"}
+
+    async def handler(request):
+        requests.append(request.path)
+        if request.path in redirects:
+            raise web.HTTPMovedPermanently(redirects[request.path])
+        if request.path == "/broken":
+            raise web.HTTPInternalServerError()
+        if request.path == "/throttled" and requests.count(request.path) == 1:
+            raise web.HTTPTooManyRequests(headers={"Retry-After": "0"})
+        if request.path == "/throttled-long":
+            raise web.HTTPTooManyRequests(headers={"Retry-After": "3600"})
+        if request.path == "/big":
+            return web.Response(text=big_page)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(text=request.path, headers={"ETag": '"v1"'})
+
+    app = web.Application()
+    app.router.add_get("/{path:.*}", handler)
+    async with TestServer(app) as test_server:
+        test_server.requests = requests
+        yield test_server
+
+
+@pytest.fixture
+async def session():
+    async with aiohttp.ClientSession() as client_session:
+        yield client_session
+
+
+@pytest.mark.asyncio
+async def test_get_pages(server, session):
+    fetcher = Fetcher(session, HostRateLimiter(rate=None, max_concurrent=3))
+    urls = [str(server.make_url(path)) for path in ["/", "/broken", "/a"]]
+
+    assert sorted([page async for page in fetcher.get_pages(urls)]) == ["/", "/a"]
+
+
+@pytest.mark.asyncio
+async def test_get_pages_deduplicates_redirects(server, session):
+    fetcher = Fetcher(session, HostRateLimiter(rate=None, max_concurrent=3))
+    urls = [str(server.make_url(path)) for path in ["/pages/about", "/pages/about-us"]]
+
+    assert [page async for page in fetcher.get_pages(urls)] == ["/pages/about-us"]
+    assert sorted(server.requests) == ["/pages/about", "/pages/about-us"]
+
+
+@pytest.mark.asyncio
+async def test_get_pages_stops(server, session):
+    fetcher = Fetcher(session, HostRateLimiter(rate=20, max_concurrent=3))
+    urls = [str(server.make_url(path)) for path in ["/", "/a", "/b"]]
+    pages = []
+
+    async for page in fetcher.get_pages(urls, should_stop=lambda: bool(pages)):
+        pages.append(page)
+
+    assert pages == ["/"]
+    assert server.requests == ["/"]
+
+
+@pytest.mark.asyncio
+async def test_get_page_raises(server, session):
+    fetcher = Fetcher(session, HostRateLimiter(rate=None))
+    with pytest.raises(aiohttp.ClientError):
+        await fetcher.get_page(str(server.make_url("/broken")))
+    with pytest.raises(aiohttp.ClientError):
+        await fetcher.get_page(str(server.make_url("/loop")))
+    with pytest.raises(ValueError):
+        await fetcher.get_page(str(server.make_url("/")), as_json=True)
+    assert await fetcher.get_page_or_none(str(server.make_url("/broken"))) is None
+
+
+@pytest.mark.asyncio
+async def test_get_page_truncates_body(server, session):
+    fetcher = Fetcher(session, HostRateLimiter(rate=None), max_body_size=1000)
+
+    assert await fetcher.get_page(str(server.make_url("/big"))) == big_page[:1000]
+
+
+@pytest.mark.asyncio
+async def test_get_page_stops_download(server, session, tmp_path):
+    chunks = []
+
+    def feed(chunk):
+        chunks.append(chunk)
+        return True
+
+    with ResponseCache(str(tmp_path / "cache.sqlite")) as cache:
+        fetcher = Fetcher(session, HostRateLimiter(rate=None), cache)
+        page = await fetcher.get_page(str(server.make_url("/big")), feed=feed)
+
+        assert page == chunks[0]
+        assert len(page) < len(big_page)
+        # incomplete page is not cached
+        assert await cache.get(str(server.make_url("/big"))) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ttl, expected_requests", [(None, 4), (60, 2)])
+async def test_get_page_cached(server, session, tmp_path, ttl, expected_requests):
+    url = str(server.make_url("/old"))
+    with ResponseCache(str(tmp_path / "cache.sqlite"), ttl=ttl) as cache:
+        fetcher = Fetcher(session, HostRateLimiter(rate=None), cache)
+        assert await fetcher.get_page(url) == "/"
+        # second time the page is revalidated (not modified) or used without request
+        assert await fetcher.get_page(url) == "/"
+
+    assert len(server.requests) == expected_requests
+
+
+@pytest.mark.asyncio
+async def test_get_page_retries(server, session):
+    fetcher = Fetcher(
+        session,
+        HostRateLimiter(rate=10),
+        retry_policy=RetryPolicy(max_retries=2, backoff=0.01),
+    )
+
+    assert await fetcher.get_page(str(server.make_url("/throttled"))) == "/throttled"
+    assert server.requests == ["/throttled", "/throttled"]
+    # host is slowed down after throttled request and sped up after successful one
+    assert (
+        fetcher.rate_limiter._hosts[server.make_url("/").raw_authority].bucket.rate
+        == 5.625
+    )
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        await fetcher.get_page(str(server.make_url("/broken")))
+    assert server.requests.count("/broken") == 3
+
+
+@pytest.mark.asyncio
+async def test_get_page_caps_pause_of_throttling_host(server, session):
+    fetcher = Fetcher(
+        session,
+        HostRateLimiter(rate=None),
+        retry_policy=RetryPolicy(max_retries=2, backoff_max=0.1),
+    )
+    # Retry-After longer than backoff_max is not retried
+    assert (
+        await fetcher.get_page_or_none(str(server.make_url("/throttled-long"))) is None
+    )
+
+    start = time.monotonic()
+    await fetcher.get_page(str(server.make_url("/")))
+    # other requests to the host are paused by backoff_max, not by Retry-After
+    assert time.monotonic() - start < 1
+
+
+@pytest.mark.asyncio
+async def test_get_pages_skips_dead_host(session):
+    circuit_breaker = CircuitBreaker()
+    fetcher = Fetcher(
+        session,
+        HostRateLimiter(rate=None),
+        retry_policy=RetryPolicy(max_retries=2, backoff=0.01),
+    ).with_circuit_breaker(circuit_breaker)
+    # nothing listens on the port
+    urls = [f"http://127.0.0.1:1/{path}" for path in ["", "a", "b"]]
+
+    with mock.patch.object(session, "get", wraps=session.get) as get_mock:
+        assert [page async for page in fetcher.get_pages(urls)] == []
+
+    get_mock.assert_called_once()
+    assert circuit_breaker.error.startswith("Cannot connect to host 127.0.0.1:1")
+
+
+@pytest.mark.asyncio
+async def test_get_pages_skips_dead_host_waiting_for_rate_limiter(session):
+    rate_limiter = HostRateLimiter(rate=1, max_concurrent=3)
+    fetcher = Fetcher(
+        session, rate_limiter, retry_policy=RetryPolicy(max_retries=0)
+    ).with_circuit_breaker(CircuitBreaker())
+    urls = [f"http://127.0.0.1:1/{path}" for path in ["", "a", "b", "c", "d"]]
+
+    start = time.monotonic()
+    assert [page async for page in fetcher.get_pages(urls)] == []
+
+    # remaining requests do not wait for their turn (1 s each)
+    assert time.monotonic() - start < 0.5
+    # tokens reserved by skipped requests are returned
+    assert rate_limiter._hosts["127.0.0.1:1"].bucket.tokens > -1
+
+
+@pytest.mark.asyncio
+async def test_get_page_records_metrics(server, session):
+    fetcher = Fetcher(session, HostRateLimiter(rate=None))
+    with mock.patch("crawler.fetcher.crawl_metrics", Metrics()) as metrics:
+        await fetcher.get_page(str(server.make_url("/big")))
+        await fetcher.get_page_or_none(str(server.make_url("/broken")))
+
+    assert metrics.stages["fetch"].count == 2
+    assert metrics.responses == {"200": 1, "500": 1}
+    assert metrics.downloaded_bytes >= len(big_page)
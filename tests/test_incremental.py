@@ -0,0 +1,127 @@
+from crawler.incremental import (
+    ChangesSink,
+    ChangeSummary,
+    IncrementalCrawl,
+    get_recrawl_priority,
+)
+from crawler.models import CompactDomainData, DomainData
+from crawler.sinks import JsonLinesSink, read_json_lines
+
+NOW = 1_700_000_000.0
+DAY = 24 * 60 * 60
+
+
+def test_get_recrawl_priority():
+    new = None
+    failed = DomainData("failed.com", error="Cannot connect", crawled_at=NOW - DAY)
+    changed = DomainData("changed.com", crawled_at=NOW - DAY, changed_at=NOW - DAY)
+    stale = DomainData("stale.com", crawled_at=NOW - 7 * DAY, changed_at=NOW - 30 * DAY)
+    recent = DomainData("recent.com", crawled_at=NOW - DAY, changed_at=NOW - 30 * DAY)
+
+    assert sorted([recent, stale, changed, failed, new], key=get_recrawl_priority) == [
+        new,
+        failed,
+        changed,
+        stale,
+        recent,
+    ]
+
+
+def test_plan():
+    previous = {
+        "fresh.com": DomainData("fresh.com", crawled_at=NOW - DAY),
+        "failed.com": DomainData(
+            "failed.com", error="Cannot connect", crawled_at=NOW - DAY
+        ),
+        "stale.com": DomainData("stale.com", crawled_at=NOW - 7 * DAY),
+    }
+    incremental = IncrementalCrawl(previous.values(), fresh_for=2 * DAY)
+
+    to_crawl, carried_over = incremental.plan(
+        ["stale.com", "fresh.com", "failed.com", "new.com"], now=NOW
+    )
+
+    assert to_crawl == ["new.com", "failed.com", "stale.com"]
+    assert carried_over == [previous["fresh.com"]]
+    assert incremental.summary == ChangeSummary(fresh=1)
+
+
+def test_plan_defers_domains_over_limit():
+    previous = {
+        "stale.com": DomainData("stale.com", crawled_at=NOW - 7 * DAY),
+        "staler.com": DomainData("staler.com", crawled_at=NOW - 14 * DAY),
+    }
+    incremental = IncrementalCrawl(previous.values(), max_recrawls=2)
+
+    to_crawl, carried_over = incremental.plan(
+        ["stale.com", "staler.com", "new.com", "other-new.com"], now=NOW
+    )
+
+    assert to_crawl == ["new.com", "other-new.com"]
+    assert carried_over == [previous["staler.com"], previous["stale.com"]]
+    assert incremental.summary == ChangeSummary(deferred=2)
+
+
+def test_changes_sink(tmp_path):
+    previous = {
+        "unchanged.com": DomainData(
+            "unchanged.com", emails={"info@unchanged.com"}, changed_at=NOW - 7 * DAY
+        ),
+        "changed.com": DomainData("changed.com", emails={"old@changed.com"}),
+    }
+    incremental = IncrementalCrawl(previous.values())
+    out_file = str(tmp_path / "output.jsonl")
+
+    with ChangesSink(JsonLinesSink(out_file), incremental) as sink:
+        sink.write(
+            DomainData("unchanged.com", emails={"info@unchanged.com"}, crawled_at=NOW)
+        )
+        sink.write(
+            DomainData("changed.com", emails={"new@changed.com"}, crawled_at=NOW)
+        )
+        sink.write(DomainData("new.com", error="Cannot connect", crawled_at=NOW))
+
+    written = list(read_json_lines(out_file))
+    assert written == [
+        DomainData("changed.com", emails={"new@changed.com"}),
+        DomainData("new.com", error="Cannot connect"),
+    ]
+    assert all(domain_data.changed_at == NOW for domain_data in written)
+    assert incremental.summary == ChangeSummary(new=1, changed=1, unchanged=1, failed=1)
+
+
+def test_record_skips_carried_over_data():
+    previous = DomainData(
+        "failed.com", emails={"info@failed.com"}, crawled_at=NOW - DAY
+    )
+    incremental = IncrementalCrawl([previous])
+
+    carried_over = incremental.record_error("failed.com", ValueError("Broken page"))
+
+    assert carried_over == DomainData(
+        "failed.com", emails={"info@failed.com"}, error="Broken page"
+    )
+    assert incremental.record_error("new.com", ValueError()) is None
+    # replayed journal does not count it as crawled domain
+    assert not incremental.record(carried_over)
+    assert incremental.summary == ChangeSummary(failed=2)
+
+
+def test_from_journals(tmp_path):
+    journal_files = [
+        str(tmp_path / "journal-0.jsonl"),
+        str(tmp_path / "journal-1.jsonl"),
+    ]
+    with JsonLinesSink(journal_files[0]) as journal:
+        journal.write(DomainData("sufio.com", emails={"old@sufio.com"}))
+        journal.write(DomainData("guestcloud.net"))
+    with JsonLinesSink(journal_files[1]) as journal:
+        journal.write(DomainData("sufio.com", emails={"new@sufio.com"}, crawled_at=NOW))
+
+    incremental = IncrementalCrawl.from_journals(journal_files)
+
+    assert incremental.previous == {
+        "sufio.com": CompactDomainData("sufio.com", emails=("new@sufio.com",)),
+        "guestcloud.net": CompactDomainData("guestcloud.net"),
+    }
+    assert incremental.previous["sufio.com"].crawled_at == NOW
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from crawler import json_backends
+from crawler.json_backends import decode_product_targeted, get_json_backend
+
+product_json = json.dumps(
+    {
+        "product": {
+            "id": 1,
+            "title": 'Tričko "Sufio"',
+            "body_html": '<p>"images": [], "title": "fake"</p>',
+            "variants": [{"id": 2, "title": "XL", "image": {"src": "variant.png"}}],
+            "images": [{"id": 3, "src": "image_link", "alt": "}]"}],
+            "image": {"id": 3, "src": "image_link"},
+        }
+    },
+    indent=1,
+)
+
+
+def test_decode_product_targeted():
+    assert decode_product_targeted(product_json) == {
+        "product": {
+            "title": 'Tričko "Sufio"',
+            "images": [{"id": 3, "src": "image_link", "alt": "}]"}],
+        }
+    }
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        "{}",
+        '{"products": [{"title": "a", "images": []}]}',
+        # title of variant precedes title of product
+        '{"product": {"variants": [{"title": "XL"}], "title": "a", "images": []}}',
+        # images of variant follow images of product
+        '{"product": {"title": "a", "images": [], "variants": [{"images": []}]}}',
+        '{"product": {"title": "a"}}',
+        '{"product": {"title": null, "images": []}}',
+        '{"product": {"x\\\\"title": "a", "title": "b", "images": []}}',
+        '{"product": {"title": "a", "images": [}}',
+    ],
+)
+def test_decode_product_targeted_unexpected_structure(document):
+    assert decode_product_targeted(document) is None
+
+
+def test_get_json_backend():
+    assert get_json_backend("json") is json.loads
+    assert get_json_backend("auto")('{"a": [1]}') == {"a": [1]}
+    with pytest.raises(ValueError):
+        get_json_backend("unknown")
+
+
+@pytest.mark.parametrize("name", list(json_backends.JSON_BACKENDS))
+def test_json_backends(name):
+    assert get_json_backend(name)(product_json) == json.loads(product_json)
@@ -1,3 +1,8 @@
+import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
 import pytest
 from asynctest import mock
 
@@ -8,21 +13,32 @@ from crawler.constants import (
     DEFAULT_THROTTLE_DELAY,
     OUTPUT_HEADER,
     facebook_re_pattern,
+    twitter_re_pattern,
+    email_re_pattern,
+    twitter_link_re_pattern,
     DEFAULT_INPUT_COLUMN,
 )
 from crawler.logic import (
     extract_product_links,
     extract_product_data,
     read_domains,
+    stream_domains,
     get_domain_data,
+    decode_product_json,
+    has_enough_contacts,
     get_header_row,
     domain_data_to_row,
     get_product_json_urls,
     extract_emails,
     extract_by_re_pattern,
+    create_session,
+    extract_contacts,
+    extract_social_links,
+    extract_bulk_product_data,
+    get_product_json_urls_from_list_page,
 )
 from crawler.models import Product, Config, DomainData
-from tests.utils import get_generator_mock
+from tests.utils import get_fetcher_mock
 
 
 product_page = """
@@ -42,6 +58,42 @@ product_page = """
 """
 
 
+def write_input_file(tmp_path, domains):
+    file_path = tmp_path / "input.csv"
+    file_path.write_text("\n".join([DEFAULT_INPUT_COLUMN, *domains]) + "\n")
+    return str(file_path)
+
+
+def test_read_domains(tmp_path):
+    file_path = write_input_file(tmp_path, ["sufio.com", "guestcloud.net"])
+    assert read_domains(file_path, DEFAULT_INPUT_COLUMN) == [
+        "sufio.com",
+        "guestcloud.net",
+    ]
+
+
+def test_read_domains_canonicalizes_domains(tmp_path):
+    file_path = write_input_file(
+        tmp_path, ["https://www.Sufio.com/", "", "sufio..com", "sufio.com"]
+    )
+    assert read_domains(file_path, DEFAULT_INPUT_COLUMN) == [
+        "www.sufio.com",
+        "sufio.com",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_domains(tmp_path):
+    domains = [f"store{i}.com" for i in range(5)]
+    file_path = write_input_file(tmp_path, domains)
+    assert [
+        domain
+        async for domain in stream_domains(
+            file_path, DEFAULT_INPUT_COLUMN, batch_size=2
+        )
+    ] == domains
+
+
 @pytest.mark.parametrize(
     "string, count, expected_result",
     [
@@ -97,6 +149,36 @@ def test_extract_product_data(product_dict, expected_result):
     assert extract_product_data(product_dict) == expected_result
 
 
+@pytest.mark.parametrize(
+    "products_dict, product_count, expected_result",
+    [
+        [{}, 5, None],
+        [{"products": None}, 5, None],
+        [{"products": []}, 5, []],
+        [{"products": [1, 2]}, 5, None],
+        [{"products": [{"images": None}]}, 5, None],
+        [{"products": [{"images": ["a.png"]}]}, 5, None],
+        [
+            {
+                "products": [
+                    product_dict1["product"],
+                    {},
+                    product_dict2["product"],
+                    product_dict1["product"],
+                ]
+            },
+            2,
+            [
+                Product(title="some title", image_url="image_link"),
+                Product(title="some title2", image_url="image_link2"),
+            ],
+        ],
+    ],
+)
+def test_extract_bulk_product_data(products_dict, product_count, expected_result):
+    assert extract_bulk_product_data(products_dict, product_count) == expected_result
+
+
 contact_page1 = """
     <html>
         Some contact jozo.hossa@sufio.com
@@ -126,19 +208,104 @@ def test_extract_emails(string, expected_result):
     assert extract_emails(string) == expected_result
 
 
+def test_extract_contacts_in_process_pool():
+    with ProcessPoolExecutor(1) as executor:
+        assert executor.submit(extract_contacts, contact_page2).result() == (
+            {"marian.gaborik@sufio.com"},
+            {"facebook.com/sufio2"},
+            {"https://twitter.com/sufio"},
+        )
+
+
+@pytest.mark.parametrize("targeted", [True, False])
+def test_decode_product_json(targeted):
+    assert (
+        decode_product_json(json.dumps(product_dict1), targeted=targeted)
+        == product_dict1
+    )
+    assert decode_product_json('{"product": {}}', targeted=targeted) == {"product": {}}
+    with pytest.raises(ValueError):
+        decode_product_json('{"product": ', targeted=targeted)
+
+
+@pytest.mark.parametrize(
+    "domain_data, stop_when_complete, stop_after_emails, expected_result",
+    [
+        (DomainData("sufio.com"), True, 0, False),
+        (DomainData("sufio.com", emails={"a@sufio.com"}), True, 0, False),
+        (
+            DomainData(
+                "sufio.com",
+                emails={"a@sufio.com"},
+                facebooks={"facebook.com/sufio"},
+                twitters={"twitter.com/sufio"},
+            ),
+            True,
+            0,
+            True,
+        ),
+        (
+            DomainData(
+                "sufio.com",
+                emails={"a@sufio.com"},
+                facebooks={"facebook.com/sufio"},
+                twitters={"twitter.com/sufio"},
+            ),
+            False,
+            0,
+            False,
+        ),
+        (DomainData("sufio.com", emails={"a@sufio.com"}), False, 1, True),
+        (DomainData("sufio.com", emails={"a@sufio.com"}), True, 2, False),
+    ],
+)
+def test_has_enough_contacts(
+    domain_data, stop_when_complete, stop_after_emails, expected_result
+):
+    config = Config(
+        input_column=DEFAULT_INPUT_COLUMN,
+        contact_paths=DEFAULT_CONTACT_PATHS,
+        product_list_path=DEFAULT_PRODUCT_LIST_PATH,
+        product_count=DEFAULT_PRODUCT_COUNT,
+        throttle_delay=DEFAULT_THROTTLE_DELAY,
+        stop_when_complete=stop_when_complete,
+        stop_after_emails=stop_after_emails,
+    )
+    assert has_enough_contacts(domain_data, config) == expected_result
+
+
 @pytest.mark.asyncio
-@mock.patch("crawler.utils.get_pages")
-@mock.patch("crawler.utils.get_page")
-async def test_get_domain_data(get_page_mock, get_pages_mock):
-    get_page_mock.return_value = product_page
-    get_pages_mock.side_effect = [
-        get_generator_mock(
-            [contact_page1, contact_page2, ""]
-        ),  # result of getting contact pages
-        get_generator_mock(
-            [product_dict1, product_dict2, {}]
-        ),  # result of getting product jsons
-    ]
+@pytest.mark.parametrize("parse_workers, streamed", [(0, True), (1, False)])
+async def test_get_product_json_urls_from_list_page(parse_workers, streamed):
+    fetcher = get_fetcher_mock(page=product_page, contact_pages=[], product_jsons=[])
+    config = Config(
+        input_column=DEFAULT_INPUT_COLUMN,
+        contact_paths=DEFAULT_CONTACT_PATHS,
+        product_list_path=DEFAULT_PRODUCT_LIST_PATH,
+        product_count=DEFAULT_PRODUCT_COUNT,
+        throttle_delay=DEFAULT_THROTTLE_DELAY,
+        html_parser="streaming",
+    )
+
+    with (
+        ProcessPoolExecutor(parse_workers) if parse_workers else nullcontext()
+    ) as executor:
+        product_urls = await get_product_json_urls_from_list_page(
+            "sufio.com", config, fetcher, executor
+        )
+
+    assert product_urls
+    # streaming scanner runs on the event loop, therefore the page is parsed in executor if there is one
+    assert (fetcher.get_page.call_args.kwargs["feed"] is not None) == streamed
+
+
+@pytest.mark.asyncio
+async def test_get_domain_data():
+    fetcher = get_fetcher_mock(
+        page=product_page,
+        contact_pages=[contact_page1, contact_page2, ""],
+        product_jsons=[product_dict1, product_dict2, {}],
+    )
 
     assert await get_domain_data(
         "www.sufio.com",
@@ -149,6 +316,7 @@ async def test_get_domain_data(get_page_mock, get_pages_mock):
             product_count=DEFAULT_PRODUCT_COUNT,
             throttle_delay=DEFAULT_THROTTLE_DELAY,
         ),
+        fetcher,
     ) == DomainData(
         domain="www.sufio.com",
         emails={"jozo.hossa@sufio.com", "marian.gaborik@sufio.com"},
@@ -161,6 +329,92 @@ async def test_get_domain_data(get_page_mock, get_pages_mock):
     )
 
 
+@pytest.mark.asyncio
+async def test_get_domain_data_bulk_products():
+    fetcher = get_fetcher_mock(
+        page={"products": [product_dict1["product"], product_dict2["product"]]},
+        contact_pages=[contact_page1],
+        product_jsons=[],
+    )
+
+    domain_data = await get_domain_data(
+        "www.sufio.com",
+        Config(
+            input_column=DEFAULT_INPUT_COLUMN,
+            contact_paths=DEFAULT_CONTACT_PATHS,
+            product_list_path=DEFAULT_PRODUCT_LIST_PATH,
+            product_count=DEFAULT_PRODUCT_COUNT,
+            throttle_delay=DEFAULT_THROTTLE_DELAY,
+        ),
+        fetcher,
+    )
+
+    fetcher.get_page.assert_called_once_with(
+        "https://www.sufio.com/products.json?limit=5", as_json=True
+    )
+    assert domain_data.products == [
+        Product(title="some title", image_url="image_link"),
+        Product(title="some title2", image_url="image_link2"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_domain_data_time_budget_exceeded():
+    fetcher = get_fetcher_mock(
+        page={"products": [product_dict1["product"]]},
+        contact_pages=[],
+        product_jsons=[],
+    )
+
+    async def get_pages(urls, **kwargs):
+        yield contact_page1
+        await asyncio.sleep(10)
+        yield contact_page2
+
+    fetcher.get_pages.side_effect = get_pages
+
+    domain_data = await get_domain_data(
+        "www.sufio.com",
+        Config(
+            input_column=DEFAULT_INPUT_COLUMN,
+            contact_paths=DEFAULT_CONTACT_PATHS,
+            product_list_path=DEFAULT_PRODUCT_LIST_PATH,
+            product_count=DEFAULT_PRODUCT_COUNT,
+            throttle_delay=DEFAULT_THROTTLE_DELAY,
+            stop_when_complete=False,
+            domain_timeout=0.1,
+        ),
+        fetcher,
+    )
+
+    assert domain_data.emails == {"jozo.hossa@sufio.com"}
+    assert domain_data.products == [Product(title="some title", image_url="image_link")]
+    assert domain_data.error == "Time budget of 0.1 s exceeded"
+
+
+@pytest.mark.asyncio
+async def test_create_session():
+    config = Config(
+        input_column=DEFAULT_INPUT_COLUMN,
+        contact_paths=DEFAULT_CONTACT_PATHS,
+        product_list_path=DEFAULT_PRODUCT_LIST_PATH,
+        product_count=DEFAULT_PRODUCT_COUNT,
+        throttle_delay=DEFAULT_THROTTLE_DELAY,
+        connection_limit=10,
+        connection_limit_per_host=2,
+        connect_timeout=3,
+        read_timeout=4,
+        request_timeout=0,
+    )
+    async with create_session(config) as session:
+        assert session.connector.limit == 10
+        assert session.connector.limit_per_host == 2
+        assert session.connector.use_dns_cache
+        assert session.timeout.sock_connect == 3
+        assert session.timeout.sock_read == 4
+        assert session.timeout.total is None
+
+
 @pytest.mark.parametrize(
     "product_count, expected_result",
     [
@@ -196,13 +450,18 @@ def test_get_header_row(product_count, expected_result):
                 "jozo.hossa@sufio.com",
                 "https://facebook.com/sufio",
                 "http://twitter.com/sufio",
+                "",
                 "some title",
                 "image_link",
                 "some title2",
                 "image_link2",
             ],
         ],
-        [DomainData(domain="sufio.com"), ["sufio.com", "", "", ""]],
+        [DomainData(domain="sufio.com"), ["sufio.com", "", "", "", ""]],
+        [
+            DomainData(domain="sufio.com", error="Host sufio.com is unavailable"),
+            ["sufio.com", "", "", "", "Host sufio.com is unavailable"],
+        ],
     ],
 )
 def test_domain_data_to_row(domain_data, expected_result):
@@ -222,3 +481,52 @@ def test_domain_data_to_row(domain_data, expected_result):
 )
 def test_extract_facebook(string, expected_result):
     assert extract_by_re_pattern(string, facebook_re_pattern) == expected_result
+
+
+@pytest.mark.parametrize(
+    "string, expected_result",
+    [
+        ["", set()],
+        [
+            "twitter.com/Sufio https://www.twitter.com/sufio2",
+            {"twitter.com/sufio", "https://www.twitter.com/sufio2"},
+        ],
+        [
+            "http://twitter.com/sufio https://twitter.com/sufio",
+            {"twitter.com/sufio", "https://twitter.com/sufio"},
+        ],
+        # prefix belongs to the previous link
+        [
+            "twitter.com/sufio.https://twitter.com/x",
+            {"twitter.com/sufio.https", "twitter.com/x"},
+        ],
+    ],
+)
+def test_extract_social_links(string, expected_result):
+    assert extract_social_links(string, twitter_link_re_pattern) == expected_result
+
+
+@pytest.mark.parametrize(
+    "string",
+    [
+        "",
+        contact_page1,
+        contact_page2,
+        product_page,
+        "slick@1.8.1 jozo.hossa@sufio.com marian.gaborik@sufio.com",
+        "a@b.com.x@y.com @foo.com.bar@x.com a@@b.com image@2x.png",
+        "Jozo.Hossa@Sufio.COM, https://www.facebook.com/x.facebook.com/y",
+        "twitter.com/www.x-.https://twitter.com/facebook.com//",
+    ],
+)
+def test_extract_contacts_matches_re_patterns(string):
+    assert extract_contacts(string) == (
+        extract_emails(string),
+        extract_by_re_pattern(string, facebook_re_pattern),
+        extract_by_re_pattern(string, twitter_re_pattern),
+    )
+    assert extract_emails(string) == set(
+        match[0].lower()
+        for match in email_re_pattern.findall(string)
+        if not match[0].endswith((".png", ".jpg"))
+    )
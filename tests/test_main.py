@@ -0,0 +1,262 @@
+import csv
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from asynctest import mock
+
+from crawler.constants import (
+    DEFAULT_CONTACT_PATHS,
+    DEFAULT_INPUT_COLUMN,
+    DEFAULT_PRODUCT_LIST_PATH,
+    DEFAULT_THROTTLE_DELAY,
+)
+from crawler.incremental import IncrementalCrawl
+from crawler.models import Config, DomainData
+from crawler.sharding import Shard, merge_csv_files
+from crawler.sinks import JsonLinesSink, read_json_lines
+from main import (
+    create_incremental_crawl,
+    crawl,
+    run_workers,
+    setup_argument_parser,
+    write_domain_map,
+)
+
+config = Config(
+    input_column=DEFAULT_INPUT_COLUMN,
+    contact_paths=DEFAULT_CONTACT_PATHS,
+    product_list_path=DEFAULT_PRODUCT_LIST_PATH,
+    product_count=0,
+    throttle_delay=DEFAULT_THROTTLE_DELAY,
+)
+
+
+async def get_domain_data_mock(domain, config, fetcher, executor=None):
+    if domain == "broken.com":
+        raise ValueError(domain)
+    return DomainData(domain=domain, emails={f"info@{domain}"})
+
+
+def read_rows(file_path):
+    with open(file_path) as in_file:
+        return sorted(tuple(row) for row in csv.reader(in_file))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("resume", [True, False])
+@mock.patch("main.get_domain_data", side_effect=get_domain_data_mock)
+async def test_crawl(get_domain_data, tmp_path, resume):
+    in_file = tmp_path / "input.csv"
+    in_file.write_text("url\nsufio.com\nbroken.com\nguestcloud.net\n")
+    out_file = str(tmp_path / "output.csv")
+    journal_file = str(tmp_path / "journal.jsonl")
+    with JsonLinesSink(journal_file) as journal:
+        journal.write(DomainData(domain="sufio.com", emails={"old@sufio.com"}))
+
+    await crawl(config, str(in_file), out_file, journal_file, resume)
+
+    crawled_domains = [call.args[0] for call in get_domain_data.call_args_list]
+    if resume:
+        assert sorted(crawled_domains) == ["broken.com", "guestcloud.net"]
+        expected_email = "old@sufio.com"
+    else:
+        assert sorted(crawled_domains) == ["broken.com", "guestcloud.net", "sufio.com"]
+        expected_email = "info@sufio.com"
+    assert read_rows(out_file) == sorted(
+        [
+            ("url", "email", "facebook", "twitter", "error"),
+            ("sufio.com", expected_email, "", "", ""),
+            ("guestcloud.net", "info@guestcloud.net", "", "", ""),
+        ]
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("dedupe_on_disk", [True, False])
+@mock.patch("main.get_domain_data", side_effect=get_domain_data_mock)
+async def test_crawl_deduplicates_domains(get_domain_data, tmp_path, dedupe_on_disk):
+    in_file = tmp_path / "input.csv"
+    in_file.write_text(
+        "url\nsufio.com\nhttps://www.Sufio.com/\nhttps://www.GuestCloud.net/\n"
+        "guestcloud.net\nSUFIO.COM\n"
+    )
+    out_file = str(tmp_path / "output.csv")
+
+    await crawl(
+        config,
+        str(in_file),
+        out_file,
+        str(tmp_path / "journal.jsonl"),
+        False,
+        dedupe_on_disk=dedupe_on_disk,
+    )
+
+    crawled_domains = [call.args[0] for call in get_domain_data.call_args_list]
+    # the first domain of the store is crawled as written
+    assert sorted(crawled_domains) == ["sufio.com", "www.guestcloud.net"]
+    assert [row[0] for row in read_rows(out_file)] == [
+        "sufio.com",
+        "url",
+        "www.guestcloud.net",
+    ]
+
+
+@pytest.mark.parametrize("dedupe_on_disk", [True, False])
+def test_write_domain_map(tmp_path, dedupe_on_disk):
+    in_file = tmp_path / "input.csv"
+    in_file.write_text("url\nhttps://www.Sufio.com/\nsufio..com\nsufio.com\n")
+    map_file = str(tmp_path / "domains.csv")
+
+    write_domain_map(str(in_file), "url", map_file, dedupe_on_disk)
+
+    assert read_rows(map_file) == sorted(
+        [
+            ("url", "domain"),
+            ("https://www.Sufio.com/", "www.sufio.com"),
+            ("sufio..com", ""),
+            ("sufio.com", "www.sufio.com"),
+        ]
+    )
+
+
+@pytest.mark.asyncio
+@mock.patch("main.get_domain_data", side_effect=get_domain_data_mock)
+async def test_crawl_incremental(get_domain_data, tmp_path):
+    in_file = tmp_path / "input.csv"
+    in_file.write_text("url\nsufio.com\nfresh.com\nguestcloud.net\nnew.com\n")
+    out_file = str(tmp_path / "output.csv")
+    journal_file = str(tmp_path / "journal.jsonl")
+    now = time.time()
+    previous = {
+        "sufio.com": DomainData(domain="sufio.com", emails={"old@sufio.com"}),
+        "fresh.com": DomainData(domain="fresh.com", crawled_at=now),
+        "guestcloud.net": DomainData(
+            domain="guestcloud.net", emails={"info@guestcloud.net"}
+        ),
+    }
+    incremental = IncrementalCrawl(previous.values(), fresh_for=60)
+
+    await crawl(
+        config, str(in_file), out_file, journal_file, False, incremental=incremental
+    )
+
+    crawled_domains = [call.args[0] for call in get_domain_data.call_args_list]
+    assert sorted(crawled_domains) == ["guestcloud.net", "new.com", "sufio.com"]
+    # only changed and new domains are written to output, journal records all of them
+    assert read_rows(out_file) == [
+        ("new.com", "info@new.com", "", "", ""),
+        ("sufio.com", "info@sufio.com", "", "", ""),
+        ("url", "email", "facebook", "twitter", "error"),
+    ]
+    assert sorted(
+        domain_data.domain for domain_data in read_json_lines(journal_file)
+    ) == ["fresh.com", "guestcloud.net", "new.com", "sufio.com"]
+    assert str(incremental.summary) == (
+        "crawled 3 domains (new 1, changed 1, unchanged 1, failed 0), "
+        "skipped 1 fresh and 0 deferred domains"
+    )
+
+
+@pytest.mark.asyncio
+@mock.patch("main.get_domain_data", side_effect=get_domain_data_mock)
+async def test_crawl_incremental_keeps_previous_data_of_failed_domain(
+    get_domain_data, tmp_path
+):
+    in_file = tmp_path / "input.csv"
+    in_file.write_text("url\nbroken.com\n")
+    journal_file = str(tmp_path / "journal.jsonl")
+    previous = DomainData(
+        domain="broken.com", emails={"info@broken.com"}, crawled_at=time.time() - 60
+    )
+    incremental = IncrementalCrawl([previous])
+
+    await crawl(
+        config,
+        str(in_file),
+        str(tmp_path / "output.csv"),
+        journal_file,
+        False,
+        incremental=incremental,
+    )
+
+    journal = list(read_json_lines(journal_file))
+    assert journal == [
+        DomainData(domain="broken.com", emails={"info@broken.com"}, error="broken.com")
+    ]
+    assert journal[0].crawled_at == previous.crawled_at
+    assert incremental.summary.failed == 1
+
+
+@pytest.mark.asyncio
+@mock.patch("main.get_domain_data", side_effect=get_domain_data_mock)
+async def test_crawl_to_sqlite(get_domain_data, tmp_path):
+    in_file = tmp_path / "input.csv"
+    in_file.write_text("url\nsufio.com\nbroken.com\nguestcloud.net\n")
+    out_file = str(tmp_path / "output.sqlite")
+
+    await crawl(config, str(in_file), out_file, str(tmp_path / "journal.jsonl"), False)
+
+    with sqlite3.connect(out_file) as connection:
+        assert connection.execute(
+            "SELECT domain, type, value FROM contacts ORDER BY domain"
+        ).fetchall() == [
+            ("guestcloud.net", "email", "info@guestcloud.net"),
+            ("sufio.com", "email", "info@sufio.com"),
+        ]
+
+
+@pytest.mark.asyncio
+@mock.patch("main.get_domain_data", side_effect=get_domain_data_mock)
+async def test_crawl_shards(get_domain_data, tmp_path):
+    domains = [f"store{i}.com" for i in range(20)]
+    in_file = tmp_path / "input.csv"
+    in_file.write_text("url\n" + "\n".join(domains) + "\n")
+    out_files = []
+
+    for shard in [Shard(0, 2), Shard(1, 2)]:
+        out_file = str(tmp_path / f"output-{shard.number}.csv")
+        journal_file = str(tmp_path / f"journal-{shard.number}.jsonl")
+        await crawl(config, str(in_file), out_file, journal_file, False, 0, shard=shard)
+        out_files.append(out_file)
+    out_file = str(tmp_path / "output.csv")
+    merge_csv_files(out_files, out_file)
+
+    crawled_domains = [call.args[0] for call in get_domain_data.call_args_list]
+    assert sorted(crawled_domains) == sorted(domains)
+    assert all(len(read_rows(out_file)) < len(domains) for out_file in out_files)
+    assert [row[0] for row in read_rows(out_file)] == sorted([*domains, "url"])
+
+
+@pytest.mark.asyncio
+@mock.patch(
+    "main.ProcessPoolExecutor", lambda workers, mp_context: ThreadPoolExecutor(workers)
+)
+@mock.patch("main.get_domain_data", side_effect=get_domain_data_mock)
+async def test_run_workers_incremental(get_domain_data, tmp_path):
+    domains = [f"store{i}.com" for i in range(10)]
+    in_file = tmp_path / "input.csv"
+    in_file.write_text("url\n" + "\n".join(domains) + "\n")
+    out_file = str(tmp_path / "output.jsonl")
+    args = setup_argument_parser().parse_args(
+        [str(in_file), out_file, "--workers", "2"]
+    )
+    await run_workers(config, args)
+
+    async def get_changed_domain_data(domain, config, fetcher, executor=None):
+        if domain == "store0.com":
+            return DomainData(domain=domain, emails={"new@store0.com"})
+        return await get_domain_data_mock(domain, config, fetcher, executor)
+
+    get_domain_data.side_effect = get_changed_domain_data
+    # journals of the previous run are overwritten by this run
+    args = setup_argument_parser().parse_args(
+        [str(in_file), out_file, "--workers", "2", "--previous"]
+        + [f"{out_file}.journal.shard-{i}-of-2.jsonl" for i in range(2)]
+    )
+    await run_workers(config, args, create_incremental_crawl(args))
+
+    assert list(read_json_lines(out_file)) == [
+        DomainData(domain="store0.com", emails={"new@store0.com"})
+    ]
@@ -0,0 +1,134 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer, unused_port
+
+from crawler.metrics import (
+    Histogram,
+    Metrics,
+    create_trace_config,
+    start_metrics_server,
+)
+
+
+def test_histogram_quantile():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in [0.05, 0.05, 0.5, 3.0]:
+        histogram.observe(value)
+
+    assert histogram.bucket_counts == [2, 1, 1]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert histogram.quantile(0.95) == 3.0
+
+
+def test_timer_records_failed_stage():
+    metrics = Metrics()
+
+    with pytest.raises(ValueError):
+        with metrics.timer("parse"):
+            raise ValueError()
+
+    assert metrics.stages["parse"].count == 1
+
+
+def test_domain_in_flight():
+    metrics = Metrics()
+
+    with metrics.domain_in_flight():
+        assert metrics.domains_in_flight == 1
+
+    assert metrics.domains_in_flight == 0
+    assert metrics.stages["domain"].count == 1
+
+
+def test_to_prometheus():
+    metrics = Metrics()
+    metrics.observe("fetch", 0.2)
+    metrics.observe("fetch", 100)
+    metrics.count_response(200)
+    metrics.add_downloaded_bytes(1024)
+
+    lines = metrics.to_prometheus().splitlines()
+
+    assert 'crawler_stage_duration_seconds_bucket{stage="fetch",le="0.1"} 0' in lines
+    assert 'crawler_stage_duration_seconds_bucket{stage="fetch",le="0.25"} 1' in lines
+    assert 'crawler_stage_duration_seconds_bucket{stage="fetch",le="+Inf"} 2' in lines
+    assert 'crawler_stage_duration_seconds_count{stage="fetch"} 2' in lines
+    assert 'crawler_responses_total{status="200"} 1' in lines
+    assert "crawler_downloaded_bytes_total 1024" in lines
+    assert "crawler_domains_in_flight 0" in lines
+
+
+def test_summary():
+    metrics = Metrics()
+    metrics.observe("fetch", 0.5)
+    metrics.count_response(404)
+
+    lines = metrics.summary().splitlines()
+
+    assert lines[1].split() == ["fetch", "1", "0.5", "500.0", "500.0", "500.0"]
+    assert "responses: 404: 1" in lines
+
+
+@pytest.mark.asyncio
+async def test_trace_config():
+    metrics = Metrics()
+    app = web.Application()
+
+    async def handler(request):
+        return web.Response(text="ok")
+
+    app.router.add_get("/", handler)
+    async with TestServer(app) as server:
+        async with aiohttp.ClientSession(
+            trace_configs=[create_trace_config(metrics)]
+        ) as session:
+            async with session.get(server.make_url("/")) as response:
+                await response.read()
+            with pytest.raises(aiohttp.ClientError):
+                await session.get(f"http://127.0.0.1:{unused_port()}/")
+
+    # failed connection is not timed, only counted as error
+    assert metrics.stages["connect"].count == 1
+    assert metrics.responses == {"error": 1}
+
+
+@pytest.mark.asyncio
+async def test_metrics_server():
+    metrics = Metrics()
+    metrics.count_response(200)
+    port = unused_port()
+    runner = await start_metrics_server(port, metrics)
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                text = await response.text()
+    finally:
+        await runner.cleanup()
+
+    assert 'crawler_responses_total{status="200"} 1' in text.splitlines()
+
+
+@pytest.mark.asyncio
+async def test_trace_config_ignores_cancelled_requests():
+    metrics = Metrics()
+
+    async def handler(request):
+        await asyncio.sleep(10)
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    async with TestServer(app) as server:
+        async with aiohttp.ClientSession(
+            trace_configs=[create_trace_config(metrics)]
+        ) as session:
+            task = asyncio.create_task(session.get(server.make_url("/")))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    assert metrics.responses == {}
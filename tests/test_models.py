@@ -0,0 +1,73 @@
+import pickle
+
+from crawler.logic import domain_data_to_row
+from crawler.models import (
+    CompactDomainData,
+    DomainData,
+    Product,
+    domain_data_from_compact,
+    domain_data_to_compact,
+)
+
+domain_data = DomainData(
+    domain="sufio.com",
+    emails={"marian.gaborik@sufio.com", "jozo.hossa@sufio.com"},
+    twitters={"https://twitter.com/shopify"},
+    products=[Product(title="some title", image_url="image_link")],
+    crawled_at=1700000000.0,
+    changed_at=1600000000.0,
+)
+
+
+def test_domain_data_to_compact_round_trip():
+    compact = domain_data_to_compact(domain_data)
+
+    assert compact == CompactDomainData(
+        domain="sufio.com",
+        emails=("jozo.hossa@sufio.com", "marian.gaborik@sufio.com"),
+        twitters=("https://twitter.com/shopify",),
+        products=(Product(title="some title", image_url="image_link"),),
+    )
+    assert compact.crawled_at == 1700000000.0
+    assert domain_data_from_compact(compact) == domain_data
+    assert domain_data_from_compact(compact).changed_at == 1600000000.0
+
+
+def test_domain_data_to_compact_shares_strings():
+    strings: dict[str, str] = {}
+    compacts = [
+        domain_data_to_compact(
+            DomainData(
+                domain=domain,
+                # strings built at runtime are distinct objects
+                twitters={"".join(["https://twitter.com/", "shopify"])},
+                error="".join(["Cannot ", "connect"]),
+            ),
+            strings,
+        )
+        for domain in ["sufio.com", "guestcloud.net"]
+    ]
+
+    assert compacts[0].twitters[0] is compacts[1].twitters[0]
+    assert compacts[0].error is compacts[1].error
+
+
+def test_compact_domain_data_to_row():
+    compact = domain_data_to_compact(domain_data)
+
+    assert list(domain_data_to_row(compact)) == [
+        "sufio.com",
+        "jozo.hossa@sufio.com, marian.gaborik@sufio.com",
+        "",
+        "https://twitter.com/shopify",
+        "",
+        "some title",
+        "image_link",
+    ]
+
+
+def test_models_are_picklable():
+    compact = domain_data_to_compact(domain_data)
+
+    assert pickle.loads(pickle.dumps(domain_data)) == domain_data
+    assert pickle.loads(pickle.dumps(compact)) == compact
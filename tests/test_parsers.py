@@ -0,0 +1,93 @@
+import pytest
+
+from crawler import parsers
+from crawler.parsers import ProductLinkScanner, Selector, Element
+
+collection_page = """
+    <html>
+        <body>
+            <div class="product-grid-item"><a href="grid1"></a></div>
+            <img src="image.png">
+            <div class="product-item">
+                <a href="link1"></a>
+                <a href="link2"><img src="link2.png"><br/></a>
+                <span><a href="nested"></a></span>
+                <a class="grid-product__link" href="grid-product1"></a>
+                <a href="link3">
+            </div>
+            <div class="product-grid-item"><a href="grid2"></a></div>
+            <script>var link = '<div class="product-item"><a href="script">';</script>
+            <a class="grid-product__link" href="grid-product2"></a>
+        </body>
+    </html>
+"""
+
+
+def element(tag: str, classes: str = "", id: str | None = None) -> Element:
+    return Element(tag=tag, classes=frozenset(classes.split()), id=id)
+
+
+@pytest.mark.parametrize(
+    "selector, stack, expected_result",
+    [
+        ["a.link", [element("a", "link other")], True],
+        ["a.link", [element("a", "other")], False],
+        ["#main > a", [element("div", id="main"), element("a")], True],
+        [".item > a", [element("div", "item"), element("span"), element("a")], False],
+        [".item a", [element("div", "item"), element("span"), element("a")], True],
+        ["div > * a", [element("div"), element("span"), element("a")], True],
+        ["div > * a", [element("div"), element("a")], False],
+    ],
+)
+def test_selector_matches(selector, stack, expected_result):
+    assert Selector(selector).matches(stack) == expected_result
+
+
+@pytest.mark.parametrize("selector", ["", "a >", "a[href]", "a:first-child"])
+def test_unsupported_selector(selector):
+    with pytest.raises(ValueError):
+        Selector(selector)
+
+
+@pytest.mark.parametrize(
+    "product_count, expected_result",
+    [
+        [0, []],
+        [2, ["grid-product1", "grid-product2"]],
+        [5, ["grid-product1", "grid-product2"]],
+    ],
+)
+def test_product_link_scanner(product_count, expected_result):
+    scanner = ProductLinkScanner(
+        ["a.grid-product__link", ".product-grid-item > a", ".product-item > a"],
+        product_count,
+    )
+    scanner.feed(collection_page)
+    scanner.close()
+    assert scanner.result == expected_result
+
+
+def test_product_link_scanner_priority_and_chunks():
+    scanner = ProductLinkScanner([".missing > a", ".product-item > a"], 4)
+    # page fed in small chunks, as it is downloaded
+    for position in range(0, len(collection_page), 7):
+        scanner.feed(collection_page[position : position + 7])
+    scanner.close()
+    assert scanner.result == ["link1", "link2", "grid-product1", "link3"]
+
+
+def test_product_link_scanner_stops_early():
+    scanner = ProductLinkScanner([".product-grid-item > a"], 1)
+    scanner.feed(collection_page)
+    assert scanner.finished
+    assert scanner.result == ["grid1"]
+
+
+@pytest.mark.parametrize("name", ["streaming", "bs4", "selectolax"])
+@pytest.mark.parametrize("product_count", [1, 3, 10])
+def test_parsers_agree(name, product_count):
+    if name == "selectolax" and parsers.LexborHTMLParser is None:
+        pytest.skip("selectolax is not installed")
+    assert parsers.get_product_link_parser(name)(
+        collection_page, product_count
+    ) == parsers.extract_product_links_bs4(collection_page, product_count)
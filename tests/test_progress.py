@@ -0,0 +1,61 @@
+import asyncio
+import io
+
+import pytest
+
+from crawler.metrics import Metrics
+from crawler.models import DomainData
+from crawler.progress import ProgressReporter
+
+
+def test_record():
+    progress = ProgressReporter(total=3)
+
+    progress.record(DomainData("sufio.com"))
+    progress.record(DomainData("broken.com", error="Cannot connect to host"))
+    progress.record(ValueError("guestcloud.net"))
+
+    assert progress.completed == 3
+    assert progress.failed == 2
+
+
+def test_get_report():
+    metrics = Metrics()
+    progress = ProgressReporter(total=4, metrics=metrics)
+    metrics.observe("fetch", 0.1)
+    metrics.domains_in_flight = 2
+    progress.record(DomainData("sufio.com"))
+
+    report = progress.get_report()
+
+    assert report.startswith("Domains done 1/4 (failed 0), in flight 2 | ")
+    assert "pages/s" in report
+    assert "ETA 00:00:" in report
+
+
+def test_get_report_unknown_total():
+    progress = ProgressReporter(metrics=Metrics())
+
+    assert "ETA" not in progress.get_report()
+
+
+def test_report_to_status_file(tmp_path):
+    status_file = tmp_path / "status.txt"
+    progress = ProgressReporter(status_file=str(status_file), metrics=Metrics())
+
+    progress.report()
+    progress.report()
+
+    assert status_file.read_text().startswith("Domains done 0")
+    assert len(status_file.read_text().splitlines()) == 1
+
+
+@pytest.mark.asyncio
+async def test_reports_periodically():
+    out = io.StringIO()
+
+    async with ProgressReporter(interval=0.01, out=out, metrics=Metrics()):
+        await asyncio.sleep(0.05)
+
+    # periodic reports and the final one
+    assert len(out.getvalue().splitlines()) >= 2
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from crawler.queues import SqliteWorkQueue, lease_domains
+
+
+@pytest.fixture
+def queue(tmp_path):
+    with SqliteWorkQueue(str(tmp_path / "queue.sqlite"), lease_time=60) as work_queue:
+        yield work_queue
+
+
+@pytest.mark.asyncio
+async def test_put_skips_duplicates(queue):
+    assert await queue.put(["sufio.com", "guestcloud.net"]) == 2
+    assert await queue.put(["sufio.com", "shopify.com"]) == 1
+    assert await queue.get_counts() == {"pending": 3}
+
+
+@pytest.mark.asyncio
+async def test_lease_ack(queue):
+    await queue.put(["sufio.com", "guestcloud.net", "shopify.com"])
+
+    first = await queue.lease(2)
+    second = await queue.lease(2)
+    await queue.ack(first[0])
+
+    assert sorted(first + second) == ["guestcloud.net", "shopify.com", "sufio.com"]
+    assert await queue.lease(2) == []
+    assert await queue.get_counts() == {"done": 1, "leased": 2}
+    assert not await queue.is_finished()
+
+
+@pytest.mark.asyncio
+async def test_nack_fails_after_max_attempts(tmp_path):
+    with SqliteWorkQueue(str(tmp_path / "queue.sqlite"), max_attempts=2) as queue:
+        await queue.put(["sufio.com"])
+
+        await queue.nack((await queue.lease(1))[0])
+        await queue.nack((await queue.lease(1))[0])
+
+        assert await queue.lease(1) == []
+        assert await queue.get_counts() == {"failed": 1}
+        assert await queue.is_finished()
+
+
+@pytest.mark.asyncio
+async def test_expired_lease(tmp_path):
+    with SqliteWorkQueue(
+        str(tmp_path / "queue.sqlite"), lease_time=0.01, max_attempts=2
+    ) as queue:
+        await queue.put(["sufio.com"])
+
+        assert await queue.lease(1) == ["sufio.com"]
+        await asyncio.sleep(0.02)
+        # leased again by other worker, the first worker crashed
+        assert await queue.lease(1) == ["sufio.com"]
+        await asyncio.sleep(0.02)
+
+        assert await queue.lease(1) == []
+        assert await queue.get_counts() == {"failed": 1}
+
+
+@pytest.mark.asyncio
+async def test_queue_shared_by_connections(tmp_path):
+    file_path = str(tmp_path / "queue.sqlite")
+    with SqliteWorkQueue(file_path) as queue, SqliteWorkQueue(file_path) as other:
+        await queue.put([f"store{i}.com" for i in range(10)])
+
+        leases = await asyncio.gather(*[q.lease(3) for q in [queue, other] * 2])
+
+        leased = [domain for lease in leases for domain in lease]
+        assert len(leased) == len(set(leased)) == 10
+
+
+@pytest.mark.asyncio
+async def test_lease_domains(queue):
+    await queue.put(["sufio.com", "guestcloud.net", "shopify.com"])
+
+    domains = []
+    async for domain in lease_domains(queue, batch_size=2, poll_interval=0.01):
+        domains.append(domain)
+        await queue.ack(domain)
+
+    assert sorted(domains) == ["guestcloud.net", "shopify.com", "sufio.com"]
+    assert await queue.is_finished()
+
+
+@pytest.mark.asyncio
+async def test_lease_domains_waits_for_returned_domains(queue):
+    await queue.put(["sufio.com"])
+    [leased] = await queue.lease(1)
+
+    async def return_leased():
+        # domain leased by other worker is returned to the queue
+        await asyncio.sleep(0.05)
+        await queue.nack(leased)
+
+    task = asyncio.create_task(return_leased())
+    domains = []
+    async for domain in lease_domains(queue, poll_interval=0.01):
+        domains.append(domain)
+        await queue.ack(domain)
+    await task
+
+    assert domains == ["sufio.com"]
@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+from asynctest import mock
+
+from crawler import ratelimit
+from crawler.ratelimit import HostRateLimiter, TokenBucket
+
+
+@mock.patch("time.monotonic")
+def test_token_bucket(monotonic_mock):
+    monotonic_mock.return_value = 100.0
+    bucket = TokenBucket(rate=2, capacity=2)
+
+    # burst
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # tokens are reserved in advance by the waiting callers
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1)
+
+    monotonic_mock.return_value = 103.0
+    assert bucket.is_full
+
+
+async def request(limiter, host, log):
+    async with limiter.acquire(host):
+        log.append((host, time.monotonic()))
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_host_rate_limiter_throttles_each_host_separately():
+    limiter = HostRateLimiter(rate=20, burst=1, max_concurrent=5)
+    log: list = []
+    await asyncio.gather(
+        *(request(limiter, host, log) for host in ["a", "a", "a", "b", "b"])
+    )
+
+    for host, count in [("a", 3), ("b", 2)]:
+        times = [request_time for log_host, request_time in log if log_host == host]
+        assert len(times) == count
+        assert all(later - earlier >= 0.04 for earlier, later in zip(times, times[1:]))
+    # the first requests to each host are not delayed by the other host
+    first_a, first_b = (log[0][1], [t for h, t in log if h == "b"][0])
+    assert abs(first_a - first_b) < 0.02
+
+
+@pytest.mark.asyncio
+async def test_host_rate_limiter_limits_concurrency():
+    limiter = HostRateLimiter(rate=None, max_concurrent=2)
+    in_flight = max_in_flight = 0
+
+    async def limited_request():
+        nonlocal in_flight, max_in_flight
+        async with limiter.acquire("a"):
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+
+    await asyncio.gather(*(limited_request() for _ in range(10)))
+    assert max_in_flight == 2
+
+
+@pytest.mark.asyncio
+@mock.patch.object(ratelimit, "SWEEP_EVERY", 2)
+async def test_host_rate_limiter_forgets_idle_hosts():
+    limiter = HostRateLimiter(rate=None)
+    for host in ["a", "b", "c"]:
+        async with limiter.acquire(host):
+            pass
+    assert len(limiter._hosts) < 3
+
+
+@pytest.mark.asyncio
+async def test_host_rate_limiter_adapts_rate():
+    limiter = HostRateLimiter(rate=16)
+    async with limiter.acquire("a"):
+        pass
+    bucket = limiter._hosts["a"].bucket
+
+    for _ in range(10):
+        limiter.slow_down("a")
+    assert bucket.rate == 1
+
+    limiter.speed_up("a")
+    assert bucket.rate == 2
+    for _ in range(20):
+        limiter.speed_up("a")
+    assert bucket.rate == 16
+
+
+@pytest.mark.asyncio
+async def test_host_rate_limiter_pauses_host():
+    limiter = HostRateLimiter(rate=None, max_concurrent=5)
+    async with limiter.acquire("a"):
+        limiter.slow_down("a", pause=0.05)
+
+    start = time.monotonic()
+    async with limiter.acquire("b"):
+        assert time.monotonic() - start < 0.02
+    async with limiter.acquire("a"):
+        assert time.monotonic() - start >= 0.04
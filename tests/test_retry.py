@@ -0,0 +1,70 @@
+import asyncio
+import socket
+import time
+from email.utils import formatdate
+
+import aiohttp
+import pytest
+from asynctest import mock
+
+from crawler.retry import RetryPolicy, is_retryable, parse_retry_after
+
+
+def response_error(
+    status: int, headers: dict | None = None
+) -> aiohttp.ClientResponseError:
+    return aiohttp.ClientResponseError(
+        mock.MagicMock(), (), status=status, headers=headers
+    )
+
+
+def connector_error(os_error: OSError) -> aiohttp.ClientConnectorError:
+    return aiohttp.ClientConnectorError(mock.MagicMock(), os_error)
+
+
+@pytest.mark.parametrize(
+    "value, expected_result",
+    [
+        (None, None),
+        ("", None),
+        ("120", 120),
+        ("soon", None),
+    ],
+)
+def test_parse_retry_after(value, expected_result):
+    assert parse_retry_after(value) == expected_result
+
+
+def test_parse_retry_after_date():
+    assert parse_retry_after(formatdate(time.time() - 100, usegmt=True)) == 0
+    assert 98 < parse_retry_after(formatdate(time.time() + 100, usegmt=True)) <= 100
+
+
+@pytest.mark.parametrize(
+    "error, expected_result",
+    [
+        (response_error(429), True),
+        (response_error(503), True),
+        (response_error(404), False),
+        (asyncio.TimeoutError(), True),
+        (aiohttp.ServerDisconnectedError(), True),
+        (connector_error(ConnectionRefusedError()), True),
+        (connector_error(socket.gaierror()), False),
+        (aiohttp.ClientError("Redirect loop"), False),
+        (ValueError(), False),
+    ],
+)
+def test_is_retryable(error, expected_result):
+    assert is_retryable(error) == expected_result
+
+
+def test_retry_policy_get_delay():
+    policy = RetryPolicy(max_retries=2, backoff=1, backoff_max=3)
+
+    assert 0 <= policy.get_delay(asyncio.TimeoutError(), 0) <= 1
+    assert 0 <= policy.get_delay(asyncio.TimeoutError(), 1) <= 2
+    assert policy.get_delay(asyncio.TimeoutError(), 2) is None
+    assert policy.get_delay(response_error(404), 0) is None
+    assert policy.get_delay(response_error(429, {"Retry-After": "2"}), 0) == 2
+    # Retry-After longer than max. backoff is not waited for
+    assert policy.get_delay(response_error(429, {"Retry-After": "10"}), 0) is None
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from crawler.scheduler import bounded_map
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("concurrency", [1, 3, 10])
+async def test_bounded_map_limits_concurrency(concurrency):
+    in_flight = 0
+    max_in_flight = 0
+
+    async def double(item):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        return item * 2
+
+    results = [
+        result async for _, result in bounded_map(double, range(20), concurrency)
+    ]
+
+    assert sorted(results) == [item * 2 for item in range(20)]
+    assert max_in_flight == concurrency
+
+
+@pytest.mark.asyncio
+async def test_bounded_map_pulls_items_lazily():
+    pulled = []
+
+    def items():
+        for item in range(100):
+            pulled.append(item)
+            yield item
+
+    async for _ in bounded_map(asyncio.sleep, items(), 2):
+        break
+
+    # workers' items + items waiting in the bounded queue
+    assert len(pulled) < 10
+
+
+@pytest.mark.asyncio
+async def test_bounded_map_returns_exceptions():
+    async def fail_on_odd(item):
+        if item % 2:
+            raise ValueError(item)
+        return item
+
+    results = dict([entry async for entry in bounded_map(fail_on_odd, range(4), 2)])
+
+    assert results[0] == 0
+    assert isinstance(results[1], ValueError)
+
+
+@pytest.mark.asyncio
+async def test_bounded_map_propagates_reading_error():
+    def items():
+        yield 0
+        raise OSError("broken input")
+
+    with pytest.raises(OSError):
+        async for _ in bounded_map(asyncio.sleep, items(), 2):
+            pass
@@ -0,0 +1,57 @@
+import argparse
+
+import pytest
+
+from crawler.sharding import (
+    Shard,
+    parse_shard,
+    get_shard_number,
+    is_in_shard,
+    get_shard_file_path,
+    merge_csv_files,
+)
+
+
+@pytest.mark.parametrize(
+    "value, expected_result", [["0/4", Shard(0, 4)], ["3/4", Shard(3, 4)]]
+)
+def test_parse_shard(value, expected_result):
+    assert parse_shard(value) == expected_result
+
+
+@pytest.mark.parametrize("value", ["4/4", "-1/4", "1", "a/b", "1/2/3"])
+def test_parse_shard_invalid(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_shard(value)
+
+
+def test_shards_partition_domains():
+    domains = [f"store{i}.com" for i in range(100)]
+    shards = [Shard(i, 4) for i in range(4)]
+
+    for domain in domains:
+        assert [is_in_shard(domain, shard) for shard in shards].count(True) == 1
+        assert is_in_shard(domain, None)
+    # stable across processes, unlike built-in hash
+    assert get_shard_number("sufio.com", 4) == get_shard_number("sufio.com", 4) == 2
+    # variants of the same store belong to the same shard
+    assert get_shard_number("www.sufio.com", 4) == 2
+
+
+def test_get_shard_file_path():
+    assert get_shard_file_path("out/output.csv", Shard(1, 4)) == (
+        "out/output.shard-1-of-4.csv"
+    )
+
+
+def test_merge_csv_files(tmp_path):
+    part_files = [tmp_path / "part0.csv", tmp_path / "part1.csv"]
+    part_files[0].write_bytes(b"url,email\r\nsufio.com,a@sufio.com\r\n")
+    part_files[1].write_bytes(b"url,email\r\nguestcloud.net,\r\n")
+    out_file = tmp_path / "output.csv"
+
+    merge_csv_files([str(part_file) for part_file in part_files], str(out_file))
+
+    assert out_file.read_bytes() == (
+        b"url,email\r\nsufio.com,a@sufio.com\r\nguestcloud.net,\r\n"
+    )
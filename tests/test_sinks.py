@@ -0,0 +1,229 @@
+import csv
+import sqlite3
+
+import pytest
+
+from crawler.models import DomainData, Product
+from crawler.sinks import (
+    CsvSink,
+    JsonLinesSink,
+    ParquetSink,
+    SqliteSink,
+    create_sink,
+    read_json_lines,
+)
+
+DOMAIN_DATA_LIST = [
+    DomainData(
+        domain="sufio.com",
+        emails={"jozo.hossa@sufio.com", "marian.gaborik@sufio.com"},
+        twitters={"https://twitter.com/sufio"},
+        products=[
+            Product(title="some title", image_url="image_link"),
+            Product(title="other title", image_url="other_image_link"),
+        ],
+        crawled_at=1700000000.0,
+        changed_at=1600000000.0,
+    ),
+    DomainData(domain="guestcloud.net", error="Time budget of 60 s exceeded"),
+]
+
+
+def read_rows(file_path):
+    with open(file_path) as in_file:
+        return list(csv.reader(in_file))
+
+
+def test_csv_sink(tmp_path):
+    file_path = tmp_path / "output.csv"
+    with CsvSink(str(file_path), product_count=1) as sink:
+        sink.write(
+            DomainData(
+                domain="sufio.com",
+                emails={"jozo.hossa@sufio.com"},
+                products=[Product(title="some title", image_url="image_link")],
+            )
+        )
+        sink.write(DomainData(domain="guestcloud.net"))
+
+    assert read_rows(file_path) == [
+        ["url", "email", "facebook", "twitter", "error", "title 1", "image 1"],
+        ["sufio.com", "jozo.hossa@sufio.com", "", "", "", "some title", "image_link"],
+        ["guestcloud.net", "", "", "", ""],
+    ]
+
+
+def test_csv_sink_flushes_periodically(tmp_path):
+    file_path = tmp_path / "output.csv"
+    sink = CsvSink(str(file_path), product_count=0, flush_every=2)
+    sink.write(DomainData(domain="sufio.com"))
+    sink.write(DomainData(domain="guestcloud.net"))
+
+    # rows are readable before the sink is closed
+    assert len(read_rows(file_path)) == 3
+    sink.close()
+
+
+def test_csv_sink_appends_without_header(tmp_path):
+    file_path = tmp_path / "output.csv"
+    with CsvSink(str(file_path), product_count=0) as sink:
+        sink.write(DomainData(domain="sufio.com"))
+    with CsvSink(str(file_path), product_count=0, append=True) as sink:
+        sink.write(DomainData(domain="guestcloud.net"))
+
+    assert read_rows(file_path) == [
+        ["url", "email", "facebook", "twitter", "error"],
+        ["sufio.com", "", "", "", ""],
+        ["guestcloud.net", "", "", "", ""],
+    ]
+
+
+def test_json_lines_sink_round_trip(tmp_path):
+    file_path = str(tmp_path / "journal.jsonl")
+    domain_data_list = [
+        DomainData(
+            domain="sufio.com",
+            emails={"jozo.hossa@sufio.com", "marian.gaborik@sufio.com"},
+            twitters={"https://twitter.com/sufio"},
+            products=[Product(title="some title", image_url="image_link")],
+        ),
+        DomainData(domain="guestcloud.net"),
+    ]
+    with JsonLinesSink(file_path) as sink:
+        for domain_data in domain_data_list:
+            sink.write(domain_data)
+
+    assert list(read_json_lines(file_path)) == domain_data_list
+
+
+def test_json_lines_sink_appends_after_incomplete_line(tmp_path):
+    file_path = tmp_path / "journal.jsonl"
+    with JsonLinesSink(str(file_path)) as sink:
+        sink.write(DomainData(domain="sufio.com"))
+    # simulate crash in the middle of writing a line
+    with open(file_path, "a") as journal:
+        journal.write('{"domain": "guestcl')
+
+    with JsonLinesSink(str(file_path), append=True) as sink:
+        sink.write(DomainData(domain="guestcloud.net"))
+
+    assert list(read_json_lines(str(file_path))) == [
+        DomainData(domain="sufio.com"),
+        DomainData(domain="guestcloud.net"),
+    ]
+
+
+def test_sqlite_sink(tmp_path):
+    file_path = str(tmp_path / "output.sqlite")
+    with SqliteSink(file_path) as sink:
+        for domain_data in DOMAIN_DATA_LIST:
+            sink.write(domain_data)
+
+    with sqlite3.connect(file_path) as connection:
+        assert connection.execute(
+            "SELECT * FROM domains ORDER BY domain"
+        ).fetchall() == [
+            ("guestcloud.net", "Time budget of 60 s exceeded", None, None),
+            ("sufio.com", None, 1700000000.0, 1600000000.0),
+        ]
+        assert connection.execute(
+            "SELECT * FROM contacts ORDER BY value"
+        ).fetchall() == [
+            ("sufio.com", "twitter", "https://twitter.com/sufio"),
+            ("sufio.com", "email", "jozo.hossa@sufio.com"),
+            ("sufio.com", "email", "marian.gaborik@sufio.com"),
+        ]
+        assert connection.execute(
+            "SELECT * FROM products ORDER BY position"
+        ).fetchall() == [
+            ("sufio.com", 1, "some title", "image_link"),
+            ("sufio.com", 2, "other title", "other_image_link"),
+        ]
+
+
+def test_sqlite_sink_writes_in_batches(tmp_path):
+    file_path = str(tmp_path / "output.sqlite")
+    sink = SqliteSink(file_path, flush_every=2)
+    connection = sqlite3.connect(file_path)
+
+    sink.write(DomainData(domain="sufio.com"))
+    assert connection.execute("SELECT COUNT(*) FROM domains").fetchone() == (0,)
+    sink.write(DomainData(domain="guestcloud.net"))
+    assert connection.execute("SELECT COUNT(*) FROM domains").fetchone() == (2,)
+
+    sink.close()
+    connection.close()
+
+
+def test_sqlite_sink_append_replaces_domain(tmp_path):
+    file_path = str(tmp_path / "output.sqlite")
+    with SqliteSink(file_path) as sink:
+        sink.write(DOMAIN_DATA_LIST[0])
+    with SqliteSink(file_path, append=True) as sink:
+        sink.write(DomainData(domain="sufio.com", emails={"info@sufio.com"}))
+
+    with sqlite3.connect(file_path) as connection:
+        assert connection.execute("SELECT domain FROM domains").fetchall() == [
+            ("sufio.com",)
+        ]
+        assert connection.execute("SELECT * FROM contacts").fetchall() == [
+            ("sufio.com", "email", "info@sufio.com")
+        ]
+        assert connection.execute("SELECT * FROM products").fetchall() == []
+
+
+def test_parquet_sink(tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    file_path = str(tmp_path / "output.parquet")
+    with ParquetSink(file_path, flush_every=1) as sink:
+        for domain_data in DOMAIN_DATA_LIST:
+            sink.write(domain_data)
+
+    parquet_file = parquet.ParquetFile(file_path)
+    # one row group per batch
+    assert parquet_file.metadata.num_row_groups == 2
+    assert parquet_file.read().to_pylist() == [
+        {
+            "domain": "sufio.com",
+            "emails": ["jozo.hossa@sufio.com", "marian.gaborik@sufio.com"],
+            "facebooks": [],
+            "twitters": ["https://twitter.com/sufio"],
+            "products": [
+                {"title": "some title", "image_url": "image_link"},
+                {"title": "other title", "image_url": "other_image_link"},
+            ],
+            "error": None,
+            "crawled_at": 1700000000.0,
+            "changed_at": 1600000000.0,
+        },
+        {
+            "domain": "guestcloud.net",
+            "emails": [],
+            "facebooks": [],
+            "twitters": [],
+            "products": [],
+            "error": "Time budget of 60 s exceeded",
+            "crawled_at": None,
+            "changed_at": None,
+        },
+    ]
+
+
+def test_parquet_sink_cant_append(tmp_path):
+    with pytest.raises(ValueError):
+        ParquetSink(str(tmp_path / "output.parquet"), append=True)
+
+
+@pytest.mark.parametrize(
+    "file_name, sink_class",
+    [
+        ("output.csv", CsvSink),
+        ("output", CsvSink),
+        ("output.jsonl", JsonLinesSink),
+        ("output.sqlite", SqliteSink),
+        ("output.DB", SqliteSink),
+    ],
+)
+def test_create_sink(tmp_path, file_name, sink_class):
+    with create_sink(str(tmp_path / file_name), product_count=1) as sink:
+        assert isinstance(sink, sink_class)
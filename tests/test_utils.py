@@ -1,4 +1,8 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
+from asynctest import mock
 
 from crawler import utils
 
@@ -8,6 +12,52 @@ def test_negate():
     assert neg_bool(False)
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("executor", [None, ThreadPoolExecutor(1)])
+async def test_run_cpu_bound(executor):
+    assert await utils.run_cpu_bound(executor, max, 1, 2) == 2
+
+
+@pytest.mark.asyncio
+async def test_run_with_timeout_finished():
+    assert await utils.run_with_timeout(asyncio.sleep(0), 1)
+
+
+@pytest.mark.asyncio
+async def test_run_with_timeout_cancelled():
+    future = asyncio.ensure_future(asyncio.sleep(10))
+    assert not await utils.run_with_timeout(future, 0.01)
+    assert future.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_run_with_timeout_raises():
+    async def fail():
+        raise asyncio.TimeoutError()
+
+    with pytest.raises(asyncio.TimeoutError):
+        await utils.run_with_timeout(fail(), None)
+
+
+@pytest.mark.asyncio
+async def test_gather_or_cancel():
+    assert await utils.gather_or_cancel(asyncio.sleep(0, 1), asyncio.sleep(0, 2)) == [
+        1,
+        2,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_gather_or_cancel_cancels_others():
+    async def fail():
+        raise ValueError()
+
+    sibling = asyncio.ensure_future(asyncio.sleep(10))
+    with pytest.raises(ValueError):
+        await asyncio.wait_for(utils.gather_or_cancel(sibling, fail()), 1)
+    assert sibling.cancelled()
+
+
 @pytest.mark.parametrize(
     "domain, paths, expected_result",
     [
@@ -23,6 +73,13 @@ def test_get_urls(domain, paths, expected_result):
     assert utils.get_urls(domain, paths) == expected_result
 
 
+def test_get_url_with_query():
+    assert (
+        utils.get_url("sufio.com", "/products.json", query="limit=5")
+        == "https://sufio.com/products.json?limit=5"
+    )
+
+
 @pytest.mark.parametrize(
     "link, default_domain, expected_result",
     [
@@ -58,3 +115,61 @@ def test_url_to_json_url(url, expected_result):
 )
 def test_is_valid_email_domain(email, expected_result):
     assert utils.is_valid_email_domain(email) == expected_result
+
+
+def get_response_mock(chunks, charset):
+    async def iter_chunked(_):
+        for chunk in chunks:
+            yield chunk
+
+    response = mock.MagicMock(charset=charset)
+    response.content.iter_chunked = iter_chunked
+    return response
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "charset, max_size, expected_result",
+    [
+        (None, 100, utils.Body("žluťoučký kůň", complete=True)),
+        ("utf-8", 5, utils.Body("žlu", complete=False)),
+        ("unknown", 100, utils.Body("žluťoučký kůň", complete=True)),
+    ],
+)
+async def test_read_text(charset, max_size, expected_result):
+    body = "žluťoučký kůň".encode()
+    # chunks split multi-byte characters
+    chunks = [body[i : i + 3] for i in range(0, len(body), 3)]
+
+    assert (
+        await utils.read_text(get_response_mock(chunks, charset), max_size)
+        == expected_result
+    )
+
+
+@pytest.mark.asyncio
+async def test_read_text_feed():
+    fed = []
+
+    def feed(chunk):
+        fed.append(chunk)
+        return len(fed) == 2
+
+    body = await utils.read_text(
+        get_response_mock([b"ab", b"cd", b"ef"], None), 100, feed
+    )
+
+    assert body == utils.Body("abcd", complete=False)
+    assert fed == ["ab", "cd"]
+
+
+@pytest.mark.asyncio
+async def test_read_text_feed_truncated():
+    fed = []
+
+    body = await utils.read_text(
+        get_response_mock([b"A" * 10, b"B" * 10], None), 15, fed.append
+    )
+
+    assert body == utils.Body("A" * 10 + "B" * 5, complete=False)
+    assert fed == ["A" * 10, "B" * 5]
@@ -0,0 +1,51 @@
+import pytest
+from asynctest import mock
+
+from crawler.constants import (
+    DEFAULT_CONTACT_PATHS,
+    DEFAULT_INPUT_COLUMN,
+    DEFAULT_PRODUCT_LIST_PATH,
+    DEFAULT_THROTTLE_DELAY,
+)
+from crawler.models import Config
+from crawler.queues import SqliteWorkQueue
+from crawler.sinks import JsonLinesSink, read_json_lines
+from tests.test_main import get_domain_data_mock
+from worker import enqueue, work
+
+config = Config(
+    input_column=DEFAULT_INPUT_COLUMN,
+    contact_paths=DEFAULT_CONTACT_PATHS,
+    product_list_path=DEFAULT_PRODUCT_LIST_PATH,
+    product_count=0,
+    throttle_delay=DEFAULT_THROTTLE_DELAY,
+)
+
+
+@pytest.mark.asyncio
+@mock.patch("worker.get_domain_data", side_effect=get_domain_data_mock)
+async def test_work(get_domain_data, tmp_path):
+    in_file = tmp_path / "input.csv"
+    in_file.write_text(
+        "url\nsufio.com\nbroken.com\nguestcloud.net\nsufio.com\nwww.sufio.com\n"
+    )
+    out_file = str(tmp_path / "output.jsonl")
+
+    with SqliteWorkQueue(str(tmp_path / "queue.sqlite"), max_attempts=2) as queue:
+        await enqueue(queue, str(in_file), DEFAULT_INPUT_COLUMN)
+        with JsonLinesSink(out_file) as sink:
+            await work(config, queue, sink, poll_interval=0.01)
+
+        assert await queue.get_counts() == {"done": 2, "failed": 1}
+
+    crawled_domains = [call.args[0] for call in get_domain_data.call_args_list]
+    assert sorted(crawled_domains) == [
+        "broken.com",
+        "broken.com",
+        "guestcloud.net",
+        "sufio.com",
+    ]
+    assert sorted(domain_data.domain for domain_data in read_json_lines(out_file)) == [
+        "guestcloud.net",
+        "sufio.com",
+    ]
@@ -1,3 +1,5 @@
+import json
+
 from asynctest import mock
 
 
@@ -5,3 +7,28 @@ def get_generator_mock(return_value):
     generator_mock = mock.MagicMock()
     generator_mock.__aiter__.return_value = return_value
     return generator_mock
+
+
+def get_fetcher_mock(page, contact_pages, product_jsons):
+    """
+    Mock of fetcher.Fetcher
+
+    :param page: result of get_page
+    :param contact_pages: pages yielded by get_pages
+    :param product_jsons: JSONs (dicts) yielded (serialized) by get_pages if URLs are product JSONs
+    """
+
+    def get_page(url, as_json=False, feed=None, **kwargs):
+        if feed is not None:
+            feed(page)
+        return page
+
+    fetcher_mock = mock.MagicMock()
+    fetcher_mock.with_circuit_breaker.return_value = fetcher_mock
+    fetcher_mock.get_page = mock.CoroutineMock(side_effect=get_page)
+    fetcher_mock.get_pages.side_effect = lambda urls, **kwargs: get_generator_mock(
+        [json.dumps(product_json) for product_json in product_jsons]
+        if all(url.endswith(".json") for url in urls)
+        else contact_pages
+    )
+    return fetcher_mock
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+import argparse
+import asyncio
+import logging
+from contextlib import nullcontext
+from functools import partial
+
+from crawler.constants import (
+    DEFAULT_QUEUE_LEASE_TIME,
+    DEFAULT_QUEUE_MAX_ATTEMPTS,
+    DEFAULT_QUEUE_POLL_INTERVAL,
+)
+from crawler.domains import create_domain_set, get_domain_key
+from crawler.logic import (
+    iter_domains,
+    get_domain_data,
+    create_session,
+    create_fetcher,
+    create_cache,
+    create_parse_executor,
+)
+from crawler.metrics import crawl_metrics
+from crawler.models import Config, DomainData
+from crawler.progress import ProgressReporter
+from crawler.queues import WorkQueue, SqliteWorkQueue, lease_domains
+from crawler.scheduler import bounded_map
+from crawler.sinks import Sink, create_sink
+from main import (
+    add_config_arguments,
+    add_reporting_arguments,
+    create_config,
+    serve_metrics,
+    setup_logging,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def setup_argument_parser() -> argparse.ArgumentParser:
+    """Setup parsing of script's console arguments"""
+    parser = argparse.ArgumentParser(
+        description="Worker crawling domains leased from work queue shared by any number of workers and writing "
+        "their data to its output file.\n"
+        "Example usage:\n\n"
+        "\t./worker.py queue.sqlite --enqueue example_data/stores_small.csv\n"
+        "\t./worker.py queue.sqlite output-1.jsonl",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("queue_file", type=str, help="Work queue (SQLite database)")
+    parser.add_argument(
+        "out_file",
+        type=str,
+        nargs="?",
+        help="Output file, data are appended to it. Its format is given by extension, see main.py (Parquet "
+        "is not supported), JSON lines are recommended. Each worker should have its own output file",
+    )
+    parser.add_argument(
+        "--enqueue",
+        type=str,
+        nargs="?",
+        help="Add domains from input file to the queue (domains already in the queue and variants of domains "
+        "of the file differing only in www. prefix are skipped)",
+    )
+    parser.add_argument(
+        "--lease-time",
+        type=float,
+        nargs="?",
+        default=DEFAULT_QUEUE_LEASE_TIME,
+        help="Seconds after which domain leased by (crashed) worker is leased to other worker, it should be "
+        f"longer than --domain-timeout (default {DEFAULT_QUEUE_LEASE_TIME})",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        nargs="?",
+        default=DEFAULT_QUEUE_MAX_ATTEMPTS,
+        help=f"Max. number of attempts to crawl one domain (default {DEFAULT_QUEUE_MAX_ATTEMPTS})",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        nargs="?",
+        default=DEFAULT_QUEUE_POLL_INTERVAL,
+        help=f"Seconds between polls of empty queue (default {DEFAULT_QUEUE_POLL_INTERVAL})",
+    )
+    parser.add_argument(
+        "--keep-polling",
+        action="store_true",
+        help="Keep polling the queue for new domains once all domains are crawled, instead of exiting",
+    )
+    add_config_arguments(parser)
+    add_reporting_arguments(parser)
+    return parser
+
+
+async def enqueue(queue: WorkQueue, in_file: str, input_column: str) -> None:
+    """
+    Add domains from input CSV file to the queue, only the first domain of each key (see domains.get_domain_key)
+    of the input file is added, so that each store is crawled once
+    """
+    with create_domain_set() as seen:
+        added = await queue.put(
+            domain
+            for domain in iter_domains(in_file, input_column)
+            if seen.add(domain, get_domain_key(domain))
+        )
+    logger.info("Added %d domains to the queue", added)
+
+
+async def work(
+    config: Config,
+    queue: WorkQueue,
+    sink: Sink,
+    poll_interval: float = DEFAULT_QUEUE_POLL_INTERVAL,
+    keep_polling: bool = False,
+    progress_interval: float = 0,
+    status_file: str | None = None,
+) -> None:
+    """
+    Crawl domains leased from the queue and write their data to the sink.
+
+    Domain is acknowledged once its data are flushed to the sink, so data of acknowledged domains are not lost
+    if the worker crashes. Domain whose crawl failed is returned to the queue to be retried.
+
+    :param config: configuration object, see model.Config
+    :param queue: work queue, see queues.WorkQueue
+    :param sink: sink the data are written to
+    :param poll_interval: seconds between polls of empty queue
+    :param keep_polling: if True, the queue is polled for new domains forever
+    :param progress_interval: seconds between progress reports, 0 to disable them, see progress.ProgressReporter
+    :param status_file: file rewritten with each progress report, reports are written to stderr if not given
+    """
+    domains = lease_domains(
+        queue, poll_interval=poll_interval, keep_polling=keep_polling
+    )
+    with (
+        create_parse_executor(config) or nullcontext() as executor,
+        create_cache(config) or nullcontext() as cache,
+    ):
+        async with (
+            create_session(config) as session,
+            ProgressReporter(None, progress_interval, status_file) as progress,
+        ):
+            async for domain, domain_data in bounded_map(
+                partial(
+                    get_domain_data,
+                    config=config,
+                    fetcher=create_fetcher(config, session, cache),
+                    executor=executor,
+                ),
+                domains,
+                config.concurrency,
+            ):
+                progress.record(domain_data)
+                if not isinstance(domain_data, DomainData):
+                    await queue.nack(domain)
+                    continue
+                with crawl_metrics.timer("write"):
+                    sink.write(domain_data)
+                    sink.flush()
+                await queue.ack(domain)
+    logger.info("Queue has domains by status: %s", await queue.get_counts())
+
+
+async def main() -> None:
+    parser = setup_argument_parser()
+    args = parser.parse_args()
+    if args.enqueue is None and args.out_file is None:
+        parser.error("out_file or --enqueue is required")
+    setup_logging(logging.getLevelName(args.log))
+
+    with SqliteWorkQueue(args.queue_file, args.lease_time, args.max_attempts) as queue:
+        if args.enqueue is not None:
+            await enqueue(queue, args.enqueue, args.input_column)
+        if args.out_file is None:
+            return
+
+        config = create_config(args)
+        logger.info("Starting worker with %s", config)
+        try:
+            sink = create_sink(args.out_file, config.product_count, append=True)
+        except ValueError as e:
+            parser.error(str(e))
+        with sink:
+            async with serve_metrics(args.metrics_port):
+                await work(
+                    config,
+                    queue,
+                    sink,
+                    args.poll_interval,
+                    args.keep_polling,
+                    args.progress_interval,
+                    args.status_file,
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())